@@ -0,0 +1,174 @@
+# batch_scheduler.py
+
+# Batch entry point: solve the blocks of several residency programs
+# concurrently on one shared process pool, without the Streamlit flow.
+
+import os
+import time
+import contextlib
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime as dt_type
+
+import pandas as pd
+
+from scheduling_engine import run_scheduling_engine, InfeasibleScheduleError
+
+# Columns run_scheduling_engine expects for each input table
+RESIDENT_COLUMNS = ["Resident", "PGY", "Transition Date", "Transition PGY"]
+PTO_COLUMNS = ["Resident", "Start Date", "End Date"]
+HOLIDAY_COLUMNS = ["Date", "Call", "Backup"]
+PREVIOUS_COLUMNS = ["Date", "Call", "Backup", "Intern"]
+
+# Problem spec keys passed straight through to run_scheduling_engine
+ENGINE_OPTIONS = (
+    "pgy4_cap", "previous_call_counts", "fairness_weight", "soft_constraint_weight",
+    "day_order", "restarts", "time_limit", "seed",
+)
+
+
+def _as_frame(value, columns):
+    """DataFrame from a DataFrame, a list of row dicts or None, with the given columns present."""
+    if value is None:
+        df = pd.DataFrame(columns=columns)
+    elif isinstance(value, pd.DataFrame):
+        df = value.copy()
+    else:
+        df = pd.DataFrame(list(value))
+    for col in columns:
+        if col not in df.columns:
+            df[col] = None
+    return df
+
+
+def _as_datetime(value):
+    if isinstance(value, dt_type):
+        return value
+    return pd.to_datetime(value).to_pydatetime()
+
+
+def engine_arguments(problem):
+    """Translate a program problem spec into run_scheduling_engine keyword arguments.
+
+    A problem spec is a dict with:
+      name                    program name (used to label results)
+      residents               roster: Resident, PGY[, Transition Date, Transition PGY]
+      start_date, end_date    block dates
+      pto, holidays, previous optional tables (PTO ranges, fixed holiday
+                              assignments, previous block schedule)
+      soft_constraints        optional Resident/Start Date/End Date table
+    plus any of ENGINE_OPTIONS. Tables may be DataFrames or lists of row dicts.
+    """
+    if "residents" not in problem:
+        raise ValueError(f"Problem {problem.get('name')!r} has no residents")
+    prev_df = problem.get("previous")
+    kwargs = {
+        "prev_df": _as_frame(prev_df, PREVIOUS_COLUMNS) if prev_df is not None else None,
+        "res_df": _as_frame(problem["residents"], RESIDENT_COLUMNS),
+        "pto_df": _as_frame(problem.get("pto"), PTO_COLUMNS),
+        "hol_df": _as_frame(problem.get("holidays"), HOLIDAY_COLUMNS),
+        "start_date": _as_datetime(problem["start_date"]),
+        "end_date": _as_datetime(problem["end_date"]),
+    }
+    soft = problem.get("soft_constraints")
+    if soft is not None:
+        kwargs["soft_constraints"] = _as_frame(soft, PTO_COLUMNS)
+    for option in ENGINE_OPTIONS:
+        if problem.get(option) is not None:
+            kwargs[option] = problem[option]
+    return kwargs
+
+
+def solve_problem(problem, quiet=True):
+    """Solve one program in the current process.
+
+    Never raises: the outcome is reported in the result dict
+    (status 'ok', 'infeasible' or 'error').
+    """
+    started = time.perf_counter()
+    result = {
+        "program": problem.get("name"),
+        "status": "ok",
+        "schedule": None,
+        "issues": [],
+        "search_stats": {},
+        "seconds": 0.0,
+        "error": None,
+    }
+    try:
+        kwargs = engine_arguments(problem)
+        # The engine prints per-day debug output; drop it in batch runs
+        with contextlib.ExitStack() as stack:
+            if quiet:
+                sink = stack.enter_context(open(os.devnull, "w"))
+                stack.enter_context(contextlib.redirect_stdout(sink))
+            schedule = run_scheduling_engine(**kwargs)
+        result["schedule"] = schedule
+        result["issues"] = schedule.attrs.get("feasibility_issues", [])
+        result["search_stats"] = schedule.attrs.get("search_stats", {})
+    except InfeasibleScheduleError as e:
+        result["status"] = "infeasible"
+        result["issues"] = e.issues
+        result["error"] = str(e)
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = f"{type(e).__name__}: {e}\n{traceback.format_exc()}"
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+
+def solve_programs(problems, max_workers=None, executor=None, time_limit=None, quiet=True):
+    """Solve several program problem specs concurrently.
+
+    Problems run on ``executor`` if given (so callers can share one pool across
+    batches), otherwise on a new process pool of ``max_workers``. ``time_limit``
+    is a default per-program search budget in seconds for specs that do not set
+    their own. Results come back in input order; a program that is infeasible,
+    fails or crashes its worker only affects its own result.
+    """
+    problems = [dict(problem) for problem in problems]
+    for i, problem in enumerate(problems):
+        problem.setdefault("name", f"program-{i + 1}")
+        if time_limit is not None and problem.get("time_limit") is None:
+            problem["time_limit"] = time_limit
+    results = [None] * len(problems)
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=max_workers)
+    try:
+        futures = {executor.submit(solve_problem, problem, quiet): i for i, problem in enumerate(problems)}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                results[i] = future.result()
+            except Exception as e:  # e.g. the worker process died
+                results[i] = {
+                    "program": problems[i]["name"],
+                    "status": "error",
+                    "schedule": None,
+                    "issues": [],
+                    "search_stats": {},
+                    "seconds": 0.0,
+                    "error": f"{type(e).__name__}: {e}",
+                }
+    finally:
+        if own_executor:
+            executor.shutdown()
+    return results
+
+
+def summarize_results(results):
+    """One row per program: status, timing and search statistics."""
+    rows = []
+    for result in results:
+        stats = result.get("search_stats") or {}
+        rows.append({
+            "Program": result["program"],
+            "Status": result["status"],
+            "Seconds": round(result["seconds"], 2),
+            "Restarts": stats.get("restarts"),
+            "Success Rate": stats.get("success_rate"),
+            "Blocking Issues": sum(1 for issue in result["issues"] if issue.get("Severity") == "Infeasible"),
+            "Error": (result["error"] or "").splitlines()[0] if result["error"] else None,
+        })
+    return pd.DataFrame(rows)
@@ -0,0 +1,399 @@
+# benchmark_suite.py
+
+# Performance benchmarks for the scheduling engine, built on the synthetic
+# roster and PTO generators in stress_test.py.
+#
+#   python benchmark_suite.py [--sizes 10,25,50,100,200] [--horizons block,half-year,year]
+#                             [--restarts N] [--time-limit SECONDS] [--seed N]
+#                             [--output results.json] [--compare baseline.json]
+#   python benchmark_suite.py --check-app-imports [--app-import-budget SECONDS]
+#   python benchmark_suite.py --gmail-fetch [--gmail-messages N] [--gmail-latency SECONDS]
+#
+# Each case measures restarts per second, time to the first valid schedule,
+# time to the best (or a target) fairness, success rate and peak Python heap.
+# Results are written as JSON so runs on different commits can be compared.
+# --check-app-imports instead times the app's start-up imports in fresh
+# interpreters and exits non-zero when they go over budget or load a module
+# that should only be imported on first use. --gmail-fetch times
+# gmail_fetcher against the fake Gmail service in tests/fake_gmail.py with a
+# fixed round-trip latency: serial gets, the thread pool and batch requests.
+
+import os
+import sys
+import io
+import ast
+import json
+import time
+import contextlib
+import random
+import argparse
+import platform
+import subprocess
+import tracemalloc
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from scheduling_engine import CallScheduler, InfeasibleScheduleError
+from stress_test import generate_pto_requests
+from gmail_fetcher import fetch_requests_from_gmail, FETCH_WORKERS
+from tests.fake_gmail import FakeGmailService, fake_request_emails
+
+# Horizon name -> number of days, starting on BENCHMARK_START
+HORIZONS = {"block": 122, "half-year": 183, "year": 365}
+DEFAULT_SIZES = [10, 25, 50, 100, 200]
+BENCHMARK_START = datetime(2024, 1, 1)
+# Roster proportions by PGY, as in stress_test.create_test_data (6/6/6/4)
+PGY_SHARES = {1: 6, 2: 6, 3: 6, 4: 4}
+
+# Relative change that compare_results() reports as a regression
+REGRESSION_THRESHOLD = 0.10
+
+# App entry point checked by check_app_imports(), the modules it must leave to
+# first use, and its cold-start import budget in seconds. The budget covers
+# the app's own imports, which pandas dominates (about 0.15s); streamlit is
+# left out of the timing because its import time, around a second, would
+# hide a regression in them.
+APP_ENTRY = "call_schedule_app.py"
+LAZY_MODULES = ("googleapiclient", "google_auth_oauthlib", "google.auth", "openpyxl")
+UNTIMED_MODULES = ("streamlit",)
+APP_IMPORT_BUDGET = 0.3
+
+# Run in a fresh interpreter: imports the modules named in argv and reports
+# the time taken and every module loaded
+_IMPORT_PROBE = """
+import sys, json, time, importlib
+started = time.perf_counter()
+missing = []
+for name in sys.argv[1:]:
+    try:
+        importlib.import_module(name)
+    except ImportError:
+        missing.append(name)
+seconds = time.perf_counter() - started
+print(json.dumps({"seconds": seconds, "loaded": sorted(sys.modules), "missing": missing}))
+"""
+
+
+def scaled_roster(size):
+    """residents_info with ``size`` residents split across PGY levels by PGY_SHARES."""
+    total = sum(PGY_SHARES.values())
+    exact = {pgy: size * share / total for pgy, share in PGY_SHARES.items()}
+    counts = {pgy: int(value) for pgy, value in exact.items()}
+    # Largest remainder so the counts add up to size
+    for pgy in sorted(exact, key=lambda p: exact[p] - counts[p], reverse=True)[:size - sum(counts.values())]:
+        counts[pgy] += 1
+    return {pgy: [f"PGY{pgy}-{i}" for i in range(1, n + 1)] for pgy, n in counts.items()}
+
+
+def build_problem(size, horizon, seed):
+    """Roster, date range, PTO and soft-constraint tables for one benchmark case."""
+    random.seed(seed)
+    residents_info = scaled_roster(size)
+    start_date = BENCHMARK_START
+    end_date = start_date + timedelta(days=HORIZONS[horizon] - 1)
+    pto_requests, non_call_requests = generate_pto_requests(residents_info, start_date, end_date)
+    columns = ["Resident", "Start Date", "End Date"]
+    pto_df = pd.DataFrame(
+        [(r, s, e) for r, ranges in pto_requests.items() for s, e in ranges], columns=columns)
+    soft_df = pd.DataFrame(
+        [(r, s, e) for r, ranges in non_call_requests.items() for s, e in ranges], columns=columns)
+    return residents_info, start_date, end_date, pto_df, soft_df
+
+
+def _new_scheduler(residents_info, pto_df, soft_df):
+    return CallScheduler(residents_info, {}, [], pto_df, soft_constraints=soft_df)
+
+
+def benchmark_case(size, horizon, restarts=200, time_limit=60.0, seed=0,
+                   target_fairness=None, memory_restarts=20):
+    """Run one (program size, horizon) case and return its metrics as a dict."""
+    residents_info, start_date, end_date, pto_df, soft_df = build_problem(size, horizon, seed)
+    case = {
+        "size": size,
+        "horizon": horizon,
+        "days": (end_date - start_date).days + 1,
+        "seed": seed,
+        "status": "ok",
+        "error": None,
+    }
+
+    # Timing pass
+    scheduler = _new_scheduler(residents_info, pto_df, soft_df)
+    random.seed(seed)
+    started = time.perf_counter()
+    try:
+        scheduler.schedule_range(start_date, end_date, restarts=restarts, time_limit=time_limit)
+    except InfeasibleScheduleError as e:
+        case["status"] = "infeasible"
+        case["error"] = str(e)
+    seconds = time.perf_counter() - started
+    stats = scheduler.search_stats
+    trace = stats.get("fairness_trace", [])
+    attempts = stats.get("restarts", 0)
+    case.update({
+        "seconds": seconds,
+        "restarts": attempts,
+        "successful": stats.get("successful", 0),
+        "success_rate": stats.get("success_rate", 0.0),
+        "restarts_per_second": attempts / stats["seconds"] if stats.get("seconds") else None,
+        "timed_out": stats.get("timed_out", False),
+        "first_valid_seconds": stats.get("first_valid_seconds"),
+        "best_fairness": trace[-1][1] if trace else None,
+        "seconds_to_best": trace[-1][0] if trace else None,
+        "target_fairness": target_fairness,
+        "seconds_to_target": None,
+    })
+    if target_fairness is not None:
+        case["seconds_to_target"] = next((t for t, f in trace if f <= target_fairness), None)
+
+    # Memory pass: tracemalloc slows the engine down, so it runs separately
+    # on a shorter search
+    scheduler = _new_scheduler(residents_info, pto_df, soft_df)
+    random.seed(seed)
+    tracemalloc.start()
+    try:
+        scheduler.schedule_range(start_date, end_date, restarts=memory_restarts, time_limit=time_limit)
+    except InfeasibleScheduleError:
+        pass
+    case["peak_memory_mb"] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    case["memory_restarts"] = memory_restarts
+    tracemalloc.stop()
+    return case
+
+
+def app_import_modules(entry=APP_ENTRY):
+    """Modules an entry script imports at module level (imports inside functions are lazy)."""
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    with open(os.path.join(base_dir, entry), "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names = [node.module]
+        else:
+            continue
+        modules.extend(name for name in names if name not in modules)
+    return modules
+
+
+def measure_app_imports(entry=APP_ENTRY, runs=5):
+    """Cold-start time of an entry script's module-level imports (median of fresh interpreters).
+
+    UNTIMED_MODULES are not imported and are listed under "untimed"; modules
+    that are not installed are skipped and listed under "missing".
+    "eager_lazy_modules" lists the LAZY_MODULES that got loaded anyway.
+    """
+    modules = app_import_modules(entry)
+    untimed = [m for m in modules if m in UNTIMED_MODULES]
+    modules = [m for m in modules if m not in UNTIMED_MODULES]
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    timings, loaded, missing = [], set(), []
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, "-c", _IMPORT_PROBE] + modules,
+            capture_output=True, text=True, cwd=base_dir, check=True)
+        # Modules may print while importing; the probe's report is the last line
+        report = json.loads(completed.stdout.strip().splitlines()[-1])
+        timings.append(report["seconds"])
+        loaded.update(report["loaded"])
+        missing = report["missing"]
+    timings.sort()
+    return {
+        "entry": entry,
+        "modules": modules,
+        "untimed": untimed,
+        "missing": missing,
+        "runs": runs,
+        "seconds": timings[len(timings) // 2],
+        "eager_lazy_modules": [m for m in LAZY_MODULES if m in loaded],
+    }
+
+
+def check_app_imports(budget=APP_IMPORT_BUDGET, runs=5, entry=APP_ENTRY):
+    """measure_app_imports() plus "budget" and "ok" (within budget, nothing lazy loaded eagerly)."""
+    result = measure_app_imports(entry, runs)
+    result["budget"] = budget
+    result["ok"] = result["seconds"] <= budget and not result["eager_lazy_modules"]
+    return result
+
+
+def benchmark_gmail_fetch(count=60, latency=0.02, workers=FETCH_WORKERS):
+    """Time fetch_requests_from_gmail over a FakeGmailService: serial, threaded and batched.
+
+    "same_requests" is False if the three runs parse different requests.
+    """
+    raw_messages = fake_request_emails(count)
+    runs = {"serial": (False, 1), "threaded": (False, workers), "batched": (True, workers)}
+    result = {"messages": count, "latency": latency, "workers": workers}
+    parsed = []
+    for name, (batch, run_workers) in runs.items():
+        service = FakeGmailService(raw_messages, latency, batch=batch)
+        started = time.perf_counter()
+        # The fetcher prints a debug trace for every e-mail
+        with contextlib.redirect_stdout(io.StringIO()):
+            parsed.append(fetch_requests_from_gmail(service, max_messages=count, workers=run_workers)[:2])
+        result[f"{name}_seconds"] = time.perf_counter() - started
+    for name in ("threaded", "batched"):
+        result[f"{name}_speedup"] = result["serial_seconds"] / result[f"{name}_seconds"]
+    result["requests"] = sum(len(requests) for requests in parsed[0])
+    result["same_requests"] = all(requests == parsed[0] for requests in parsed)
+    return result
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def run_suite(sizes=None, horizons=None, restarts=200, time_limit=60.0, seed=0,
+              target_fairness=None, memory_restarts=20, progress=print):
+    """Run every size x horizon case serially (so timings don't compete)."""
+    sizes = sizes or DEFAULT_SIZES
+    horizons = horizons or list(HORIZONS)
+    cases = []
+    for horizon in horizons:
+        for size in sizes:
+            case = benchmark_case(size, horizon, restarts, time_limit, seed, target_fairness, memory_restarts)
+            cases.append(case)
+            if progress:
+                progress(_case_line(case))
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "restarts": restarts,
+            "time_limit": time_limit,
+            "seed": seed,
+        },
+        "cases": cases,
+    }
+
+
+def _case_line(case):
+    def fmt(value, spec):
+        return format(value, spec) if value is not None else "-"
+    return (f"{case['horizon']:>9} {case['size']:>4} residents: {case['status']:<10} "
+            f"{fmt(case['restarts_per_second'], '8.1f')} restarts/s  "
+            f"success {fmt(case['success_rate'], '.3f')}  "
+            f"first valid {fmt(case['first_valid_seconds'], '.2f')}s  "
+            f"best fairness {fmt(case['best_fairness'], '')} at {fmt(case['seconds_to_best'], '.2f')}s  "
+            f"peak {fmt(case['peak_memory_mb'], '.1f')} MB")
+
+
+def compare_results(baseline, current, threshold=REGRESSION_THRESHOLD):
+    """Side-by-side table of two suite results, with regressions flagged.
+
+    Higher is better for restarts/s and success rate; lower is better for
+    time to first valid schedule and peak memory.
+    """
+    metrics = {
+        "restarts_per_second": True,
+        "success_rate": True,
+        "first_valid_seconds": False,
+        "peak_memory_mb": False,
+    }
+    old_cases = {(c["size"], c["horizon"]): c for c in baseline["cases"]}
+    rows = []
+    for case in current["cases"]:
+        old = old_cases.get((case["size"], case["horizon"]))
+        if old is None:
+            continue
+        row = {"Horizon": case["horizon"], "Size": case["size"]}
+        regressions = []
+        for metric, higher_is_better in metrics.items():
+            before, after = old.get(metric), case.get(metric)
+            row[f"{metric} (old)"] = before
+            row[f"{metric} (new)"] = after
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            if (change < -threshold) if higher_is_better else (change > threshold):
+                regressions.append(metric)
+        row["Regressions"] = ", ".join(regressions)
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the scheduling engine")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                        help="Comma-separated program sizes (residents)")
+    parser.add_argument("--horizons", default=",".join(HORIZONS),
+                        help=f"Comma-separated horizons: {', '.join(HORIZONS)}")
+    parser.add_argument("--restarts", type=int, default=200, help="Restarts per case")
+    parser.add_argument("--time-limit", type=float, default=60.0, help="Search time limit per case, in seconds")
+    parser.add_argument("--memory-restarts", type=int, default=20, help="Restarts for the tracemalloc pass")
+    parser.add_argument("--target-fairness", type=float, default=None,
+                        help="Also report the time until this fairness spread is reached")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON results file")
+    parser.add_argument("--compare", default=None, help="Earlier results JSON to compare against")
+    parser.add_argument("--check-app-imports", action="store_true",
+                        help=f"Only check the cold-start imports of {APP_ENTRY} against the budget")
+    parser.add_argument("--app-import-budget", type=float, default=APP_IMPORT_BUDGET,
+                        help="Cold-start import budget in seconds for --check-app-imports")
+    parser.add_argument("--gmail-fetch", action="store_true",
+                        help="Only time Gmail request ingestion against a local fake service")
+    parser.add_argument("--gmail-messages", type=int, default=60, help="Messages for --gmail-fetch")
+    parser.add_argument("--gmail-latency", type=float, default=0.02,
+                        help="Fake round-trip latency in seconds for --gmail-fetch")
+    args = parser.parse_args(argv)
+
+    if args.gmail_fetch:
+        result = benchmark_gmail_fetch(args.gmail_messages, args.gmail_latency)
+        print(f"Gmail fetch of {result['messages']} messages ({result['requests']} requests, "
+              f"{result['latency'] * 1000:.0f} ms round trip):")
+        print(f"  serial   {result['serial_seconds']:.2f}s")
+        print(f"  threaded {result['threaded_seconds']:.2f}s ({result['threaded_speedup']:.1f}x, "
+              f"{result['workers']} workers)")
+        print(f"  batched  {result['batched_seconds']:.2f}s ({result['batched_speedup']:.1f}x)")
+        if not result["same_requests"]:
+            print("Parsed requests differ between runs")
+        return 0 if result["same_requests"] else 1
+
+    if args.check_app_imports:
+        result = check_app_imports(args.app_import_budget)
+        print(f"{result['entry']} imports: {result['seconds']:.3f}s (budget {result['budget']:.3f}s, "
+              f"median of {result['runs']} cold starts)")
+        if result["untimed"]:
+            print(f"Left out of the timing: {', '.join(result['untimed'])}")
+        if result["missing"]:
+            print(f"Not installed, not timed: {', '.join(result['missing'])}")
+        if result["eager_lazy_modules"]:
+            print(f"Loaded at start-up but should be lazy: {', '.join(result['eager_lazy_modules'])}")
+        return 0 if result["ok"] else 1
+
+    horizons = [h.strip() for h in args.horizons.split(",") if h.strip()]
+    unknown = [h for h in horizons if h not in HORIZONS]
+    if unknown:
+        parser.error(f"Unknown horizon(s): {', '.join(unknown)}")
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+
+    results = run_suite(sizes, horizons, args.restarts, args.time_limit, args.seed,
+                        args.target_fairness, args.memory_restarts)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to: {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        comparison = compare_results(baseline, results)
+        print(comparison.to_string(index=False))
+        if (comparison.get("Regressions", pd.Series(dtype=str)) != "").any():
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+# calendar_export.py
+
+# Per-resident calendar feeds for a schedule: one iCalendar (.ics) file and
+# one CSV per resident, plus a combined feed for the whole program. It
+# makes one pass over the schedule and writes everything into a zip
+# archive entry by entry, so the archive can go straight to a file or an
+# HTTP/Streamlit stream.
+#
+#   with open("calendars.zip", "wb") as f:
+#       export_calendars(schedule_df, f)
+
+import csv
+import io
+import zipfile
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+
+import pandas as pd
+
+# Schedule columns exported as events, with their event titles
+EXPORT_ROLES = {
+    'Call': "Call",
+    'Backup': "Backup call",
+    'Intern': "Intern call",
+    'Supervisor': "Call supervisor",
+}
+PRODUCT_ID = "-//Call Schedule//Calendar Export//EN"
+
+
+def _escape(text):
+    # RFC 5545 TEXT escaping
+    return (str(text).replace("\\", "\\\\").replace(";", "\\;")
+            .replace(",", "\\,").replace("\n", "\\n"))
+
+
+def _fold(line):
+    # RFC 5545: lines longer than 75 octets continue on lines starting with a space
+    data = line.encode("utf-8")
+    if len(data) <= 75:
+        return line + "\r\n"
+    parts, start = [], 0
+    while start < len(data):
+        end = min(start + (75 if not parts else 74), len(data))
+        # Do not split a multi-byte character
+        while end < len(data) and (data[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(data[start:end].decode("utf-8"))
+        start = end
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _file_name(name):
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in str(name))
+
+
+def _file_names(residents):
+    """Resident -> archive file name, numbered (_2, _3, ...) where cleaned names
+    collide, e.g. "O'Neil" and "O Neil"; compared case-insensitively for
+    case-insensitive file systems."""
+    names, used = {}, set()
+    for resident in residents:
+        base = name = _file_name(resident)
+        n = 1
+        while name.lower() in used:
+            n += 1
+            name = f"{base}_{n}"
+        used.add(name.lower())
+        names[resident] = name
+    return names
+
+
+def resident_events(schedule_df, roles=None):
+    """One pass over the schedule: resident -> [(date 'YYYY-MM-DD', role), ...] in date order."""
+    roles = [role for role in (roles or EXPORT_ROLES) if role in schedule_df.columns]
+    dates = pd.to_datetime(schedule_df['Date'])
+    order = dates.argsort(kind="stable")
+    date_strs = dates.dt.strftime("%Y-%m-%d").to_numpy()[order]
+    columns = [schedule_df[role].to_numpy(dtype=object)[order] for role in roles]
+    events = defaultdict(list)
+    for date_str, names in zip(date_strs, zip(*columns)):
+        for role, name in zip(roles, names):
+            if pd.notna(name) and name != "":
+                events[name].append((date_str, role))
+    return events
+
+
+def ics_chunks(calendar_name, events, stamp, resident=None):
+    """iCalendar text chunks for all-day events. ``events`` is a list of (date, role),
+    or of (date, role, resident) for a combined feed."""
+    yield _fold("BEGIN:VCALENDAR")
+    yield _fold("VERSION:2.0")
+    yield _fold(f"PRODID:{PRODUCT_ID}")
+    yield _fold("CALSCALE:GREGORIAN")
+    yield _fold(f"X-WR-CALNAME:{_escape(calendar_name)}")
+    for event in events:
+        date_str, role = event[0], event[1]
+        who = event[2] if len(event) > 2 else resident
+        start = date_str.replace("-", "")
+        end = (date.fromisoformat(date_str) + timedelta(days=1)).strftime("%Y%m%d")
+        title = EXPORT_ROLES.get(role, role)
+        if len(event) > 2:
+            title = f"{title}: {who}"
+        # One chunk per event keeps the number of archive writes down
+        yield "".join([
+            "BEGIN:VEVENT\r\n",
+            _fold(f"UID:{start}-{_file_name(role)}-{_file_name(who)}@call-schedule"),
+            f"DTSTAMP:{stamp}\r\n",
+            f"DTSTART;VALUE=DATE:{start}\r\n",
+            f"DTEND;VALUE=DATE:{end}\r\n",
+            _fold(f"SUMMARY:{_escape(title)}"),
+            "TRANSP:TRANSPARENT\r\n",
+            "END:VEVENT\r\n",
+        ])
+    yield _fold("END:VCALENDAR")
+
+
+def _write_entry(archive, name, chunks):
+    # Stream one archive entry from an iterable of str chunks
+    with archive.open(name, "w") as entry:
+        for chunk in chunks:
+            entry.write(chunk.encode("utf-8"))
+
+
+def _csv_rows(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\r\n")
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def export_calendars(schedule_df, output, calendar_name="Call Schedule", roles=None):
+    """Write per-resident and combined calendar feeds as a zip archive.
+
+    ``output`` is a path or a writable binary file object (it does not need
+    to be seekable). The archive holds:
+      all_residents.ics        every event, titled "<role>: <resident>"
+      ics/<resident>.ics       each resident's events
+      csv/<resident>.csv       Date, Role rows for each resident
+    Returns the number of residents exported.
+    """
+    events = resident_events(schedule_df, roles)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        rank = {role: i for i, role in enumerate(EXPORT_ROLES)}
+        combined = sorted(
+            ((date_str, role, resident) for resident, items in events.items() for date_str, role in items),
+            key=lambda event: (event[0], rank.get(event[1], len(rank))))
+        _write_entry(archive, "all_residents.ics", ics_chunks(calendar_name, combined, stamp))
+        file_names = _file_names(events)
+        for resident, items in events.items():
+            name = file_names[resident]
+            _write_entry(archive, f"ics/{name}.ics",
+                         ics_chunks(f"{calendar_name} - {resident}", items, stamp, resident))
+            _write_entry(archive, f"csv/{name}.csv",
+                         _csv_rows([("Date", "Role")] + [(date_str, role) for date_str, role in items]))
+    return len(events)
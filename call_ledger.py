@@ -0,0 +1,135 @@
+# call_ledger.py
+
+# Year-to-date call counts for an academic year. Every generated block is
+# recorded as per-resident, per-role, per-day-type counts, so the next
+# block's fairness inputs and the running totals come from one query over
+# the ledger instead of re-uploaded statistics CSVs.
+#
+#   ledger = CallLedger.for_year("2025-2026")
+#   ledger.record_block("Block 1", schedule_df, final_pgy)
+#   ledger.previous_call_counts(["Block 1"])      # previous_call_counts for the engine
+#   ledger.running_totals(distribution, ["Block 1"])
+
+import os
+
+import pandas as pd
+
+from call_rules import RULES
+from call_stats import STAT_COLUMNS, role_counts
+
+LEDGER_DIR = "saved_data"
+LEDGER_COLUMNS = ["Block", "Resident", "Role", "PGY"] + STAT_COLUMNS
+
+
+def _keys(names):
+    # Same normalization as the engine's previous_call_counts lookup
+    return names.astype(str).str.strip().str.lower()
+
+
+def block_entries(block, schedule_df, final_pgy, rules=RULES):
+    """Ledger rows for one block: one per (Resident, Role) with the resident's final PGY."""
+    counts = role_counts(schedule_df, rules).reset_index()
+    counts['PGY'] = counts['Resident'].map(final_pgy)
+    counts = counts[counts['PGY'].notna()]
+    counts.insert(0, 'Block', block)
+    return counts[LEDGER_COLUMNS].astype({'PGY': int})
+
+
+class CallLedger:
+    """Ledger rows of one academic year, kept in a CSV file or a ScheduleStore."""
+
+    def __init__(self, path=None, store=None, academic_year=None):
+        self.path = path
+        self.store = store
+        self.academic_year = academic_year
+        if store is not None:
+            self.entries = store.load_ledger(academic_year)
+        elif path and os.path.exists(path):
+            self.entries = pd.read_csv(path)[LEDGER_COLUMNS]
+        else:
+            self.entries = pd.DataFrame(columns=LEDGER_COLUMNS)
+
+    @classmethod
+    def for_year(cls, academic_year, directory=LEDGER_DIR, store=None):
+        if store is not None:
+            return cls(store=store, academic_year=academic_year)
+        return cls(os.path.join(directory, f'call_ledger_{academic_year.replace("-", "_")}.csv'))
+
+    def blocks(self):
+        return list(pd.unique(self.entries['Block']))
+
+    def save(self):
+        if self.store is not None:
+            self.store.save_ledger(self.academic_year, self.entries)
+            return
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.entries.to_csv(self.path, index=False)
+
+    def replace_block(self, block, entries):
+        """Replace a block's rows (regenerating a block overwrites it) and save."""
+        kept = self.entries[self.entries['Block'] != block]
+        frames = [df for df in (kept, entries) if not df.empty]
+        self.entries = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=LEDGER_COLUMNS)
+        self.save()
+
+    def record_block(self, block, schedule_df, final_pgy, rules=RULES):
+        """Record a generated block; ``final_pgy`` maps resident -> PGY at the block's end."""
+        self.replace_block(block, block_entries(block, schedule_df, final_pgy, rules))
+
+    def record_statistics(self, block, stats_df, pgy_lookup=None, rules=RULES):
+        """Record a block from a call statistics CSV (the Download Call Statistics file).
+
+        The file only has fairness counts, so each row becomes the intern or
+        call role by PGY. Files without a PGY column take it from
+        ``pgy_lookup`` (normalized name -> PGY); unknown residents are dropped.
+        """
+        df = stats_df.reindex(columns=['Resident', 'PGY'] + STAT_COLUMNS)
+        df = df[df['Resident'].notna()].copy()
+        df['Resident'] = df['Resident'].astype(str).str.strip()
+        if pgy_lookup:
+            df['PGY'] = df['PGY'].fillna(_keys(df['Resident']).map(pgy_lookup))
+        df = df[df['PGY'].notna()]
+        df[STAT_COLUMNS] = df[STAT_COLUMNS].apply(pd.to_numeric, errors='coerce').fillna(0).astype(int)
+        df['PGY'] = df['PGY'].astype(int)
+        df['Role'] = (df['PGY'] == rules.intern_pgy).map({True: "Intern", False: "Call"})
+        df = df.groupby(['Resident', 'Role'], as_index=False, sort=False).agg(
+            {'PGY': 'last', **{column: 'sum' for column in STAT_COLUMNS}})
+        df.insert(0, 'Block', block)
+        self.replace_block(block, df[LEDGER_COLUMNS])
+
+    def fairness_counts(self, blocks, rules=RULES):
+        """Counts the engine balances on, summed over ``blocks``.
+
+        Interns count their intern and call days; everyone else their call
+        days. Indexed by normalized name, with the display Resident, the
+        latest PGY and the statistics columns.
+        """
+        entries = self.entries[self.entries['Block'].isin(list(blocks))]
+        counted = entries[(entries['Role'] == "Call") |
+                          ((entries['Role'] == "Intern") & (entries['PGY'] == rules.intern_pgy))]
+        counted = counted.assign(Key=_keys(counted['Resident']))
+        return counted.groupby('Key', sort=False).agg(
+            {'Resident': 'last', 'PGY': 'last', **{column: 'sum' for column in STAT_COLUMNS}})
+
+    def previous_call_counts(self, blocks, rules=RULES):
+        """previous_call_counts for the engine: normalized name -> Weekday/Fridays/Saturday/Sunday/Total."""
+        return self.fairness_counts(blocks, rules)[STAT_COLUMNS].astype(int).to_dict('index')
+
+    def running_totals(self, distribution, blocks, rules=RULES):
+        """A block's call_distribution() plus the counts of earlier ``blocks``.
+
+        Returns Resident, the statistics columns and PGY (the current block's
+        where the resident is in it), one row per resident.
+        """
+        previous = self.fairness_counts(blocks, rules)
+        current = distribution.reindex(columns=['Resident', 'PGY'] + STAT_COLUMNS).copy()
+        current[STAT_COLUMNS] = current[STAT_COLUMNS].fillna(0)
+        current.index = _keys(current['Resident'])
+        totals = current[STAT_COLUMNS].add(previous[STAT_COLUMNS], fill_value=0).astype(int)
+        totals.insert(0, 'Resident', current['Resident'].combine_first(previous['Resident']))
+        totals['PGY'] = current['PGY'].combine_first(previous['PGY']).astype(int)
+        return totals.sort_values('PGY', kind='stable').reset_index(drop=True)
@@ -0,0 +1,125 @@
+# call_rules.py
+
+# Single source of truth for the call eligibility, spacing and fairness rules.
+# The engine, the stress-test validator and the app statistics all read the
+# compiled tables below instead of hard-coding their own if-chains.
+
+# Weekday indexes follow datetime.weekday(): Monday=0 ... Sunday=6.
+CALL_RULES = {
+    "pgy_levels": [1, 2, 3, 4],
+    # Weekdays on which each PGY level may take primary call
+    "call_days": {
+        1: [],
+        2: [1, 2, 4, 6],  # Tuesday, Wednesday, Friday, Sunday
+        3: [0, 2, 3, 5],  # Monday, Wednesday, Thursday, Saturday
+        4: [3],           # Thursday
+    },
+    # Backups must be at least this PGY and share the call resident's PGY
+    "backup_min_pgy": 2,
+    # PGY level that works as intern, and the call PGY levels that get one
+    "intern_pgy": 1,
+    "intern_call_pgys": [3, 4],
+    # PGY level the per-block call cap (pgy4_cap) applies to
+    "capped_call_pgy": 4,
+    # Supervisors (PGY-3/4) back up PGY-2 calls, except on the listed weekdays
+    "supervised_call_pgys": [2],
+    "supervisor_pgys": [3, 4],
+    "no_supervisor_days": [6],
+    # Minimum days between two assignments of one resident, by role pair
+    "spacing": {
+        ("call", "call"): 4,
+        ("call", "backup"): 4,
+        ("backup", "call"): 4,
+        ("backup", "backup"): 3,
+    },
+    # Minimum days between two intern assignments (q2 rule)
+    "intern_spacing": 2,
+    # Day type each weekday's call counts towards
+    "day_types": {0: "weekday", 1: "weekday", 2: "weekday", 3: "weekday",
+                  4: "friday", 5: "saturday", 6: "sunday"},
+    # Day type each weekday's intern assignment counts towards
+    "intern_day_types": {0: "weekday", 1: "weekday", 2: "weekday", 3: "weekday",
+                         4: "weekday", 5: "saturday", 6: "weekday"},
+    # Day types each PGY level is balanced and reported on; other days use the total
+    "fairness_day_types": {
+        1: ["weekday", "saturday"],
+        2: ["weekday", "friday", "sunday"],
+        3: ["weekday", "saturday"],
+        4: [],
+    },
+    # Call ranking penalties by weekday and PGY (Wednesday prefers PGY-2,
+    # Thursday prefers PGY-4 over PGY-3)
+    "call_preferences": {2: {3: 0.5}, 3: {3: 0.75}},
+}
+
+# Statistics column for each day type
+DAY_TYPE_COLUMNS = {
+    "weekday": "Weekday",
+    "friday": "Fridays",
+    "saturday": "Saturday",
+    "sunday": "Sunday",
+}
+
+
+class CompiledRules:
+    """Lookup tables built from a rule specification.
+
+    Tables are lists indexed by PGY (0..max PGY) and weekday (0..6), so every
+    eligibility check is a plain index read.
+    """
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.pgy_levels = list(spec["pgy_levels"])
+        size = max(self.pgy_levels) + 1
+        self.call_ok = [[False] * 7 for _ in range(size)]
+        for pgy, days in spec["call_days"].items():
+            for dow in days:
+                self.call_ok[pgy][dow] = True
+        self.backup_min_pgy = spec["backup_min_pgy"]
+        self.intern_pgy = spec["intern_pgy"]
+        self.intern_call = [pgy in spec["intern_call_pgys"] for pgy in range(size)]
+        self.capped_pgy = spec.get("capped_call_pgy", max(self.pgy_levels))
+        self.supervised_call = [pgy in spec["supervised_call_pgys"] for pgy in range(size)]
+        self.supervisor_ok = [pgy in spec["supervisor_pgys"] for pgy in range(size)]
+        self.supervisor_day = [dow not in spec["no_supervisor_days"] for dow in range(7)]
+        self.spacing = dict(spec["spacing"])
+        self.min_spacing = min(self.spacing.values())
+        self.max_spacing = max(self.spacing.values())
+        self.intern_spacing = spec["intern_spacing"]
+        self.day_type = [spec["day_types"][dow] for dow in range(7)]
+        self.intern_day_type = [spec["intern_day_types"][dow] for dow in range(7)]
+        # Count key used to balance each PGY on each weekday ("total" if the
+        # weekday's type is not one the PGY is balanced on)
+        self.fairness_key = [["total"] * 7 for _ in range(size)]
+        for pgy, types in spec["fairness_day_types"].items():
+            for dow in range(7):
+                day_type = self.intern_day_type[dow] if pgy == self.intern_pgy else self.day_type[dow]
+                if day_type in types:
+                    self.fairness_key[pgy][dow] = day_type
+        self.call_penalty = [[0.0] * 7 for _ in range(size)]
+        for dow, penalties in spec["call_preferences"].items():
+            for pgy, penalty in penalties.items():
+                self.call_penalty[pgy][dow] = penalty
+        # Statistics columns per PGY, in display order (Total last)
+        self.stat_columns = {
+            pgy: [DAY_TYPE_COLUMNS[t] for t in spec["fairness_day_types"].get(pgy, [])] + ["Total"]
+            for pgy in self.pgy_levels
+        }
+
+    def can_call(self, pgy, dow):
+        return pgy is not None and 0 <= pgy < len(self.call_ok) and self.call_ok[pgy][dow]
+
+    def can_backup(self, pgy):
+        return pgy is not None and pgy >= self.backup_min_pgy
+
+    def needs_intern(self, pgy):
+        return pgy is not None and 0 <= pgy < len(self.intern_call) and self.intern_call[pgy]
+
+
+def compile_rules(spec=None):
+    """Compile a rule specification (defaults to CALL_RULES) into lookup tables."""
+    return CompiledRules(spec if spec is not None else CALL_RULES)
+
+
+RULES = compile_rules()
@@ -6,13 +6,15 @@ from io import BytesIO
 from datetime import datetime as dt_type, date as date_type, timedelta
 import json
 import os
-from scheduling_engine import run_scheduling_engine
-from run_formatter import format_schedule
-from openpyxl import Workbook
-import io
-from gmail_fetcher import fetch_requests_from_gmail, ensure_date
+from scheduling_engine import run_scheduling_engine, InfeasibleScheduleError
+from schedule_validator import validate_uploaded_schedule, ScheduleValidationError
+from call_rules import RULES
+from calendar_export import export_calendars
+from call_stats import call_distribution as build_call_distribution, final_pgy_lookup, STAT_COLUMNS
+from schedule_store import ScheduleStore
+from constraint_tables import requests_frame, frame_requests, off_roster_requests
+from gmail_fetcher import fetch_requests_from_gmail
 import traceback
-import copy
 
 # After imports, add:
 def norm_name(name):
@@ -29,8 +31,6 @@ def is_within_block(start, end, block_start, block_end):
 # Initialize session state variables
 if 'pto_requests' not in st.session_state:
     st.session_state.pto_requests = {}
-if 'previous_call_counts' not in st.session_state:
-    st.session_state.previous_call_counts = None
 if 'schedule_df' not in st.session_state:
     st.session_state.schedule_df = None
 if 'residents' not in st.session_state:
@@ -45,10 +45,8 @@ if 'current_tab' not in st.session_state:
     st.session_state.current_tab = "Hard Constraints"
 if 'last_modified_resident' not in st.session_state:
     st.session_state.last_modified_resident = None
-if 'pending_pto_action' not in st.session_state:
-    st.session_state.pending_pto_action = None
-if 'pending_soft_action' not in st.session_state:
-    st.session_state.pending_soft_action = None
+if 'constraint_editor_version' not in st.session_state:
+    st.session_state.constraint_editor_version = {}
 
 # Initialize all session state variables
 if 'residents_data_by_block' not in st.session_state:
@@ -61,8 +59,8 @@ if 'soft_constraints_by_block' not in st.session_state:
     st.session_state.soft_constraints_by_block = {}
 if 'previous_assignments_by_block' not in st.session_state:
     st.session_state.previous_assignments_by_block = {}
-if 'previous_call_counts_by_block' not in st.session_state:
-    st.session_state.previous_call_counts_by_block = {}
+if 'saved_inputs_by_block' not in st.session_state:
+    st.session_state.saved_inputs_by_block = {}
 if 'removed_residents_by_block' not in st.session_state:
     st.session_state.removed_residents_by_block = {}
 if 'removed_holidays_by_block' not in st.session_state:
@@ -81,10 +79,6 @@ if 'pto_count_by_block' not in st.session_state:
     st.session_state.pto_count_by_block = {}
 if 'soft_constraint_count_by_block' not in st.session_state:
     st.session_state.soft_constraint_count_by_block = {}
-if 'current_academic_year_by_block' not in st.session_state:
-    st.session_state.current_academic_year_by_block = {}
-if 'loaded_residents_by_block' not in st.session_state:
-    st.session_state.loaded_residents_by_block = {}
 if 'disable_holidays_by_block' not in st.session_state:
     st.session_state.disable_holidays_by_block = {}
 if 'disable_pto_by_block' not in st.session_state:
@@ -99,8 +93,6 @@ if 'last_schedule_df_by_block' not in st.session_state:
     st.session_state.last_schedule_df_by_block = {}
 if 'last_stats_by_block' not in st.session_state:
     st.session_state.last_stats_by_block = {}
-if 'last_excel_file_by_block' not in st.session_state:
-    st.session_state.last_excel_file_by_block = {}
 if 'last_block_name_by_block' not in st.session_state:
     st.session_state.last_block_name_by_block = {}
 if 'last_success_by_block' not in st.session_state:
@@ -109,11 +101,18 @@ if 'last_call_distribution_by_block' not in st.session_state:
     st.session_state.last_call_distribution_by_block = {}
 if 'last_pgy_stats_by_block' not in st.session_state:
     st.session_state.last_pgy_stats_by_block = {}
-if 'last_csv_buffer_by_block' not in st.session_state:
-    st.session_state.last_csv_buffer_by_block = {}
+if 'requested_downloads' not in st.session_state:
+    st.session_state.requested_downloads = set()
+if 'generation_attempt_by_block' not in st.session_state:
+    st.session_state.generation_attempt_by_block = {}
 if 'last_soft_constraint_stats_by_block' not in st.session_state:
     st.session_state.last_soft_constraint_stats_by_block = {}
 
+# Per-block results of the last generated (or restored) schedule
+RESULT_KEYS = [
+    'last_schedule_df_by_block', 'last_stats_by_block', 'last_block_name_by_block', 'last_success_by_block',
+    'last_call_distribution_by_block', 'last_pgy_stats_by_block', 'last_soft_constraint_stats_by_block', 'show_results_by_block']
+
 def safe_int(val):
     return 0 if pd.isna(val) else int(val)
 
@@ -125,108 +124,170 @@ def safe_int_nan(val):
     except Exception:
         return 0
 
-def save_data(academic_year):
-    """Save only resident information for an academic year"""
-    if not os.path.exists('saved_data'):
-        os.makedirs('saved_data')
-    
-    data = {
-        'residents': st.session_state.residents_data_by_block[academic_year]
+@st.cache_resource
+def get_store():
+    """The SQLite store in saved_data, shared by every session"""
+    return ScheduleStore()
+
+def save_data(academic_year, block):
+    """Save a block's inputs for an academic year to the store (skipped when nothing changed)"""
+    inputs = {
+        'residents': st.session_state.residents_data_by_block[block],
+        'holidays': st.session_state.holiday_assignments_by_block[block],
+        'pto': st.session_state.pto_requests_by_block[block] if isinstance(st.session_state.pto_requests_by_block[block], dict) else {},
+        'soft_constraints': st.session_state.soft_constraints_by_block[block] if isinstance(st.session_state.soft_constraints_by_block[block], dict) else {},
+        'previous': st.session_state.previous_assignments_by_block[block],
+        'settings': {
+            'start_date': st.session_state.block_dates[block]['start'],
+            'end_date': st.session_state.block_dates[block]['end'],
+            'disable_holidays': st.session_state.disable_holidays_by_block[block],
+            'disable_pto': st.session_state.disable_pto_by_block[block],
+            'disable_soft_constraints': st.session_state.disable_soft_constraints_by_block[block],
+        },
     }
-    
-    filename = f'saved_data/academic_year_{academic_year.replace("-", "_")}.json'
-    with open(filename, 'w') as f:
-        json.dump(data, f)
-    return filename
+    fingerprint = json.dumps(inputs, sort_keys=True, default=str)
+    if st.session_state.saved_inputs_by_block.get((academic_year, block)) != fingerprint:
+        get_store().save_block_inputs(academic_year, block, **inputs)
+        st.session_state.saved_inputs_by_block[(academic_year, block)] = fingerprint
 
 def load_data(academic_year):
-    """Load only resident information for an academic year"""
-    filename = f'saved_data/academic_year_{academic_year.replace("-", "_")}.json'
-    if os.path.exists(filename):
-        with open(filename, 'r') as f:
-            data = json.load(f)
-        return data.get('residents', [])
-    return []
-
-def calculate_call_distribution(schedule_df, block_end_dt=None):
-    """Calculate call distribution statistics for each resident, using their final PGY for the block."""
-    stats = {1: [], 2: [], 3: [], 4: []}
-    all_residents = set(schedule_df['Call'].unique()) | set(schedule_df['Backup'].unique()) | set(schedule_df['Intern'].unique())
-
-    # Build a lookup for each resident's final PGY at the end of the block
-    final_pgy_lookup = {}
-    for res in st.session_state.residents_data_by_block[block_choice]:
-        pgy = int(res['PGY'])
-        transition_date = res.get('Transition_Date')
-        final_pgy = pgy
-        if transition_date and pd.notna(transition_date):
-            try:
-                tdate = dt_type.strptime(str(transition_date), "%Y-%m-%d")
-                if block_end_dt and tdate <= block_end_dt:
-                    final_pgy = min(pgy + 1, 4)
-            except Exception:
-                pass
-        final_pgy_lookup[res['Name']] = final_pgy
-
-    for resident in all_residents:
-        call_assignments = schedule_df[schedule_df['Call'] == resident]
-        backup_assignments = schedule_df[schedule_df['Backup'] == resident]
-        intern_assignments = schedule_df[schedule_df['Intern'] == resident]
-        final_pgy = final_pgy_lookup.get(resident, None)
-        if final_pgy is None:
-            continue
-        # PGY-1: Interns
-        if final_pgy == 1:
-            all_intern_dates = pd.concat([intern_assignments['Date'], call_assignments['Date']]).unique()
-            weekday_calls = sum(1 for date in all_intern_dates if dt_type.strptime(str(date), "%Y-%m-%d").weekday() not in [5, 6])
-            saturday_calls = sum(1 for date in all_intern_dates if dt_type.strptime(str(date), "%Y-%m-%d").weekday() == 5)
-            total_calls = len(all_intern_dates)
-            stats[1].append({
-                'Resident': resident,
-                'Weekday': weekday_calls,
-                'Saturday': saturday_calls,
-                'Total': total_calls
-            })
-        # PGY-2: Weekday, Friday, Sunday, Total
-        elif final_pgy == 2:
-            weekday_calls = len(call_assignments[call_assignments['Date'].apply(lambda x: dt_type.strptime(str(x), "%Y-%m-%d").weekday() in [0,1,2,3])])
-            friday_calls = len(call_assignments[call_assignments['Date'].apply(lambda x: dt_type.strptime(str(x), "%Y-%m-%d").weekday() == 4)])
-            sunday_calls = len(call_assignments[call_assignments['Date'].apply(lambda x: dt_type.strptime(str(x), "%Y-%m-%d").weekday() == 6)])
-            total_calls = len(call_assignments)
-            stats[2].append({
-                'Resident': resident,
-                'Weekday': weekday_calls,
-                'Fridays': friday_calls,
-                'Sunday': sunday_calls,
-                'Total': total_calls
-            })
-        # PGY-3: Weekday, Saturday, Total
-        elif final_pgy == 3:
-            weekday_calls = len(call_assignments[call_assignments['Date'].apply(lambda x: dt_type.strptime(str(x), "%Y-%m-%d").weekday() in [0,1,2,3])])
-            saturday_calls = len(call_assignments[call_assignments['Date'].apply(lambda x: dt_type.strptime(str(x), "%Y-%m-%d").weekday() == 5)])
-            total_calls = len(call_assignments)
-            stats[3].append({
-                'Resident': resident,
-                'Weekday': weekday_calls,
-                'Saturday': saturday_calls,
-                'Total': total_calls
-            })
-        # PGY-4: Total only
-        elif final_pgy == 4:
-            total_calls = len(call_assignments)
-            stats[4].append({
-                'Resident': resident,
-                'Total': total_calls
-            })
-    all_stats = []
-    for pgy in [1, 2, 3, 4]:
-        if stats[pgy]:
-            df = pd.DataFrame(stats[pgy])
-            df['PGY'] = pgy
-            all_stats.append(df)
-    if all_stats:
-        return pd.concat(all_stats, ignore_index=True)
-    return pd.DataFrame()
+    """Restore every block of an academic year from the store, including generated schedules"""
+    store = get_store()
+    legacy_file = f'saved_data/academic_year_{academic_year.replace("-", "_")}.json'
+    for block in st.session_state.block_dates:
+        inputs = store.load_block_inputs(academic_year, block)
+        if inputs is None:
+            # Years saved before the store only kept the residents
+            residents = []
+            if os.path.exists(legacy_file):
+                with open(legacy_file, 'r') as f:
+                    residents = json.load(f).get('residents', [])
+            inputs = {'residents': residents, 'holidays': [], 'pto': {}, 'soft_constraints': {}, 'previous': [], 'settings': {}}
+        settings = inputs['settings']
+        if settings.get('start_date') and settings.get('end_date'):
+            st.session_state.block_dates[block] = {"start": settings['start_date'], "end": settings['end_date']}
+        st.session_state.residents_data_by_block[block] = inputs['residents']
+        st.session_state.resident_count_by_block[block] = max(len(inputs['residents']), 1)
+        st.session_state.holiday_assignments_by_block[block] = inputs['holidays']
+        st.session_state.holiday_count_by_block[block] = max(len(inputs['holidays']), 1)
+        st.session_state.pto_requests_by_block[block] = inputs['pto']
+        st.session_state.soft_constraints_by_block[block] = inputs['soft_constraints']
+        st.session_state.previous_assignments_by_block[block] = inputs['previous']
+        st.session_state.disable_holidays_by_block[block] = settings.get('disable_holidays', False)
+        st.session_state.disable_pto_by_block[block] = settings.get('disable_pto', False)
+        st.session_state.disable_soft_constraints_by_block[block] = settings.get('disable_soft_constraints', False)
+        for key in ('removed_residents_by_block', 'removed_holidays_by_block', 'removed_pto_by_block', 'removed_soft_constraints_by_block'):
+            st.session_state[key][block] = set()
+        # Widgets keep their own state; drop it so they show the restored values
+        for key in (f"block_start_{block}", f"block_end_{block}", f"residents_data_editor_{block}"):
+            st.session_state.pop(key, None)
+        st.session_state.constraint_editor_version[block] = st.session_state.constraint_editor_version.get(block, 0) + 1
+        # Results of the previous year do not carry over
+        for key in RESULT_KEYS:
+            st.session_state[key].pop(block, None)
+        schedule_df = store.load_schedule(academic_year, block)
+        if schedule_df is not None:
+            block_end_dt = dt_type.strptime(st.session_state.block_dates[block]["end"], "%Y-%m-%d")
+            publish_block_results(block, schedule_df, block_end_dt)
+    st.session_state.get('calendar_workbook_by_year', {}).pop(academic_year, None)
+    st.session_state.requested_downloads = set()
+
+# Memoized pure steps. Streamlit reruns the whole script on every interaction;
+# these are keyed on their (hashed) inputs and keep a bounded number of results.
+@st.cache_data(max_entries=8, show_spinner=False)
+def cached_engine_run(prev_df, residents_df, pto_df, holidays_df, block_start_dt, block_end_dt, pgy4_cap,
+                      previous_call_counts, soft_constraints_df, fairness_weight, soft_constraint_weight, attempt=0):
+    """run_scheduling_engine for the app; ``attempt`` only makes a fresh search for the same inputs"""
+    return run_scheduling_engine(
+        prev_df,
+        residents_df,
+        pto_df,
+        holidays_df,
+        block_start_dt,
+        block_end_dt,
+        pgy4_cap=pgy4_cap,
+        previous_call_counts=previous_call_counts,
+        soft_constraints=soft_constraints_df,
+        fairness_weight=fairness_weight,
+        soft_constraint_weight=soft_constraint_weight
+    )
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def cached_call_distribution(schedule_df, final_pgy):
+    return build_call_distribution(schedule_df, final_pgy)
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def render_schedule_excel(schedule_df):
+    """Calendar workbook of a schedule as .xlsx bytes"""
+    # openpyxl is only loaded once a workbook is actually requested
+    from run_formatter import format_schedule
+    excel_file = BytesIO()
+    format_schedule(schedule_df).save(excel_file)
+    return excel_file.getvalue()
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def render_calendar_feeds(schedule_df, calendar_name):
+    """Per-resident iCalendar and CSV feeds of a schedule as zip bytes"""
+    calendars_zip = BytesIO()
+    export_calendars(schedule_df, calendars_zip, calendar_name=calendar_name)
+    return calendars_zip.getvalue()
+
+def render_all_blocks_excel(academic_year):
+    """Workbook of every block generated this year; only months whose blocks changed are re-rendered"""
+    from run_formatter import ScheduleWorkbook
+    calendar_workbooks = st.session_state.setdefault('calendar_workbook_by_year', {})
+    calendar_workbook = calendar_workbooks.setdefault(academic_year, ScheduleWorkbook())
+    schedules = st.session_state['last_schedule_df_by_block']
+    for block in [b for b in calendar_workbook.blocks if b not in schedules]:
+        calendar_workbook.remove_block(block)
+    for block, schedule_df in schedules.items():
+        calendar_workbook.set_block(block, schedule_df)
+    calendar_workbook.build()
+    all_blocks_file = BytesIO()
+    calendar_workbook.save(all_blocks_file)
+    return all_blocks_file.getvalue()
+
+def download_on_request(label, request_key, build, file_name, mime):
+    """Download button whose file is only built once the user asks for it"""
+    if request_key in st.session_state.requested_downloads:
+        st.download_button(label=label, data=build(), file_name=file_name, mime=mime, key=f"download_{request_key}")
+    elif st.button(f"Prepare: {label}", key=f"prepare_{request_key}"):
+        st.session_state.requested_downloads.add(request_key)
+        st.rerun()
+
+def publish_block_results(block, schedule_df, block_end_dt):
+    """Call distribution and session results for a block's schedule; returns the final PGY lookup"""
+    soft_constraint_stats = schedule_df.attrs.get('soft_constraint_stats', {})
+    final_pgy = final_pgy_lookup(st.session_state.residents_data_by_block[block], block_end_dt)
+    call_distribution = cached_call_distribution(schedule_df, final_pgy)
+    # Convert call distribution to pgy_stats format
+    pgy_stats = {
+        pgy: call_distribution.loc[call_distribution['PGY'] == pgy, ['Resident'] + STAT_COLUMNS].to_dict('records')
+        for pgy in RULES.pgy_levels
+    } if not call_distribution.empty else {pgy: [] for pgy in RULES.pgy_levels}
+    # Excel files and calendar feeds are rendered when they are downloaded; drop
+    # the requests made for the previous schedule
+    slug = block.lower().replace(' ', '_')
+    st.session_state.requested_downloads -= {f"schedule_{slug}", f"calendars_{slug}", f"all_blocks_{academic_year}"}
+    # Store in session state
+    st.session_state['last_schedule_df_by_block'][block] = schedule_df
+    st.session_state['last_stats_by_block'][block] = pgy_stats
+    st.session_state['last_block_name_by_block'][block] = block.lower().replace(' ', '_')
+    st.session_state['last_success_by_block'][block] = True
+    st.session_state['last_call_distribution_by_block'][block] = call_distribution
+    st.session_state['last_pgy_stats_by_block'][block] = pgy_stats
+    st.session_state['last_soft_constraint_stats_by_block'][block] = soft_constraint_stats
+    st.session_state['show_results_by_block'][block] = True
+    return final_pgy
+
+def get_call_ledger(academic_year):
+    """Year-to-date call ledger for an academic year, kept in the store"""
+    return get_store().ledger(academic_year)
+
+def previous_blocks(block):
+    """Blocks of the academic year that come before ``block``"""
+    blocks = list(block_info)
+    return blocks[:blocks.index(block)]
 
 st.set_page_config(page_title="Kall Scheduler Kuhnel (KSK)", layout="wide")
 
@@ -240,8 +301,8 @@ year_options = [f"{year}-{year+1}" for year in range(2025, current_year+10)]
 academic_year = st.selectbox("Select Academic Year:", year_options)
 start_year = int(academic_year.split('-')[0])
 
-# Initialize or update block dates based on academic year
-if st.session_state.block_dates is None or st.session_state.current_academic_year_by_block.get(academic_year) != academic_year:
+# Initialize block dates and restore the year's saved data when the academic year changes
+if st.session_state.block_dates is None or st.session_state.get('loaded_academic_year') != academic_year:
     st.session_state.block_dates = {
         "Block 1": {
             "start": f"{start_year}-07-01",
@@ -256,26 +317,8 @@ if st.session_state.block_dates is None or st.session_state.current_academic_yea
             "end": f"{start_year+1}-06-30"
         }
     }
-    st.session_state.current_academic_year_by_block[academic_year] = academic_year
-    # Reset holiday assignments when academic year changes
-    st.session_state.holiday_assignments_by_block[academic_year] = []
-    st.session_state.holiday_count_by_block[academic_year] = 1
-    # Reset PTO requests when academic year changes
-    st.session_state.pto_requests_by_block[academic_year] = {}
-    st.session_state.pto_count_by_block[academic_year] = 1
-    st.session_state.removed_pto_by_block[academic_year] = set()
-    # Reset soft constraints when academic year changes
-    st.session_state.soft_constraints_by_block[academic_year] = []
-    st.session_state.soft_constraint_count_by_block[academic_year] = 1
-    st.session_state.removed_soft_constraints_by_block[academic_year] = set()
-
-# Load saved data when academic year changes
-if st.session_state.current_academic_year_by_block.get(academic_year) != academic_year:
-    loaded_residents = load_data(academic_year)
-    if loaded_residents:
-        st.session_state.loaded_residents_by_block[academic_year] = loaded_residents
-        st.session_state.resident_count_by_block[academic_year] = len(loaded_residents)
-    st.session_state.current_academic_year_by_block[academic_year] = academic_year
+    load_data(academic_year)
+    st.session_state.loaded_academic_year = academic_year
 
 # Block selector with date ranges
 block_info = {
@@ -372,7 +415,6 @@ per_block_defaults = {
     'pto_requests_by_block': {},
     'soft_constraints_by_block': {},
     'previous_assignments_by_block': [],
-    'previous_call_counts_by_block': {},
     'removed_residents_by_block': set(),
     'removed_holidays_by_block': set(),
     'removed_pto_by_block': set(),
@@ -381,7 +423,6 @@ per_block_defaults = {
     'holiday_count_by_block': 1,
     'pto_count_by_block': 1,
     'soft_constraint_count_by_block': 1,
-    'loaded_residents_by_block': [],
     'disable_holidays_by_block': False,
     'disable_pto_by_block': False,
     'disable_soft_constraints_by_block': False,
@@ -396,19 +437,81 @@ for key, default in per_block_defaults.items():
 tab_labels = ["Residents", "Holiday Assignments", "Hard Constraints", "Soft Constraints", "Previous Block", "Previous Call Counts", "Generate & Review"]
 tabs = st.tabs(tab_labels)
 
-def add_pto_for_resident(resident):
-    if not isinstance(st.session_state.pto_requests_by_block[block_choice], dict):
-        st.session_state.pto_requests_by_block[block_choice] = {}
-    st.session_state.pto_requests_by_block[block_choice].setdefault(resident, []).append({
-        "Start_Date": "",
-        "End_Date": ""
-    })
+def edit_requests(state_key, editor_name, label):
+    """One table of a block's PTO or soft-constraint requests, written back in one batch.
+
+    Edits stay in the form until Apply, so adding a row or changing a date does
+    not rerun the app; the editor key is bumped after each apply (and by a Gmail
+    fetch or load_data) so it starts again from the stored requests.
+    """
+    roster = [res["Name"] for res in st.session_state.residents_data_by_block[block_choice]
+              if pd.notna(res.get("Name")) and str(res["Name"]).strip()]
+    version = st.session_state.constraint_editor_version.get(block_choice, 0)
+    notice = st.session_state.pop(f"{editor_name}_notice", None)
+    if notice:
+        st.success(notice)
+    hidden = off_roster_requests(st.session_state[state_key][block_choice], roster)
+    if hidden:
+        st.caption(f"{sum(len(reqs) for reqs in hidden.values())} requests for residents not on the roster "
+                   f"({', '.join(map(str, hidden))}) are kept but not shown.")
+    with st.form(f"{editor_name}_form_{block_choice}"):
+        edited_df = st.data_editor(
+            requests_frame(st.session_state[state_key][block_choice], roster),
+            num_rows="dynamic",
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "Resident": st.column_config.SelectboxColumn("Resident", options=roster, required=True, width="large"),
+                "Start Date": st.column_config.DateColumn("Start Date", format="YYYY-MM-DD",
+                                                          min_value=block_start, max_value=block_end),
+                "End Date": st.column_config.DateColumn("End Date", format="YYYY-MM-DD",
+                                                        min_value=block_start, max_value=block_end),
+            },
+            key=f"{editor_name}_editor_{block_choice}_{version}"
+        )
+        st.caption("Leave End Date empty for a single day. Dates outside the block are clipped to it.")
+        applied = st.form_submit_button(f"Apply {label} Changes")
+    if applied:
+        requests, dropped = frame_requests(edited_df, roster, block_start, block_end,
+                                           stored=st.session_state[state_key][block_choice])
+        st.session_state[state_key][block_choice] = requests
+        st.session_state.constraint_editor_version[block_choice] = version + 1
+        notice = f"Saved {sum(len(reqs) for reqs in requests.values())} {label.lower()} requests."
+        if dropped:
+            notice += f" Dropped {dropped} rows that were empty, duplicated or outside the block."
+        st.session_state[f"{editor_name}_notice"] = notice
+        st.rerun()
 
-def remove_pto_for_resident(resident, idx):
-    if resident in st.session_state.pto_requests_by_block[block_choice] and 0 <= idx < len(st.session_state.pto_requests_by_block[block_choice][resident]):
-        st.session_state.pto_requests_by_block[block_choice][resident].pop(idx)
-        if not st.session_state.pto_requests_by_block[block_choice][resident]:
-            del st.session_state.pto_requests_by_block[block_choice][resident]
+def engine_tables_for_block(block):
+    """Residents, previous block, holiday, PTO and soft-constraint tables for a
+    block, in the format expected by the engine."""
+    residents_df = pd.DataFrame([{
+        'Resident': res['Name'],
+        'PGY': res['PGY'],
+        'Transition Date': res['Transition_Date'],
+        'Transition PGY': min(int(res['PGY']) + 1, 4) if res['Transition_Date'] else None
+    } for res in st.session_state.residents_data_by_block[block]])
+    prev_df = None
+    if block_info[block]['requires_previous'] and st.session_state.previous_assignments_by_block[block]:
+        prev_df = pd.DataFrame(st.session_state.previous_assignments_by_block[block])
+    holidays_df = pd.DataFrame([{
+        'Date': holiday['Date'],
+        'Call': holiday['Call'],
+        'Backup': holiday['Backup']
+    } for holiday in st.session_state.holiday_assignments_by_block[block]]) if not st.session_state.disable_holidays_by_block[block] and st.session_state.holiday_assignments_by_block[block] else pd.DataFrame(columns=['Date', 'Call', 'Backup'])
+
+    def request_table(requests_by_resident, disabled):
+        if disabled or not requests_by_resident:
+            return pd.DataFrame()
+        return pd.DataFrame([{
+            'Resident': resident,
+            'Start Date': req['Start_Date'],
+            'End Date': req['End_Date']
+        } for resident, requests in requests_by_resident.items() for req in requests])
+
+    pto_df = request_table(st.session_state.pto_requests_by_block[block], st.session_state.disable_pto_by_block[block])
+    soft_constraints_df = request_table(st.session_state.soft_constraints_by_block[block], st.session_state.disable_soft_constraints_by_block[block])
+    return residents_df, prev_df, holidays_df, pto_df, soft_constraints_df
 
 with tabs[0]:
     st.subheader("Resident Information")
@@ -459,7 +562,7 @@ with tabs[0]:
         },
         key=f"residents_data_editor_{block_choice}"
     )
-    st.session_state.residents_data_by_block[block_choice] = copy.deepcopy(edited_df.to_dict('records'))
+    st.session_state.residents_data_by_block[block_choice] = edited_df.to_dict('records')
     st.session_state.resident_count_by_block[block_choice] = len(st.session_state.residents_data_by_block[block_choice])
 
     # Remove resident via selectbox and button
@@ -493,7 +596,7 @@ with tabs[0]:
     if uploaded_file is not None and not st.session_state.get(f"residents_csv_uploaded_{block_choice}", False):
         try:
             residents_df = pd.read_csv(uploaded_file, dtype=str).fillna("")
-            st.session_state.residents_data_by_block[block_choice] = copy.deepcopy(residents_df.to_dict('records'))
+            st.session_state.residents_data_by_block[block_choice] = residents_df.to_dict('records')
             st.session_state.resident_count_by_block[block_choice] = len(st.session_state.residents_data_by_block[block_choice])
             st.session_state[f"residents_csv_uploaded_{block_choice}"] = True  # Mark as processed
             st.success("Residents data uploaded successfully!")
@@ -609,7 +712,7 @@ with tabs[2]:
 
     # --- Move the fetch button to the top of the tab ---
     if st.button("Fetch Requests from Gmail"):
-        pto_requests, _ = fetch_requests_from_gmail()  # Only use PTO requests here
+        pto_requests, _, skipped_messages = fetch_requests_from_gmail()  # Only use PTO requests here
         # Only keep requests with Reason == 'PTO' and within block date range
         block_start_str = block_start.strftime("%Y-%m-%d")
         block_end_str = block_end.strftime("%Y-%m-%d")
@@ -646,75 +749,17 @@ with tabs[2]:
             for req in requests:
                 if (req["Start_Date"], req["End_Date"]) not in existing_dates:
                     st.session_state.pto_requests_by_block[block_choice][resident].append(req)
+        st.session_state.constraint_editor_version[block_choice] = st.session_state.constraint_editor_version.get(block_choice, 0) + 1
         msg = f"Fetched and merged PTO requests for {len(grouped_pto)} residents from Gmail."
         st.success(msg)
+        if skipped_messages:
+            st.warning(f"Could not read {len(skipped_messages)} Gmail message(s): "
+                       + "; ".join(f"{msg_id} ({error})" for msg_id, error in skipped_messages))
 
     st.session_state.disable_pto_by_block[block_choice] = st.checkbox("Disable PTO Requests", value=st.session_state.disable_pto_by_block.get(block_choice, False))
 
     if not st.session_state.disable_pto_by_block[block_choice]:
-        if 'pto_requests_by_block' not in st.session_state:
-            st.session_state.pto_requests_by_block = {}
-        
-        # Keep original resident order
-        for resident in [res["Name"] for res in st.session_state.residents_data_by_block[block_choice]]:
-            # Robustly handle both dict and list types for PTO requests
-            if isinstance(st.session_state.pto_requests_by_block[block_choice], dict):
-                requests = st.session_state.pto_requests_by_block[block_choice].get(resident, [])
-            elif isinstance(st.session_state.pto_requests_by_block[block_choice], list):
-                requests = [req for req in st.session_state.pto_requests_by_block[block_choice] if req.get('Resident') == resident]
-            else:
-                requests = []
-            
-            st.markdown(f"### {resident} Hard Constraints")
-            for idx, req in enumerate(requests):
-                col1, col2, col3 = st.columns([1, 1, 0.2])
-                min_date = block_start
-                max_date = block_end
-                raw_start = req.get('Start_Date', min_date)
-                raw_end = req.get('End_Date', min_date)
-                # Convert to date objects before comparison
-                raw_start = ensure_date(raw_start, min_date)
-                raw_end = ensure_date(raw_end, min_date)
-                # Now safe to compare since both are date objects
-                safe_start = raw_start if min_date <= raw_start <= max_date else min_date
-                safe_end = raw_end if min_date <= raw_end <= max_date else min_date
-                with col1:
-                    start_date = st.date_input(
-                        f"Start Date for {resident} #{idx+1}",
-                        value=safe_start,
-                        min_value=min_date,
-                        max_value=max_date,
-                        key=f"pto_start_{resident}_{idx}"
-                    )
-                with col2:
-                    end_date = st.date_input(
-                        f"End Date for {resident} #{idx+1}",
-                        value=safe_end,
-                        min_value=min_date,
-                        max_value=max_date,
-                        key=f"pto_end_{resident}_{idx}"
-                    )
-                with col3:
-                    if st.button("❌", key=f"remove_pto_{resident}_{idx}"):
-                        st.session_state.pending_pto_action = ("remove", resident, idx)
-                # Update the request in session state
-                if isinstance(st.session_state.pto_requests_by_block[block_choice], dict):
-                    st.session_state.pto_requests_by_block[block_choice][resident][idx] = {
-                        "Start_Date": start_date.strftime("%Y-%m-%d"),
-                        "End_Date": end_date.strftime("%Y-%m-%d")
-                    }
-            if st.button(f"Add Another Hard Constraint for {resident}"):
-                st.session_state.pending_pto_action = ("add", resident)
-
-# Process any pending PTO actions after the UI is rendered
-if st.session_state.pending_pto_action:
-    action_type, resident, *args = st.session_state.pending_pto_action
-    if action_type == "add":
-        add_pto_for_resident(resident)
-    elif action_type == "remove":
-        remove_pto_for_resident(resident, args[0])
-    st.session_state.pending_pto_action = None
-    st.rerun()
+        edit_requests('pto_requests_by_block', "pto", "Hard Constraint")
 
 with tabs[3]:
     st.subheader("Soft Constraints")
@@ -722,7 +767,7 @@ with tabs[3]:
 
     # --- Add a fetch button for Non-PTO requests only ---
     if st.button("Fetch Non-PTO Requests from Gmail"):
-        _, non_pto_requests = fetch_requests_from_gmail()  # Only use Non-PTO requests here
+        _, non_pto_requests, skipped_messages = fetch_requests_from_gmail()  # Only use Non-PTO requests here
         print('DEBUG NON-PTO (button):', non_pto_requests)
         # Only keep requests with Reason == 'Non-call' or 'Non-PTO' and within block date range
         block_start_str = block_start.strftime("%Y-%m-%d")
@@ -758,85 +803,19 @@ with tabs[3]:
             for req in requests:
                 if (req["Start_Date"], req["End_Date"]) not in existing_dates:
                     st.session_state.soft_constraints_by_block[block_choice][resident].append(req)
+        st.session_state.constraint_editor_version[block_choice] = st.session_state.constraint_editor_version.get(block_choice, 0) + 1
         msg = f"Fetched and merged Non-PTO requests for {len(grouped_soft)} residents from Gmail."
         if skipped_non_pto_names:
             msg += f" Skipped Non-PTO requests for: {', '.join(skipped_non_pto_names)}."
         st.success(msg)
-
-    def add_soft_constraint_for_resident(resident):
-        st.session_state.soft_constraints_by_block[block_choice].setdefault(resident, []).append({
-            "Start_Date": "",
-            "End_Date": ""
-        })
-
-    def remove_soft_constraint_for_resident(resident, idx):
-        if resident in st.session_state.soft_constraints_by_block[block_choice] and 0 <= idx < len(st.session_state.soft_constraints_by_block[block_choice][resident]):
-            st.session_state.soft_constraints_by_block[block_choice][resident].pop(idx)
-            if not st.session_state.soft_constraints_by_block[block_choice][resident]:
-                del st.session_state.soft_constraints_by_block[block_choice][resident]
+        if skipped_messages:
+            st.warning(f"Could not read {len(skipped_messages)} Gmail message(s): "
+                       + "; ".join(f"{msg_id} ({error})" for msg_id, error in skipped_messages))
 
     st.session_state.disable_soft_constraints_by_block[block_choice] = st.checkbox("Disable Soft Constraints", value=st.session_state.disable_soft_constraints_by_block.get(block_choice, False))
 
     if not st.session_state.disable_soft_constraints_by_block[block_choice]:
-        if 'soft_constraints_by_block' not in st.session_state or not isinstance(st.session_state.soft_constraints_by_block[block_choice], dict):
-            st.session_state.soft_constraints_by_block[block_choice] = {}
-        for resident in [res["Name"] for res in st.session_state.residents_data_by_block[block_choice]]:
-            requests = st.session_state.soft_constraints_by_block[block_choice].get(resident, [])
-            st.markdown(f"### {resident} Soft Constraints")
-            for idx, req in enumerate(requests):
-                col1, col2, col3, col4 = st.columns([1, 0.2, 1, 0.2])
-                min_date = block_start
-                max_date = block_end
-                raw_start = req.get('Start_Date', min_date)
-                raw_end = req.get('End_Date', min_date)
-                prev_start = req.get('_prev_start', raw_start)
-                raw_start = ensure_date(raw_start, min_date)
-                raw_end = ensure_date(raw_end, min_date)
-                prev_start = ensure_date(prev_start, min_date)
-                safe_start = raw_start if min_date <= raw_start <= max_date else min_date
-                safe_end = raw_end if min_date <= raw_end <= max_date else safe_start
-                with col1:
-                    start_date = st.date_input(
-                        f"Start Date for {resident} #{idx+1}",
-                        value=safe_start,
-                        min_value=min_date,
-                        max_value=max_date,
-                        key=f"soft_start_{resident}_{idx}"
-                    )
-                with col2:
-                    if st.button("🔄", key=f"copy_soft_{resident}_{idx}"):
-                        st.session_state.soft_constraints_by_block[block_choice][resident][idx]["End_Date"] = start_date.strftime("%Y-%m-%d")
-                        st.session_state.soft_constraints_by_block[block_choice][resident][idx]["_prev_start"] = start_date
-                        st.rerun()
-                with col3:
-                    end_date = st.date_input(
-                        f"End Date for {resident} #{idx+1}",
-                        value=safe_end,
-                        min_value=min_date,
-                        max_value=max_date,
-                        key=f"soft_end_{resident}_{idx}"
-                    )
-                with col4:
-                    if st.button("❌", key=f"remove_soft_{resident}_{idx}"):
-                        st.session_state.pending_soft_action = ("remove", resident, idx)
-                # Update the request in session state, and track previous start
-                st.session_state.soft_constraints_by_block[block_choice][resident][idx] = {
-                    "Start_Date": start_date.strftime("%Y-%m-%d"),
-                    "End_Date": end_date.strftime("%Y-%m-%d"),
-                    "_prev_start": safe_start  # hidden field to track previous start
-                }
-            if st.button(f"Add Another Soft Constraint for {resident}"):
-                st.session_state.pending_soft_action = ("add", resident)
-
-# Process any pending soft constraint actions after the UI is rendered
-if st.session_state.pending_soft_action:
-    action_type, resident, *args = st.session_state.pending_soft_action
-    if action_type == "add":
-        add_soft_constraint_for_resident(resident)
-    elif action_type == "remove":
-        remove_soft_constraint_for_resident(resident, args[0])
-    st.session_state.pending_soft_action = None
-    st.rerun()
+        edit_requests('soft_constraints_by_block', "soft", "Soft Constraint")
 
 with tabs[4]:
     st.subheader("Previous Block End Assignments")
@@ -897,158 +876,68 @@ with tabs[4]:
 
 with tabs[5]:
     st.subheader("Previous Call Counts")
-    
-    if block_choice == "Block 1":
+    call_ledger = get_call_ledger(academic_year)
+    prior_blocks = previous_blocks(block_choice)
+
+    if not prior_blocks:
         st.info("No previous call counts needed for Block 1.")
     else:
-        st.info("Please upload the call statistics CSV file(s) from the previous block(s). For Block 2, upload Block 1's statistics. For Block 3, upload both Block 1 and Block 2's statistics.")
-        
-        # Initialize previous call counts in session state if not exists
-        if 'previous_call_counts_by_block' not in st.session_state:
-            st.session_state.previous_call_counts_by_block = {}
-        
-        # File upload section (CSV only)
+        missing_blocks = [b for b in prior_blocks if b not in call_ledger.blocks()]
+        if missing_blocks:
+            st.info(f"Call counts are recorded automatically when a block is generated. For {', '.join(missing_blocks)} generated elsewhere, upload the call statistics CSV file(s) instead.")
+        else:
+            st.success(f"Using the recorded call counts for {', '.join(prior_blocks)}.")
+
+        # File upload section (CSV only), for blocks generated outside this app
         uploaded_files = st.file_uploader(
             "Upload previous block call statistics (CSV)",
             type=['csv'],
-            accept_multiple_files=True if block_choice == "Block 3" else False
+            accept_multiple_files=True
         )
-        
+
         if uploaded_files:
             try:
-                # Always treat uploaded_files as a list for uniform processing
-                files = uploaded_files if isinstance(uploaded_files, list) else [uploaded_files]
+                # Match files to blocks by filename (call_statistics_block_1.csv, ...)
                 block_file_map = {}
-                if block_choice == "Block 3":
-                    # Try to auto-detect block from filename
-                    for file in files:
-                        fname = file.name.lower()
-                        if "block_1" in fname:
-                            block_file_map["Block 1"] = file
-                        elif "block_2" in fname:
-                            block_file_map["Block 2"] = file
-                    # If not both found, prompt user to assign
-                    missing_blocks = [b for b in ["Block 1", "Block 2"] if b not in block_file_map]
-                    if missing_blocks:
-                        for b in missing_blocks:
-                            st.warning(f"Please assign a file for {b}.")
-                            file_options = [file.name for file in files if file.name not in [f.name for f in block_file_map.values()]]
-                            selected_file = st.selectbox(f"Select file for {b}", file_options, key=f"select_{b}")
-                            for file in files:
-                                if file.name == selected_file:
-                                    block_file_map[b] = file
-                                    break
-                    # Now process each file for its block
-                    for b, file in block_file_map.items():
-                        if hasattr(file, 'seek'):
-                            file.seek(0)
-                            df = pd.read_csv(file)
-                        else:
-                            s = file.decode('utf-8')
-                            df = pd.read_csv(io.StringIO(s))
-                        # Ensure all expected columns are present
-                        for col in ['Resident', 'Weekday', 'Fridays', 'Saturday', 'Sunday', 'Total']:
-                            if col not in df.columns:
-                                df[col] = 0
-                        all_counts = {}
-                        for _, row in df.iterrows():
-                            resident = norm_name(row['Resident'])
-                            display_name = str(row['Resident']).strip()
-                            if resident not in all_counts:
-                                all_counts[resident] = {
-                                    'display_name': display_name,
-                                    'Weekday': safe_int_nan(row.get('Weekday', 0)),
-                                    'Fridays': safe_int_nan(row.get('Fridays', 0)),
-                                    'Saturday': safe_int_nan(row.get('Saturday', 0)),
-                                    'Sunday': safe_int_nan(row.get('Sunday', 0)),
-                                    'Total': safe_int_nan(row.get('Total', 0))
-                                }
-                            else:
-                                all_counts[resident]['Weekday'] += safe_int_nan(row.get('Weekday', 0))
-                                all_counts[resident]['Fridays'] += safe_int_nan(row.get('Fridays', 0))
-                                all_counts[resident]['Saturday'] += safe_int_nan(row.get('Saturday', 0))
-                                all_counts[resident]['Sunday'] += safe_int_nan(row.get('Sunday', 0))
-                                all_counts[resident]['Total'] += safe_int_nan(row.get('Total', 0))
-                        st.session_state.previous_call_counts_by_block[b] = all_counts
-                    st.success("Successfully processed previous call counts!")
-                else:
-                    # Block 2 or other: just process the first file for this block
-                    file = files[0]
-                    if hasattr(file, 'seek'):
-                        file.seek(0)
-                        df = pd.read_csv(file)
+                for file in uploaded_files:
+                    fname = file.name.lower()
+                    for b in prior_blocks:
+                        if b.lower().replace(' ', '_') in fname:
+                            block_file_map[b] = file
+                for b in prior_blocks:
+                    if b in block_file_map:
+                        continue
+                    file_options = [file.name for file in uploaded_files if file not in block_file_map.values()]
+                    if not file_options:
+                        continue
+                    if len(prior_blocks) == 1:
+                        selected_file = file_options[0]
                     else:
-                        s = file.decode('utf-8')
-                        df = pd.read_csv(io.StringIO(s))
-                    for col in ['Resident', 'Weekday', 'Fridays', 'Saturday', 'Sunday', 'Total']:
-                        if col not in df.columns:
-                            df[col] = 0
-                    all_counts = {}
-                    for _, row in df.iterrows():
-                        resident = norm_name(row['Resident'])
-                        display_name = str(row['Resident']).strip()
-                        if resident not in all_counts:
-                            all_counts[resident] = {
-                                'display_name': display_name,
-                                'Weekday': safe_int_nan(row.get('Weekday', 0)),
-                                'Fridays': safe_int_nan(row.get('Fridays', 0)),
-                                'Saturday': safe_int_nan(row.get('Saturday', 0)),
-                                'Sunday': safe_int_nan(row.get('Sunday', 0)),
-                                'Total': safe_int_nan(row.get('Total', 0))
-                            }
-                        else:
-                            all_counts[resident]['Weekday'] += safe_int_nan(row.get('Weekday', 0))
-                            all_counts[resident]['Fridays'] += safe_int_nan(row.get('Fridays', 0))
-                            all_counts[resident]['Saturday'] += safe_int_nan(row.get('Saturday', 0))
-                            all_counts[resident]['Sunday'] += safe_int_nan(row.get('Sunday', 0))
-                            all_counts[resident]['Total'] += safe_int_nan(row.get('Total', 0))
-                    st.session_state.previous_call_counts_by_block[block_choice] = all_counts
-                    st.success("Successfully processed previous call counts!")
+                        st.warning(f"Please assign a file for {b}.")
+                        selected_file = st.selectbox(f"Select file for {b}", file_options, key=f"select_{b}")
+                    block_file_map[b] = next(file for file in uploaded_files if file.name == selected_file)
+                pgy_lookup = {norm_name(res['Name']): int(res['PGY'])
+                              for res in st.session_state.residents_data_by_block[block_choice]}
+                for b, file in block_file_map.items():
+                    file.seek(0)
+                    call_ledger.record_statistics(b, pd.read_csv(file), pgy_lookup)
+                st.success("Successfully processed previous call counts!")
             except Exception as e:
                 st.error(f"Error processing files: {str(e)}")
                 st.error("Please make sure you're uploading the correct call statistics CSV files.")
-        else:
-            st.warning("Please upload the call statistics CSV file(s) from the previous block(s).")
-
-    # After the previous call counts upload section, add a new tab for Block 2 and 3 to display the uploaded previous call counts
-    if block_choice in ["Block 2", "Block 3"]:
-        prev_counts = st.session_state.previous_call_counts_by_block.get(block_choice, {})
-        if prev_counts:
-            st.markdown("### Uploaded Previous Call Counts")
-            # Organize by PGY for display
-            prev_by_pgy = {1: [], 2: [], 3: [], 4: []}
-            for resident, stats in prev_counts.items():
-                pgy = stats.get('PGY', None)
-                # If PGY is not in the uploaded file, try to infer from current block's resident list
-                if pgy is None:
-                    for res in st.session_state.residents_data_by_block[block_choice]:
-                        if norm_name(res['Name']) == resident:
-                            pgy = int(res['PGY'])
-                            break
-                if pgy is None:
-                    continue
-                row = {
-                    'Resident': stats.get('display_name', resident),
-                    'Weekday': stats.get('Weekday', 0),
-                    'Fridays': stats.get('Fridays', 0),
-                    'Saturday': stats.get('Saturday', 0),
-                    'Sunday': stats.get('Sunday', 0),
-                    'Total': stats.get('Total', 0)
-                }
-                prev_by_pgy[pgy].append(row)
-            for pgy in [1, 2, 3, 4]:
-                if prev_by_pgy[pgy]:
+
+        previous_counts = call_ledger.fairness_counts(prior_blocks)
+        if not previous_counts.empty:
+            st.markdown("### Previous Call Counts")
+            for pgy in RULES.pgy_levels:
+                pgy_df = previous_counts[previous_counts['PGY'] == pgy]
+                if not pgy_df.empty:
                     st.markdown(f"#### PGY-{pgy} Previous Call Counts")
-                    df = pd.DataFrame(prev_by_pgy[pgy])
-                    if pgy == 1:
-                        display_cols = ['Weekday', 'Saturday', 'Total']
-                    elif pgy == 2:
-                        display_cols = ['Weekday', 'Fridays', 'Sunday', 'Total']
-                    elif pgy == 3:
-                        display_cols = ['Weekday', 'Saturday', 'Total']
-                    elif pgy == 4:
-                        display_cols = ['Total']
-                    st.dataframe(df.set_index('Resident')[display_cols], use_container_width=True)
+                    display_cols = RULES.stat_columns[pgy]
+                    st.dataframe(pgy_df.set_index('Resident')[display_cols], use_container_width=True)
+
+# Save this block's inputs so the app can restart without re-entering them
+save_data(academic_year, block_choice)
 
 with tabs[6]:
     st.subheader("Generate & Review")
@@ -1105,23 +994,13 @@ with tabs[6]:
         checklist.append("ℹ️ Previous Block: Not required")
 
     # Previous Call Counts (if required)
-    if block_choice == "Block 2":
-        prev_counts = st.session_state.previous_call_counts_by_block.get(block_choice, {})
-        uploaded = 1 if prev_counts else 0
-        if uploaded == 1:
-            checklist.append("✅ Previous Call Counts: 1/1 uploaded")
-        else:
-            checklist.append("❌ Previous Call Counts: 0/1 uploaded")
-            all_complete = False
-            missing_items.append("Previous Call Counts")
-    elif block_choice == "Block 3":
-        prev1 = st.session_state.previous_call_counts_by_block.get("Block 1", {})
-        prev2 = st.session_state.previous_call_counts_by_block.get("Block 2", {})
-        uploaded = int(bool(prev1)) + int(bool(prev2))
-        if uploaded == 2:
-            checklist.append("✅ Previous Call Counts: 2/2 uploaded")
+    prior_blocks = previous_blocks(block_choice)
+    if prior_blocks:
+        recorded = [b for b in prior_blocks if b in get_call_ledger(academic_year).blocks()]
+        if len(recorded) == len(prior_blocks):
+            checklist.append(f"✅ Previous Call Counts: {len(recorded)}/{len(prior_blocks)} recorded")
         else:
-            checklist.append(f"❌ Previous Call Counts: {uploaded}/2 uploaded")
+            checklist.append(f"❌ Previous Call Counts: {len(recorded)}/{len(prior_blocks)} recorded")
             all_complete = False
             missing_items.append("Previous Call Counts")
     else:
@@ -1135,11 +1014,14 @@ with tabs[6]:
         st.warning(f"Please complete the following before generating the schedule: {', '.join(missing_items)}")
 
     # --- On Generate Schedule Button Press ---
-    if st.button("Generate Schedule", disabled=not all_complete):
+    generate_clicked = st.button("Generate Schedule", disabled=not all_complete)
+    # Results are memoized on the inputs; this runs a fresh search for the same inputs
+    regenerate_clicked = st.button("Generate a Different Schedule", disabled=not all_complete)
+    if regenerate_clicked:
+        st.session_state.generation_attempt_by_block[block_choice] = st.session_state.generation_attempt_by_block.get(block_choice, 0) + 1
+    if generate_clicked or regenerate_clicked:
         # Clear previous results for this block only
-        for key in [
-            'last_schedule_df_by_block', 'last_stats_by_block', 'last_excel_file_by_block', 'last_block_name_by_block', 'last_success_by_block',
-            'last_call_distribution_by_block', 'last_pgy_stats_by_block', 'last_csv_buffer_by_block', 'last_soft_constraint_stats_by_block', 'show_results_by_block']:
+        for key in RESULT_KEYS:
             if key in st.session_state and block_choice in st.session_state[key]:
                 del st.session_state[key][block_choice]
 
@@ -1153,12 +1035,7 @@ with tabs[6]:
             with st.spinner("Generating schedule..."):
                 try:
                     # Transform the form data into the format expected by the engine
-                    residents_df = pd.DataFrame([{
-                        'Resident': res['Name'],
-                        'PGY': res['PGY'],
-                        'Transition Date': res['Transition_Date'],
-                        'Transition PGY': min(int(res['PGY']) + 1, 4) if res['Transition_Date'] else None
-                    } for res in st.session_state.residents_data_by_block[block_choice]])
+                    residents_df, prev_df, holidays_df, pto_df, soft_constraints_df = engine_tables_for_block(block_choice)
                     # Validate transition dates are within the block
                     for _, row in residents_df.iterrows():
                         if pd.notna(row['Transition Date']):
@@ -1177,127 +1054,48 @@ with tabs[6]:
                                 trans_date = dt_type.combine(trans_date, dt_type.min.time())
                             if not (bsd <= trans_date <= bed):
                                 st.warning(f"Transition date for {row['Resident']} ({row['Transition Date']}) is outside the selected block period.")
-                    # Create previous assignments DataFrame if needed
-                    prev_df = None
-                    if block_info[block_choice]['requires_previous'] and st.session_state.previous_assignments_by_block[block_choice]:
-                        prev_df = pd.DataFrame(st.session_state.previous_assignments_by_block[block_choice])
-                    # Transform holiday assignments into the format expected by the engine
-                    holidays_df = pd.DataFrame([{
-                        'Date': holiday['Date'],
-                        'Call': holiday['Call'],
-                        'Backup': holiday['Backup']
-                    } for holiday in st.session_state.holiday_assignments_by_block[block_choice]]) if not st.session_state.disable_holidays_by_block[block_choice] and st.session_state.holiday_assignments_by_block[block_choice] else pd.DataFrame(columns=['Date', 'Call', 'Backup'])
-                    # Transform PTO requests into the format expected by the engine
-                    pto_df = pd.DataFrame()
-                    if not st.session_state.disable_pto_by_block[block_choice] and st.session_state.pto_requests_by_block[block_choice]:
-                        pto_data = []
-                        for resident, requests in st.session_state.pto_requests_by_block[block_choice].items():
-                            for req in requests:
-                                pto_data.append({
-                                    'Resident': resident,
-                                    'Start Date': req['Start_Date'],
-                                    'End Date': req['End_Date']
-                                })
-                        pto_df = pd.DataFrame(pto_data)
-                    # Transform soft constraints into the format expected by the engine
-                    soft_constraints_df = pd.DataFrame()
-                    if not st.session_state.disable_soft_constraints_by_block[block_choice] and st.session_state.soft_constraints_by_block[block_choice]:
-                        soft_data = []
-                        for resident, requests in st.session_state.soft_constraints_by_block[block_choice].items():
-                            for req in requests:
-                                soft_data.append({
-                                    'Resident': resident,
-                                    'Start Date': req['Start_Date'],
-                                    'End Date': req['End_Date']
-                                })
-                        soft_constraints_df = pd.DataFrame(soft_data)
-                    # Fix previous_call_counts logic for each block
-                    if block_choice == "Block 2":
-                        block1_prev = st.session_state.previous_call_counts_by_block.get(block_choice, {})
-                        prev_counts_for_engine = {}
-                        for res in st.session_state.residents_data_by_block[block_choice]:
-                            name = res['Name']
-                            norm = norm_name(name)
-                            if norm in block1_prev:
-                                prev_counts_for_engine[norm] = {
-                                    "Weekday": block1_prev[norm].get("Weekday", 0),
-                                    "Fridays": block1_prev[norm].get("Fridays", 0),
-                                    "Saturday": block1_prev[norm].get("Saturday", 0),
-                                    "Sunday": block1_prev[norm].get("Sunday", 0),
-                                    "Total": block1_prev[norm].get("Total", 0)
-                                }
-                            else:
-                                prev_counts_for_engine[norm] = {
-                                    "Weekday": 0,
-                                    "Fridays": 0,
-                                    "Saturday": 0,
-                                    "Sunday": 0,
-                                    "Total": 0
-                                }
-                    elif block_choice == "Block 3":
-                        prev1 = st.session_state.previous_call_counts_by_block.get("Block 1", {})
-                        prev2 = st.session_state.previous_call_counts_by_block.get("Block 2", {})
-                        prev_counts_for_engine = {}
-                        for res in st.session_state.residents_data_by_block[block_choice]:
-                            name = res['Name']
-                            norm = norm_name(name)
-                            prev_counts_for_engine[norm] = {
-                                "Weekday": prev1.get(norm, {}).get("Weekday", 0) + prev2.get(norm, {}).get("Weekday", 0),
-                                "Fridays": prev1.get(norm, {}).get("Fridays", 0) + prev2.get(norm, {}).get("Fridays", 0),
-                                "Saturday": prev1.get(norm, {}).get("Saturday", 0) + prev2.get(norm, {}).get("Saturday", 0),
-                                "Sunday": prev1.get(norm, {}).get("Sunday", 0) + prev2.get(norm, {}).get("Sunday", 0),
-                                "Total": prev1.get(norm, {}).get("Total", 0) + prev2.get(norm, {}).get("Total", 0)
-                            }
+                    # Counts of the earlier blocks of the year, from the call ledger
+                    if prior_blocks:
+                        prev_counts_for_engine = get_call_ledger(academic_year).previous_call_counts(prior_blocks)
                     else:
                         prev_counts_for_engine = None
-                    # Run the scheduling engine with selected dates and pgy4_cap
-                    schedule_df = run_scheduling_engine(
+                    # Run the scheduling engine with selected dates and pgy4_cap (memoized on the inputs)
+                    schedule_df = cached_engine_run(
                         prev_df,
                         residents_df,
                         pto_df,
                         holidays_df,
                         block_start_dt,
                         block_end_dt,
-                        pgy4_cap=pgy4_cap,
-                        previous_call_counts=prev_counts_for_engine,
-                        soft_constraints=soft_constraints_df,
-                        fairness_weight=fairness_weight,
-                        soft_constraint_weight=soft_constraint_weight
+                        pgy4_cap,
+                        prev_counts_for_engine,
+                        soft_constraints_df,
+                        fairness_weight,
+                        soft_constraint_weight,
+                        attempt=st.session_state.generation_attempt_by_block.get(block_choice, 0)
                     )
                     # Get soft constraint statistics
                     soft_constraint_stats = schedule_df.attrs.get('soft_constraint_stats', {})
-                    # Calculate call distribution
-                    call_distribution = calculate_call_distribution(schedule_df, block_end_dt)
-                    # Convert call distribution to pgy_stats format
-                    pgy_stats = {1: [], 2: [], 3: [], 4: []}
-                    for _, row in call_distribution.iterrows():
-                        pgy = int(row['PGY'])
-                        stats = {
-                            'Resident': row['Resident'],
-                            'Weekday': row.get('Weekday', 0),
-                            'Fridays': row.get('Fridays', 0),
-                            'Saturday': row.get('Saturday', 0),
-                            'Sunday': row.get('Sunday', 0),
-                            'Total': row['Total']
-                        }
-                        pgy_stats[pgy].append(stats)
-                    # Format the schedule
-                    wb = format_schedule(schedule_df, schedule_df, schedule_df)  # Using same schedule for all blocks
-                    # Save to BytesIO
-                    excel_file = BytesIO()
-                    wb.save(excel_file)
-                    excel_file.seek(0)
-                    # Store in session state
-                    st.session_state['last_schedule_df_by_block'][block_choice] = schedule_df
-                    st.session_state['last_stats_by_block'][block_choice] = pgy_stats
-                    st.session_state['last_excel_file_by_block'][block_choice] = excel_file.getvalue()
-                    st.session_state['last_block_name_by_block'][block_choice] = block_choice.lower().replace(' ', '_')
-                    st.session_state['last_success_by_block'][block_choice] = True
-                    st.session_state['last_call_distribution_by_block'][block_choice] = call_distribution
-                    st.session_state['last_pgy_stats_by_block'][block_choice] = pgy_stats
-                    st.session_state['last_csv_buffer_by_block'][block_choice] = call_distribution.to_csv(index=False)
-                    st.session_state['last_soft_constraint_stats_by_block'][block_choice] = soft_constraint_stats
-                    st.session_state['show_results_by_block'][block_choice] = True
+                    # Calculate call distribution and store the results for this block
+                    final_pgy = publish_block_results(block_choice, schedule_df, block_end_dt)
+                    # Record the block in the call ledger and save the schedule
+                    get_call_ledger(academic_year).record_block(block_choice, schedule_df, final_pgy)
+                    get_store().save_schedule(academic_year, block_choice, schedule_df, soft_constraint_stats)
+                    tight_days = schedule_df.attrs.get('feasibility_issues', [])
+                    if tight_days:
+                        st.warning(f"Schedule generated, but {len(tight_days)} date(s) have almost no scheduling room left.")
+                        st.dataframe(pd.DataFrame(tight_days), use_container_width=True)
+                except ScheduleValidationError as e:
+                    st.session_state['last_success_by_block'][block_choice] = False
+                    st.session_state['show_results_by_block'][block_choice] = False
+                    st.error(f"{str(e)} The schedule was not saved.")
+                    st.dataframe(pd.DataFrame(e.issues), use_container_width=True)
+                except InfeasibleScheduleError as e:
+                    st.session_state['last_success_by_block'][block_choice] = False
+                    st.session_state['show_results_by_block'][block_choice] = False
+                    st.error(f"{str(e)} Adjust the constraints for the dates below and try again.")
+                    if e.issues:
+                        st.dataframe(pd.DataFrame(e.issues), use_container_width=True)
                 except Exception as e:
                     st.session_state['last_success_by_block'][block_choice] = False
                     st.session_state['show_results_by_block'][block_choice] = False
@@ -1309,20 +1107,14 @@ with tabs[6]:
     if st.session_state['show_results_by_block'].get(block_choice) and \
        block_choice in st.session_state['last_call_distribution_by_block'] and \
        block_choice in st.session_state['last_pgy_stats_by_block'] and \
-       block_choice in st.session_state['last_excel_file_by_block'] and \
-       block_choice in st.session_state['last_csv_buffer_by_block']:
+       block_choice in st.session_state['last_schedule_df_by_block']:
         call_distribution = st.session_state['last_call_distribution_by_block'][block_choice]
         pgy_stats = st.session_state['last_pgy_stats_by_block'][block_choice]
-        excel_file_bytes = st.session_state['last_excel_file_by_block'][block_choice]
-        csv_buffer_val = st.session_state['last_csv_buffer_by_block'][block_choice]
+        block_schedule_df = st.session_state['last_schedule_df_by_block'][block_choice]
         soft_constraint_stats = st.session_state['last_soft_constraint_stats_by_block'].get(block_choice, {})
-        # Fix previous_counts for running total tab
-        if block_choice in ["Block 2", "Block 3"]:
-            previous_counts = st.session_state.previous_call_counts_by_block.get(block_choice, {})
-        else:
-            previous_counts = {}
         # Tabs: Call Distribution, Running Total (if applicable), Soft Constraint Results, Download
-        show_running_total = block_choice in ["Block 2", "Block 3"]
+        prior_blocks = previous_blocks(block_choice)
+        show_running_total = bool(prior_blocks)
         if show_running_total:
             tab1, tab2, tab3, tab4 = st.tabs(["Call Distribution", "Running Total", "Soft Constraint Results", "Download"])
         else:
@@ -1333,63 +1125,20 @@ with tabs[6]:
                 st.markdown(f"### PGY-{pgy}")
                 pgy_df = call_distribution[call_distribution['PGY'] == pgy]
                 if not pgy_df.empty:
-                    if pgy == 1:
-                        display_cols = ['Weekday', 'Saturday', 'Total']
-                    elif pgy == 2:
-                        display_cols = ['Weekday', 'Fridays', 'Sunday', 'Total']
-                    elif pgy == 3:
-                        display_cols = ['Weekday', 'Saturday', 'Total']
-                    elif pgy == 4:
-                        display_cols = ['Total']
+                    display_cols = RULES.stat_columns[pgy]
                     st.dataframe(pgy_df.set_index('Resident')[display_cols], use_container_width=True)
                 else:
                     st.info(f"No PGY-{pgy} residents")
         if show_running_total and tab2 is not None:
             with tab2:
                 st.subheader("Running Total (All Blocks)")
-                running_totals = {1: [], 2: [], 3: [], 4: []}
-                for pgy in [1, 2, 3, 4]:
-                    current_stats = {norm_name(s['Resident']): s for s in pgy_stats[pgy]}
-                    prev_stats = {}
-                    for k, v in previous_counts.items():
-                        prev_pgy = v.get('PGY')
-                        if prev_pgy is None:
-                            for res in st.session_state.residents_data_by_block[block_choice]:
-                                if norm_name(res['Name']) == k:
-                                    prev_pgy = int(res['PGY'])
-                                    break
-                        if prev_pgy == pgy:
-                            prev_stats[k] = v
-                    all_names = set(current_stats.keys()) | set(prev_stats.keys())
-                    for name in all_names:
-                        display_name = current_stats.get(name, prev_stats.get(name, {})).get('Resident', prev_stats.get(name, {}).get('display_name', name))
-                        weekday = safe_int_nan(current_stats.get(name, {}).get('Weekday', 0)) + safe_int_nan(prev_stats.get(name, {}).get('Weekday', 0))
-                        fridays = safe_int_nan(current_stats.get(name, {}).get('Fridays', 0)) + safe_int_nan(prev_stats.get(name, {}).get('Fridays', 0))
-                        saturday = safe_int_nan(current_stats.get(name, {}).get('Saturday', 0)) + safe_int_nan(prev_stats.get(name, {}).get('Saturday', 0))
-                        sunday = safe_int_nan(current_stats.get(name, {}).get('Sunday', 0)) + safe_int_nan(prev_stats.get(name, {}).get('Sunday', 0))
-                        total = safe_int_nan(current_stats.get(name, {}).get('Total', 0)) + safe_int_nan(prev_stats.get(name, {}).get('Total', 0))
-                        total_stats = {
-                            'Resident': display_name,
-                            'Weekday': weekday,
-                            'Fridays': fridays,
-                            'Saturday': saturday,
-                            'Sunday': sunday,
-                            'Total': total
-                        }
-                        running_totals[pgy].append(total_stats)
-                for pgy in [1, 2, 3, 4]:
+                running_totals = get_call_ledger(academic_year).running_totals(call_distribution, prior_blocks)
+                for pgy in RULES.pgy_levels:
                     st.markdown(f"### PGY-{pgy} Running Total")
-                    if running_totals[pgy]:
-                        df = pd.DataFrame(running_totals[pgy])
-                        if pgy == 1:
-                            display_cols = ['Weekday', 'Saturday', 'Total']
-                        elif pgy == 2:
-                            display_cols = ['Weekday', 'Fridays', 'Sunday', 'Total']
-                        elif pgy == 3:
-                            display_cols = ['Weekday', 'Saturday', 'Total']
-                        elif pgy == 4:
-                            display_cols = ['Total']
-                        st.dataframe(df.set_index('Resident')[display_cols], use_container_width=True)
+                    pgy_df = running_totals[running_totals['PGY'] == pgy]
+                    if not pgy_df.empty:
+                        display_cols = RULES.stat_columns[pgy]
+                        st.dataframe(pgy_df.set_index('Resident')[display_cols], use_container_width=True)
                     else:
                         st.info(f"No PGY-{pgy} residents")
         with tab3:
@@ -1409,17 +1158,53 @@ with tabs[6]:
                 st.info("No soft constraints were provided for this schedule.")
         with tab4:
             st.markdown("### Download Schedule and Call Statistics")
-            st.download_button(
-                label="Download Schedule",
-                data=excel_file_bytes,
-                file_name=f"call_schedule_{block_choice.lower().replace(' ', '_')}.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                key=f"download_schedule_{block_choice.lower().replace(' ', '_')}_downloadtab"
+            block_slug = block_choice.lower().replace(' ', '_')
+            download_on_request(
+                "Download Schedule",
+                f"schedule_{block_slug}",
+                lambda: render_schedule_excel(block_schedule_df),
+                f"call_schedule_{block_slug}.xlsx",
+                "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
+            download_on_request(
+                "Download All Generated Blocks",
+                f"all_blocks_{academic_year}",
+                lambda: render_all_blocks_excel(academic_year),
+                f"call_schedule_{academic_year.replace('-', '_')}_all_blocks.xlsx",
+                "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
+            download_on_request(
+                "Download Calendar Feeds (iCalendar + CSV per resident)",
+                f"calendars_{block_slug}",
+                lambda: render_calendar_feeds(block_schedule_df, f"Call Schedule {block_choice}"),
+                f"call_calendars_{block_slug}.zip",
+                "application/zip"
             )
             st.download_button(
                 label="Download Call Statistics (CSV)",
-                data=csv_buffer_val,
-                file_name=f"call_statistics_{block_choice.lower().replace(' ', '_')}.csv",
+                data=call_distribution.to_csv(index=False),
+                file_name=f"call_statistics_{block_slug}.csv",
                 mime="text/csv",
-                key=f"download_csv_{block_choice.lower().replace(' ', '_')}_downloadtab"
-            ) 
+                key=f"download_csv_{block_slug}_downloadtab"
+            )
+
+    # --- Validate an uploaded or hand-edited schedule against this block's inputs ---
+    st.markdown("### Validate a Schedule")
+    uploaded_schedule = st.file_uploader(
+        "Upload a schedule (CSV or Excel with Date, Call, Backup and Intern columns)",
+        type=["csv", "xlsx"], key=f"validate_schedule_{block_choice.lower().replace(' ', '_')}")
+    if uploaded_schedule is not None:
+        try:
+            if uploaded_schedule.name.lower().endswith(".csv"):
+                uploaded_df = pd.read_csv(uploaded_schedule)
+            else:
+                uploaded_df = pd.read_excel(uploaded_schedule)
+            residents_df, prev_df, holidays_df, pto_df, _ = engine_tables_for_block(block_choice)
+            issues = validate_uploaded_schedule(uploaded_df, residents_df, pto_df, holidays_df, prev_df, pgy4_cap=pgy4_cap)
+            if issues:
+                st.error(f"{len(issues)} hard-rule violation(s) found.")
+                st.dataframe(pd.DataFrame(issues), use_container_width=True)
+            else:
+                st.success(f"Schedule is valid: {len(uploaded_df)} day(s) checked.")
+        except Exception as e:
+            st.error(f"Could not validate the uploaded schedule: {str(e)}")
@@ -0,0 +1,120 @@
+# call_stats.py
+
+# Call distribution statistics for a finished schedule. The schedule is
+# turned into one long (Date, Role, Resident) table with the weekday worked
+# out once per date, so every count is a single groupby. Nothing here reads
+# Streamlit state: the app, the CLI and the batch tools pass the roster in.
+#
+#   final_pgy = final_pgy_lookup(residents, block_end)
+#   call_distribution(schedule_df, final_pgy)
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from call_rules import RULES, DAY_TYPE_COLUMNS
+
+ROLES = ["Call", "Backup", "Intern"]
+STAT_COLUMNS = list(DAY_TYPE_COLUMNS.values()) + ["Total"]
+
+
+def final_pgy_lookup(residents, block_end=None, rules=RULES):
+    """Resident -> PGY at the end of a block.
+
+    ``residents`` is a list of roster records with Name, PGY and an optional
+    Transition_Date ('YYYY-MM-DD'); a transition on or before ``block_end``
+    moves the resident up one level.
+    """
+    top = max(rules.pgy_levels)
+    lookup = {}
+    for res in residents:
+        pgy = int(res['PGY'])
+        transition_date = res.get('Transition_Date')
+        if block_end is not None and transition_date and pd.notna(transition_date):
+            try:
+                if datetime.strptime(str(transition_date)[:10], "%Y-%m-%d") <= block_end:
+                    pgy = min(pgy + 1, top)
+            except ValueError:
+                pass
+        lookup[res['Name']] = pgy
+    return lookup
+
+
+def assignments(schedule_df, rules=RULES):
+    """The schedule as one row per assignment: Date, Role, Resident, Weekday and DayType.
+
+    Interns' day types follow the intern table; call and backup use the call table.
+    """
+    dates = pd.to_datetime(schedule_df['Date'])
+    weekdays = dates.dt.weekday.to_numpy()
+    call_types = np.array(rules.day_type, dtype=object)
+    intern_types = np.array(rules.intern_day_type, dtype=object)
+    frames = []
+    for role in ROLES:
+        if role not in schedule_df.columns:
+            continue
+        names = schedule_df[role].to_numpy(dtype=object)
+        present = pd.notna(names) & (names != "")
+        frames.append(pd.DataFrame({
+            'Date': dates.to_numpy()[present],
+            'Role': role,
+            'Resident': names[present],
+            'Weekday': weekdays[present],
+            'DayType': (intern_types if role == "Intern" else call_types)[weekdays[present]],
+        }))
+    if not frames:
+        return pd.DataFrame({'Date': dates[:0].to_numpy(), 'Role': [], 'Resident': [],
+                             'Weekday': weekdays[:0], 'DayType': []})
+    return pd.concat(frames, ignore_index=True)
+
+
+def _day_type_counts(long_df, keys):
+    counts = (long_df.groupby(keys + ['DayType']).size()
+              .unstack('DayType', fill_value=0)
+              .rename(columns=DAY_TYPE_COLUMNS)
+              .reindex(columns=STAT_COLUMNS[:-1], fill_value=0)
+              .rename_axis(columns=None))
+    counts['Total'] = counts.sum(axis=1)
+    return counts
+
+
+def role_counts(schedule_df, rules=RULES):
+    """Weekday/Fridays/Saturday/Sunday/Total counts for every (Resident, Role) in one groupby."""
+    return _day_type_counts(assignments(schedule_df, rules), ['Resident', 'Role'])
+
+
+def call_distribution(schedule_df, final_pgy, rules=RULES):
+    """Call distribution per resident, bucketed for their PGY at the end of the block.
+
+    ``final_pgy`` maps resident -> PGY (see final_pgy_lookup). Residents on
+    the final intern level count their intern days plus any call days by
+    intern day type; everyone else counts call days by call day type. Each
+    row has Resident, the day-type columns that PGY is balanced on (the
+    others are left empty), Total and PGY, in roster order within each PGY.
+    Residents in the schedule without a known PGY are skipped.
+    """
+    long_df = assignments(schedule_df, rules)
+    intern_level = (long_df['Resident'].map(final_pgy) == rules.intern_pgy).to_numpy()
+    role = long_df['Role'].to_numpy()
+    counted = long_df[(role == "Call") | (intern_level & (role == "Intern"))].copy()
+    # Interns' call days are bucketed by the intern table, once per date
+    intern_rows = intern_level[(role == "Call") | (intern_level & (role == "Intern"))]
+    intern_types = np.array(rules.intern_day_type, dtype=object)
+    counted['DayType'] = np.where(intern_rows, intern_types[counted['Weekday'].to_numpy()], counted['DayType'])
+    counted = counted.drop_duplicates(['Resident', 'Date'])
+    counts = _day_type_counts(counted, ['Resident'])
+
+    order = {name: i for i, name in enumerate(final_pgy)}
+    known = sorted((name for name in pd.unique(long_df['Resident'])
+                    if final_pgy.get(name) in rules.stat_columns),
+                   key=lambda name: (final_pgy[name], order[name]))
+    if not known:
+        return pd.DataFrame()
+    result = counts.reindex(known, fill_value=0).rename_axis('Resident').reset_index()
+    result['PGY'] = [final_pgy[name] for name in known]
+    # Only the day types each PGY is balanced on are reported
+    for column in STAT_COLUMNS[:-1]:
+        levels = [pgy for pgy in rules.pgy_levels if column in rules.stat_columns[pgy]]
+        result[column] = result[column].where(result['PGY'].isin(levels))
+    return result
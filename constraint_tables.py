@@ -0,0 +1,103 @@
+# constraint_tables.py
+
+# PTO and soft-constraint requests as one editable table per block. The app
+# keeps requests as {resident: [{"Start_Date", "End_Date"}, ...]}; the
+# Hard/Soft Constraints tabs show them as a single Resident / Start Date /
+# End Date frame and write the edited frame back in one batch, with the dates
+# parsed, ordered and clipped to the block column-wise instead of per widget.
+#
+#   table = requests_frame(requests_by_resident, roster)
+#   requests_by_resident, dropped = frame_requests(edited, roster, block_start, block_end,
+#                                                  stored=requests_by_resident)
+
+import pandas as pd
+
+REQUEST_COLUMNS = ["Resident", "Start Date", "End Date"]
+
+# Date formats accepted in stored and e-mailed requests (same as gmail_fetcher.ensure_date)
+DATE_FORMATS = ["%Y-%m-%d", "%m/%d/%y", "%m/%d/%Y"]
+
+
+def parse_dates(values):
+    """Parse a column of dates, strings in DATE_FORMATS or blanks; unparseable values become NaT."""
+    values = pd.Series(values, dtype=object)
+    is_date = values.map(lambda v: hasattr(v, "year"))
+    parsed = pd.to_datetime(values.where(is_date), errors="coerce")
+    text = values.where(~is_date).astype(str).str.strip()
+    for date_format in DATE_FORMATS:
+        parsed = parsed.fillna(pd.to_datetime(text, format=date_format, errors="coerce"))
+    return parsed.dt.normalize()
+
+
+def _request_rows(requests):
+    # The per-resident dict; older saves may hold a list of records with a Resident key
+    if isinstance(requests, dict):
+        return [{"Resident": resident, "Start Date": req.get("Start_Date"), "End Date": req.get("End_Date")}
+                for resident, reqs in requests.items() for req in reqs]
+    if isinstance(requests, list):
+        return [{"Resident": req.get("Resident"), "Start Date": req.get("Start_Date"), "End Date": req.get("End_Date")}
+                for req in requests]
+    return []
+
+
+def off_roster_requests(requests, roster):
+    """Stored requests of residents not on ``roster``, as {resident: [{"Start_Date", "End_Date"}, ...]}."""
+    on_roster = set(roster)
+    kept = {}
+    for row in _request_rows(requests):
+        if row["Resident"] is not None and row["Resident"] not in on_roster:
+            kept.setdefault(row["Resident"], []).append(
+                {"Start_Date": row["Start Date"], "End_Date": row["End Date"]})
+    return kept
+
+
+def requests_frame(requests, roster):
+    """Requests as one REQUEST_COLUMNS frame, in roster order and then request order.
+
+    ``requests`` is the per-resident dict (older saves may hold a list of
+    records with a Resident key). Residents not on ``roster`` are left out;
+    see off_roster_requests.
+    """
+    df = pd.DataFrame(_request_rows(requests), columns=REQUEST_COLUMNS)
+    order = {name: i for i, name in enumerate(roster)}
+    df = df[df["Resident"].isin(order)]
+    df = df.iloc[df["Resident"].map(order).argsort(kind="stable")].reset_index(drop=True)
+    df["Start Date"] = parse_dates(df["Start Date"])
+    df["End Date"] = parse_dates(df["End Date"])
+    return df
+
+
+def frame_requests(df, roster, block_start, block_end, stored=None):
+    """Edited request table back to {resident: [{"Start_Date", "End_Date"}, ...]}.
+
+    A blank date takes the other one (a single-day request), reversed dates
+    are swapped, and requests are clipped to the block. Rows without a
+    roster resident or any date, requests entirely outside the block and
+    duplicates are dropped; returns the requests and the number dropped.
+    Requests in ``stored`` for residents not on the roster (renamed or
+    removed for now) were never in the table and are carried over unchanged.
+    """
+    df = df.reindex(columns=REQUEST_COLUMNS)
+    start = parse_dates(df["Start Date"]).reset_index(drop=True)
+    end = parse_dates(df["End Date"]).reset_index(drop=True)
+    start, end = start.fillna(end), end.fillna(start)
+    first, last = start.where(start <= end, end), end.where(start <= end, start)
+    block_start, block_end = pd.Timestamp(block_start).normalize(), pd.Timestamp(block_end).normalize()
+    table = pd.DataFrame({
+        "Resident": df["Resident"].reset_index(drop=True),
+        "Start_Date": first.clip(lower=block_start),
+        "End_Date": last.clip(upper=block_end),
+    })
+    keep = (table["Resident"].isin(set(roster)) & first.notna()
+            & (first <= block_end) & (last >= block_start))
+    table = table[keep].drop_duplicates()
+    dropped = len(df) - len(table)
+
+    table["Start_Date"] = table["Start_Date"].dt.strftime("%Y-%m-%d")
+    table["End_Date"] = table["End_Date"].dt.strftime("%Y-%m-%d")
+    requests = {}
+    for resident, group in table.groupby("Resident", sort=False):
+        requests[resident] = group[["Start_Date", "End_Date"]].to_dict("records")
+    requests = {name: requests[name] for name in roster if name in requests}
+    requests.update(off_roster_requests(stored, roster))
+    return requests, dropped
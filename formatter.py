@@ -1,69 +1,97 @@
 # formatter.py
-import pandas as pd
-import openpyxl
-from openpyxl import load_workbook
+import calendar
+import hashlib
+import threading
+from collections import OrderedDict
 from datetime import datetime
 from io import BytesIO
 
-def format_schedule_excel(blank_excel_file, schedule_df):
-    # Load template from the uploaded file
-    template_wb = load_workbook(filename=BytesIO(blank_excel_file.getvalue()))
+import pandas as pd
+from openpyxl import load_workbook
+
+# Row offsets of each role inside a week's 8-row band (same layout as run_formatter)
+ROLE_ROWS = {'Call': 3, 'Intern': 4, 'Supervisor': 6, 'Backup': 7}
+# Parsed templates kept between runs, keyed by the template's content hash
+TEMPLATE_CACHE_SIZE = 4
+_template_cache = OrderedDict()
+_template_cache_lock = threading.Lock()
 
-    # Dynamically create sheet dictionary for all months July 2025 to June 2026
-    months = [
-        ("July", 2025), ("August", 2025), ("September", 2025), ("October", 2025),
-        ("November", 2025), ("December", 2025), ("January", 2026), ("February", 2026),
-        ("March", 2026), ("April", 2026), ("May", 2026), ("June", 2026)
-    ]
-    
-    sheets = {}
-    for month, year in months:
-        sheet_name = f"{month} {year}"
-        if sheet_name in template_wb.sheetnames:
-            sheets[sheet_name] = template_wb[sheet_name]
 
-    # Calculate start weekday for each month
-    month_start_weekday = {}
-    for month, year in months:
-        dt = datetime(year, datetime.strptime(month, "%B").month, 1)
-        month_start_weekday[f"{month} {year}"] = (dt.weekday() + 1) % 7
+class _Template:
+    """A parsed template workbook with its date -> (sheet, row, col) map.
 
-    # Helper to map date to correct cell
-    def get_cell_for_date_dynamic(date_obj):
-        month = date_obj.strftime("%B")
-        year = date_obj.year
-        sheet_key = f"{month} {year}"
-        if sheet_key not in sheets:
-            return None, None, None
-        start_weekday = month_start_weekday[sheet_key]
-        day = date_obj.day
-        total_days = day + start_weekday - 1
-        week_number = total_days // 7
-        day_of_week_index = total_days % 7
-        base_row = 3 + (week_number * 8)
-        col = day_of_week_index * 2 + 1
-        return base_row, col, sheet_key
+    The workbook is reused across runs: each fill first restores the cells
+    the previous fill wrote, so every run starts from the same blank state.
+    """
 
-    # Clear only call (row+3) and backup (row+7) for all months
-    for sheet in sheets.values():
-        for week_start in range(3, 50, 8):
-            for dow_col in range(1, 14, 2):
-                sheet.cell(row=week_start + 3, column=dow_col).value = None  # Clear call
-                sheet.cell(row=week_start + 7, column=dow_col).value = None  # Clear backup
+    def __init__(self, data):
+        self.wb = load_workbook(filename=BytesIO(data))
+        self.lock = threading.Lock()
+        self.cells = {}
+        for sheet_name in self.wb.sheetnames:
+            try:
+                month_date = datetime.strptime(sheet_name, "%B %Y")
+            except ValueError:
+                continue
+            sheet = self.wb[sheet_name]
+            # Call and backup cells of the template are blank in every week slot
+            for week_start in range(3, 50, 8):
+                for dow_col in range(1, 14, 2):
+                    sheet.cell(row=week_start + ROLE_ROWS['Call'], column=dow_col).value = None
+                    sheet.cell(row=week_start + ROLE_ROWS['Backup'], column=dow_col).value = None
+            start_weekday = (month_date.weekday() + 1) % 7  # Sunday = 0
+            for day in range(1, calendar.monthrange(month_date.year, month_date.month)[1] + 1):
+                week_number, day_of_week_index = divmod(day + start_weekday - 1, 7)
+                date_str = month_date.replace(day=day).strftime("%Y-%m-%d")
+                self.cells[date_str] = (sheet, 3 + week_number * 8, day_of_week_index * 2 + 1)
+        self.written = {}
 
-    # Insert call and backup data
-    for idx, row in schedule_df.iterrows():
-        current_date = datetime.strptime(row['Date'], "%Y-%m-%d")
-        call = row['Call']
-        backup = row['Backup']
-        base_row, col, sheet_key = get_cell_for_date_dynamic(current_date)
-        if sheet_key and base_row and col:
-            sheet = sheets[sheet_key]
-            sheet.cell(row=base_row + 3, column=col, value=call)
-            sheet.cell(row=base_row + 7, column=col, value=backup)
+    def fill(self, schedule_df):
+        # Put back the template values of the cells the last run wrote
+        for cell, value in self.written.items():
+            cell.value = value
+        self.written = {}
+        roles = [role for role in ROLE_ROWS if role in schedule_df.columns]
+        dates = pd.to_datetime(schedule_df['Date']).dt.strftime("%Y-%m-%d")
+        columns = [schedule_df[role].tolist() for role in roles]
+        for date_str, values in zip(dates, zip(*columns)):
+            target = self.cells.get(date_str)
+            if target is None:
+                continue
+            sheet, base_row, col = target
+            for role, value in zip(roles, values):
+                cell = sheet.cell(row=base_row + ROLE_ROWS[role], column=col)
+                self.written.setdefault(cell, cell.value)
+                cell.value = value
+        output = BytesIO()
+        self.wb.save(output)
+        output.seek(0)
+        return output
+
+
+def _get_template(data):
+    key = hashlib.sha1(data).hexdigest()
+    with _template_cache_lock:
+        template = _template_cache.get(key)
+        if template is not None:
+            _template_cache.move_to_end(key)
+            return template
+    template = _Template(data)
+    with _template_cache_lock:
+        _template_cache[key] = template
+        while len(_template_cache) > TEMPLATE_CACHE_SIZE:
+            _template_cache.popitem(last=False)
+    return template
+
+
+def format_schedule_excel(blank_excel_file, schedule_df):
+    """Fill a blank calendar template with a schedule and return it as BytesIO.
 
-    # Save to BytesIO object for Streamlit
-    output = BytesIO()
-    template_wb.save(output)
-    output.seek(0)
-    return output
+    Every sheet named "<Month> <Year>" is a month calendar; any month of the
+    schedule with a matching sheet is filled (Call, Backup, and Intern and
+    Supervisor when the schedule has them). The parsed template is cached by
+    content, so repeated runs skip load_workbook.
+    """
+    template = _get_template(blank_excel_file.getvalue())
+    with template.lock:
+        return template.fill(schedule_df)
@@ -1,15 +1,21 @@
 import os
 import pickle
-from googleapiclient.discovery import build
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
 import base64
 import email
 import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, date, timedelta
 
 SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
 
+# Inbox messages read per fetch, ids listed per page, message bodies per batch
+# HTTP request (Gmail allows 100, recommends 50) and threads used for
+# services without batch support
+MAX_MESSAGES = 100
+PAGE_SIZE = 100
+BATCH_SIZE = 50
+FETCH_WORKERS = 8
+
 def parse_date(date_str):
     for fmt in ("%m/%d/%y", "%m/%d/%Y"):
         try:
@@ -105,6 +111,10 @@ def parse_flexible_date_range(text, year_hint=None):
     return None, None
 
 def authenticate_gmail():
+    # The Google client libraries are slow to import and only needed here
+    from googleapiclient.discovery import build
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    from google.auth.transport.requests import Request
     creds = None
     if os.path.exists('token.pickle'):
         with open('token.pickle', 'rb') as token:
@@ -120,10 +130,73 @@ def authenticate_gmail():
             pickle.dump(creds, token)
     return build('gmail', 'v1', credentials=creds)
 
-def fetch_requests_from_gmail():
-    service = authenticate_gmail()
-    results = service.users().messages().list(userId='me', labelIds=['INBOX'], maxResults=20).execute()
-    messages = results.get('messages', [])
+def list_message_ids(service, max_messages=MAX_MESSAGES, page_size=PAGE_SIZE):
+    """Ids of the newest inbox messages, following nextPageToken up to max_messages."""
+    ids = []
+    page_token = None
+    while len(ids) < max_messages:
+        kwargs = {'userId': 'me', 'labelIds': ['INBOX'], 'maxResults': min(page_size, max_messages - len(ids))}
+        if page_token:
+            kwargs['pageToken'] = page_token
+        results = service.users().messages().list(**kwargs).execute()
+        ids.extend(msg['id'] for msg in results.get('messages', []))
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            break
+    return ids[:max_messages]
+
+def _get_raw(service, msg_id):
+    # (message, None) or (None, error) so a failure never stops the fetch
+    try:
+        return service.users().messages().get(userId='me', id=msg_id, format='raw').execute(), None
+    except Exception as e:
+        return None, e
+
+def fetch_raw_messages(service, message_ids, batch_size=BATCH_SIZE, workers=FETCH_WORKERS):
+    """Raw message resources for message_ids, in the same order, and the ones skipped.
+
+    A googleapiclient service sends batch HTTP requests of batch_size gets
+    (one round trip per batch; its http object is not thread-safe). Other
+    services, like a local fake, are read with a pool of workers threads.
+    Messages that fail in a batch are retried once on their own. Returns
+    (messages, skipped), skipped listing (message id, error message) for
+    every message that could not be read.
+    """
+    fetched = {}
+    errors = {}
+    if hasattr(service, 'new_batch_http_request'):
+        failed = []
+
+        def collect(request_id, response, exception):
+            if exception is None:
+                fetched[request_id] = response
+            else:
+                failed.append(request_id)
+
+        for i in range(0, len(message_ids), batch_size):
+            batch = service.new_batch_http_request(callback=collect)
+            for msg_id in message_ids[i:i + batch_size]:
+                batch.add(service.users().messages().get(userId='me', id=msg_id, format='raw'), request_id=msg_id)
+            batch.execute()
+        for msg_id in failed:
+            fetched[msg_id], errors[msg_id] = _get_raw(service, msg_id)
+    else:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            for msg_id, (msg_data, error) in zip(message_ids, pool.map(lambda msg_id: _get_raw(service, msg_id), message_ids)):
+                fetched[msg_id], errors[msg_id] = msg_data, error
+    messages = [fetched[msg_id] for msg_id in message_ids if fetched.get(msg_id) is not None]
+    skipped = [(msg_id, str(errors.get(msg_id))) for msg_id in message_ids if fetched.get(msg_id) is None]
+    return messages, skipped
+
+def fetch_requests_from_gmail(service=None, max_messages=MAX_MESSAGES, workers=FETCH_WORKERS):
+    """PTO and Non-PTO requests parsed from the newest inbox messages.
+
+    Returns (pto_requests, non_pto_requests, skipped); skipped lists
+    (message id, error message) for messages that could not be read.
+    """
+    if service is None:
+        service = authenticate_gmail()
+    messages, skipped = fetch_raw_messages(service, list_message_ids(service, max_messages), workers=workers)
 
     pto_requests = []
     non_pto_requests = []
@@ -139,8 +212,7 @@ def fetch_requests_from_gmail():
     except Exception:
         valid_residents = {}
 
-    for msg in messages:
-        msg_data = service.users().messages().get(userId='me', id=msg['id'], format='raw').execute()
+    for msg_data in messages:
         msg_str = base64.urlsafe_b64decode(msg_data['raw'].encode('ASCII'))
         mime_msg = email.message_from_bytes(msg_str)
 
@@ -307,7 +379,7 @@ def fetch_requests_from_gmail():
             i += 1
         print(f"Final PTO requests: {pto_requests}")
         print(f"Final Non-PTO requests: {non_pto_requests}")
-    return pto_requests, non_pto_requests
+    return pto_requests, non_pto_requests, skipped
 
 def ensure_date(val, fallback):
     if isinstance(val, date):
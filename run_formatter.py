@@ -1,235 +1,311 @@
 import pandas as pd
 from datetime import datetime, timedelta
 import calendar
+import hashlib
+from functools import lru_cache
 from openpyxl import Workbook
-from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import PatternFill, Font, Alignment, Border, Side, NamedStyle
 from openpyxl.utils import get_column_letter
 
-def create_calendar_sheet(wb, month_date, schedule_df):
-    # Create new sheet with month name
-    month_name = month_date.strftime("%B %Y")
-    ws = wb.create_sheet(title=month_name)
-    
-    # Write month and year in row 1
-    ws.cell(row=1, column=1, value=month_name)
-    
-    # Column mappings for days of week (each day gets 2 columns)
-    day_columns = {
-        'Sunday': ['A', 'B'],
-        'Monday': ['C', 'D'],
-        'Tuesday': ['E', 'F'],
-        'Wednesday': ['G', 'H'],
-        'Thursday': ['I', 'J'],
-        'Friday': ['K', 'L'],
-        'Saturday': ['M', 'N']
-    }
-    
-    # Set column widths
+def merge_blocks(*schedules):
+    """One schedule from several block schedules, merged by date. A later
+    block's row replaces an earlier block's row for the same date."""
+    frames = [df for df in schedules if df is not None and not df.empty]
+    if not frames:
+        return pd.DataFrame(columns=['Date', 'Call', 'Backup', 'Intern'])
+    all_df = pd.concat(frames, ignore_index=True)
+    all_df['Date'] = pd.to_datetime(all_df['Date'])
+    all_df = all_df.drop_duplicates('Date', keep='last')
+    return all_df.sort_values('Date', kind='stable').reset_index(drop=True)
+
+def schedule_months(schedule_df):
+    """First day of every month the schedule touches, including a partial first month."""
+    if schedule_df.empty:
+        return []
+    dates = pd.to_datetime(schedule_df['Date'])
+    return list(pd.date_range(dates.min().replace(day=1), dates.max(), freq='MS'))
+
+def index_schedule_by_date(schedule_df):
+    """Map 'YYYY-MM-DD' to the first schedule row (as a dict) for that date."""
+    dates = pd.to_datetime(schedule_df['Date']).dt.strftime("%Y-%m-%d")
+    day_index = {}
+    for date_str, row in zip(dates, schedule_df.to_dict('records')):
+        day_index.setdefault(date_str, row)
+    return day_index
+
+@lru_cache(maxsize=None)
+def month_calendar_weeks(year, month):
+    """Sunday-to-Saturday weeks covering a month, overflow days included."""
+    weeks = calendar.Calendar(firstweekday=6).monthdatescalendar(year, month)
+    return tuple(tuple(datetime(d.year, d.month, d.day) for d in week) for week in weeks)
+
+# Fill colour of each row of a week band (8 rows), by offset from the week's first row
+CALENDAR_FILLS = {
+    3: 'D9D9D9',  # On Call (light gray)
+    4: 'D9D9D9',  # Intern (light gray)
+    6: 'E2EFDA',  # Supervisor (light green)
+    7: 'FFF2CC',  # Backup (light yellow)
+}
+# Rows of a day block whose first cell holds a centered value: day number,
+# call, intern, supervisor and backup
+CENTERED_ROWS = (0, 3, 4, 6, 7)
+# Day number fonts: days outside the month are italic ('muted' also grays them)
+DAY_FONTS = {None: {}, 'italic': {'italic': True}, 'muted': {'italic': True, 'color': '808080'}}
+HEADER_STYLE = 'Calendar Header'
+
+def calendar_style_name(row_offset, column, separator=False, font=None):
+    """Named style of a cell in a week band.
+
+    ``column`` is 0 or 1 for the two columns of a day block and 2 for the
+    label column O. ``separator`` marks the last row of a week followed by
+    another week: the week separator clears the day blocks' borders there and
+    leaves a bottom border in column O. Returns None for unstyled cells.
+    """
+    fill = CALENDAR_FILLS.get(row_offset)
+    if column == 2:
+        sides = 'B' if separator else ''
+        if fill is None and not sides:
+            return None
+        return f"Calendar {fill or 'Plain'} {sides or '-'}"
+    sides = 'L' if column == 0 else 'R'
+    if row_offset == 0:
+        sides += 'T'
+    elif row_offset == 7:
+        sides += 'B'
+        if separator:
+            sides = ''
+    center = column == 0 and row_offset in CENTERED_ROWS
+    name = f"Calendar {fill or 'Plain'} {sides or '-'}{' Center' if center else ''}"
+    if font and row_offset == 0 and column == 0:
+        name += f" {font.capitalize()}"
+    return name
+
+def _calendar_style_keys():
+    for row_offset in range(8):
+        for separator in ((False, True) if row_offset == 7 else (False,)):
+            for column in range(3):
+                fonts = DAY_FONTS if row_offset == 0 and column == 0 else (None,)
+                for font in fonts:
+                    yield row_offset, column, separator, font
+
+def _build_calendar_style(name, row_offset, column, separator, font):
+    style = NamedStyle(name=name)
+    fill = CALENDAR_FILLS.get(row_offset)
+    if fill:
+        style.fill = PatternFill(start_color=fill, end_color=fill, fill_type='solid')
+    thin = Side(style='thin')
+    sides = name.split()[2]
+    style.border = Border(
+        left=thin if 'L' in sides else None,
+        right=thin if 'R' in sides else None,
+        top=thin if 'T' in sides else None,
+        bottom=thin if 'B' in sides else None
+    )
+    if column == 0 and row_offset in CENTERED_ROWS:
+        style.alignment = Alignment(horizontal='center')
+    if font and row_offset == 0 and column == 0:
+        style.font = Font(**DAY_FONTS[font])
+    return style
+
+def register_calendar_styles(wb):
+    """Add the calendar's named styles to a workbook once; cells then refer
+    to them by name instead of carrying their own Border/Fill/Font objects."""
+    registered = set(wb.style_names)
+    if HEADER_STYLE in registered:
+        return
+    header = NamedStyle(name=HEADER_STYLE)
+    header.font = Font(bold=True)
+    header.alignment = Alignment(horizontal='center')
+    wb.add_named_style(header)
+    for key in _calendar_style_keys():
+        name = calendar_style_name(*key)
+        if name is not None and name not in registered:
+            wb.add_named_style(_build_calendar_style(name, *key))
+            registered.add(name)
+
+DAY_NAMES = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
+# Label (column O) and schedule column of the labelled rows of a week band
+WEEK_ROW_LABELS = {3: ("On Call", 'Call'), 4: ("Intern", 'Intern'), 6: ("Supervisor", 'Supervisor'), 7: ("Backup", 'Backup')}
+
+def _set_column_widths(ws):
     for col in 'ABCDEFGHIJKLMN':
         ws.column_dimensions[col].width = 12
     ws.column_dimensions['O'].width = 15
     ws.column_dimensions['P'].width = 5
 
-    # Define border styles
-    thin_border = Side(style='thin')
-    day_border = Border(
-        left=thin_border,
-        right=thin_border,
-        top=thin_border,
-        bottom=thin_border
-    )
+def calendar_rows(title, calendar_weeks, month, day_index, has_supervisor, overflow_font):
+    """The calendar layout, one list of (value, style name) cells per sheet row.
 
-    # Write day headers in row 2
-    for day, cols in day_columns.items():
-        col_idx = ord(cols[0]) - ord('A') + 1
-        for offset in range(2):
-            cell = ws.cell(row=2, column=col_idx + offset)
-            cell.value = day if offset == 0 else ""
-            cell.font = Font(bold=True)
-            cell.alignment = Alignment(horizontal='center')
-
-    # Colors
-    gray_fill = PatternFill(start_color='D9D9D9', end_color='D9D9D9', fill_type='solid')     # Light gray
-    green_fill = PatternFill(start_color='E2EFDA', end_color='E2EFDA', fill_type='solid')    # Light green
-    yellow_fill = PatternFill(start_color='FFF2CC', end_color='FFF2CC', fill_type='solid')   # Light yellow
-    
-    # Get first and last day of the month
-    first_of_month = datetime(month_date.year, month_date.month, 1)
-    _, num_days = calendar.monthrange(month_date.year, month_date.month)
-    last_of_month = datetime(month_date.year, month_date.month, num_days)
-
-    # Find the first Sunday before or on the 1st
-    first_sunday = first_of_month
-    while first_sunday.weekday() != 6:  # 6 = Sunday
-        first_sunday -= timedelta(days=1)
-    # Find the last Saturday after or on the last day
-    last_saturday = last_of_month
-    while last_saturday.weekday() != 5:  # 5 = Saturday
-        last_saturday += timedelta(days=1)
-
-    # Build list of all days to display
-    num_days_display = (last_saturday - first_sunday).days + 1
-    all_days = [first_sunday + timedelta(days=i) for i in range(num_days_display)]
-
-    # Build weeks
-    calendar_weeks = [all_days[i:i+7] for i in range(0, len(all_days), 7)]
-
-    # Write calendar
+    Row 1 holds the title and row 2 the day headers. Each week then takes
+    8 rows: two columns per day (A-N) and the row labels in column O. Days
+    outside ``month`` get ``overflow_font`` ('italic' or 'muted') on their
+    number. Both renderers consume this, so they produce the same layout.
+    """
+    yield [(title, None)]
+    yield [(day if offset == 0 else "", HEADER_STYLE) for day in DAY_NAMES for offset in range(2)]
     for week_num, week in enumerate(calendar_weeks):
-        base_row = 3 + (week_num * 8)  # Each week takes 8 rows
-        
-        # Add week separator border if not first week
-        if week_num > 0:
-            for col in range(1, 16):  # A through O
-                cell = ws.cell(row=base_row - 1, column=col)
-                cell.border = Border(bottom=Side(style='thin'))
-        
-        # Color the rows for each week
-        for col in range(1, 16):  # A through O (including column O)
-            # Rows 4-5 (gray)
-            ws.cell(row=base_row + 3, column=col).fill = gray_fill
-            ws.cell(row=base_row + 4, column=col).fill = gray_fill
-            # Row 7 (green)
-            ws.cell(row=base_row + 6, column=col).fill = green_fill
-            # Row 8 (yellow)
-            ws.cell(row=base_row + 7, column=col).fill = yellow_fill
-        
-        # Add labels in column O for each week
-        ws.cell(row=base_row + 3, column=15, value="On Call")
-        ws.cell(row=base_row + 4, column=15, value="Intern")  # Add intern label
-        ws.cell(row=base_row + 6, column=15, value="Supervisor")  # Supervisor label above backup
-        ws.cell(row=base_row + 7, column=15, value="Backup")
-        
-        for weekday, date in enumerate(week):
-            cols = list(day_columns.values())[weekday]
-            col_idx = ord(cols[0]) - ord('A') + 1
-            # Write day number (only in first column)
-            day_cell = ws.cell(row=base_row, column=col_idx)
-            day_cell.value = date.day
-            day_cell.alignment = Alignment(horizontal='center')
-            # Italicize if not in current month
-            if date.month != month_date.month:
-                day_cell.font = Font(italic=True)
-            # Get schedule for this day (including overflow days)
-            date_str = date.strftime("%Y-%m-%d")
-            day_schedule = schedule_df[schedule_df['Date'] == date_str]
-            if not day_schedule.empty:
-                # Write Call person (row 4, first column only)
-                call_cell = ws.cell(row=base_row + 3, column=col_idx)
-                call_cell.value = day_schedule.iloc[0].get('Call', '')
-                call_cell.alignment = Alignment(horizontal='center')
-                # Write Intern person (row 5, first column only)
-                intern_cell = ws.cell(row=base_row + 4, column=col_idx)
-                intern_cell.value = day_schedule.iloc[0].get('Intern', '')
-                intern_cell.alignment = Alignment(horizontal='center')
-                # Write Supervisor (row 7, first column only)
-                if 'Supervisor' in day_schedule.columns:
-                    supervisor_cell = ws.cell(row=base_row + 6, column=col_idx)
-                    supervisor_cell.value = day_schedule.iloc[0].get('Supervisor', '')
-                    supervisor_cell.alignment = Alignment(horizontal='center')
-                # Write Backup person (row 8, first column only)
-                backup_cell = ws.cell(row=base_row + 7, column=col_idx)
-                backup_cell.value = day_schedule.iloc[0].get('Backup', '')
-                backup_cell.alignment = Alignment(horizontal='center')
-            # Add borders around the entire 2x8 day block
-            for row_offset in range(8):
-                for col_offset in range(2):
-                    current_cell = ws.cell(row=base_row + row_offset, column=col_idx + col_offset)
-                    has_left = (col_offset == 0)
-                    has_right = (col_offset == 1)
-                    has_top = (row_offset == 0)
-                    has_bottom = (row_offset == 7)
-                    current_cell.border = Border(
-                        left=thin_border if has_left else None,
-                        right=thin_border if has_right else None,
-                        top=thin_border if has_top else None,
-                        bottom=thin_border if has_bottom else None
-                    )
-            # Remove any week separator borders that might interfere with day blocks
-            if week_num > 0:
-                for col_offset in range(2):
-                    separator_cell = ws.cell(row=base_row - 1, column=col_idx + col_offset)
-                    separator_cell.border = Border()
+        separator = week_num < len(calendar_weeks) - 1
+        # Get schedule for each day (including overflow days)
+        schedules = [day_index.get(date.strftime("%Y-%m-%d")) for date in week]
+        for row_offset in range(8):
+            last = separator and row_offset == 7
+            label, role = WEEK_ROW_LABELS.get(row_offset, (None, None))
+            row = []
+            for date, day_schedule in zip(week, schedules):
+                value, font = None, None
+                if row_offset == 0:
+                    value = date.day
+                    font = overflow_font if date.month != month else None
+                elif role and day_schedule is not None and (role != 'Supervisor' or has_supervisor):
+                    value = day_schedule.get(role, '')
+                row.append((value, calendar_style_name(row_offset, 0, last, font)))
+                row.append((None, calendar_style_name(row_offset, 1, last)))
+            row.append((label, calendar_style_name(row_offset, 2, last)))
+            yield row
+
+def _write_calendar_rows(ws, rows):
+    # Random-access renderer: only cells with a value or a style are touched
+    for row_idx, row in enumerate(rows, start=1):
+        for col_idx, (value, style) in enumerate(row, start=1):
+            if value is None and style is None:
+                continue
+            cell = ws.cell(row=row_idx, column=col_idx)
+            if value is not None:
+                cell.value = value
+            if style is not None:
+                cell.style = style
+
+def month_content_key(month_date, day_index, has_supervisor):
+    """Hash of everything a month sheet displays (its grid days' assignments)."""
+    days = [day_index.get(date.strftime("%Y-%m-%d")) for week in month_calendar_weeks(month_date.year, month_date.month)
+            for date in week]
+    roles = [role for _, role in WEEK_ROW_LABELS.values() if role != 'Supervisor' or has_supervisor]
+    content = [None if day is None else tuple(day.get(role, '') for role in roles) for day in days]
+    return hashlib.sha1(repr((month_date.strftime("%B %Y"), roles, content)).encode()).hexdigest()
+
+def create_calendar_sheet(wb, month_date, schedule_df, day_index=None, index=None):
+    # Create new sheet with month name (at position ``index`` if given)
+    month_name = month_date.strftime("%B %Y")
+    ws = wb.create_sheet(title=month_name, index=index)
+    register_calendar_styles(wb)
+    _set_column_widths(ws)
+
+    # One lookup per displayed day instead of a DataFrame scan
+    if day_index is None:
+        day_index = index_schedule_by_date(schedule_df)
+    has_supervisor = 'Supervisor' in schedule_df.columns
+    calendar_weeks = month_calendar_weeks(month_date.year, month_date.month)
+    _write_calendar_rows(ws, calendar_rows(month_name, calendar_weeks, month_date.month, day_index, has_supervisor, 'italic'))
     return ws
 
-def format_schedule(block1_df, block2_df, block3_df):
-    # Combine the schedules
-    all_df = pd.concat([block1_df, block2_df, block3_df], ignore_index=True)
-    all_df['Date'] = pd.to_datetime(all_df['Date'])
+class ScheduleWorkbook:
+    """Calendar workbook assembled from any number of named block schedules.
 
-    # Create workbook
-    wb = Workbook()
+    Blocks are merged by date (merge_blocks), in the order they were first
+    added, so later blocks override earlier ones. build() keeps every month
+    sheet whose content hash (month_content_key) is unchanged and re-renders
+    only the others; after regenerating Block 2, only the months showing
+    Block 2 days are rendered again. ``rendered`` lists the sheets the last
+    build() rendered.
+    """
 
-    # Get all unique months in the schedule
-    months = pd.date_range(all_df['Date'].min(), all_df['Date'].max(), freq='MS')
-    
-    # Process each month
-    for month in months:
-        # Get first and last day of the month
-        first_of_month = datetime(month.year, month.month, 1)
-        _, num_days = calendar.monthrange(month.year, month.month)
-        last_of_month = datetime(month.year, month.month, num_days)
-        # Find the first Sunday before or on the 1st
-        first_sunday = first_of_month
-        while first_sunday.weekday() != 6:  # 6 = Sunday
-            first_sunday -= timedelta(days=1)
-        # Find the last Saturday after or on the last day
-        last_saturday = last_of_month
-        while last_saturday.weekday() != 5:  # 5 = Saturday
-            last_saturday += timedelta(days=1)
-        # Get all assignments for the full calendar grid (including overflow days)
-        mask = (all_df['Date'] >= first_sunday) & (all_df['Date'] <= last_saturday)
-        month_df = all_df[mask]
-        create_calendar_sheet(wb, month, month_df)
-
-    # Remove the default sheet
-    wb.remove(wb['Sheet'])
-    
-    return wb
+    def __init__(self):
+        self.blocks = {}
+        self.wb = Workbook()
+        self.wb.remove(self.wb.active)
+        register_calendar_styles(self.wb)
+        self.month_keys = {}
+        self.rendered = []
+
+    def set_block(self, name, schedule_df):
+        self.blocks[name] = schedule_df
+
+    def remove_block(self, name):
+        self.blocks.pop(name, None)
+
+    def build(self):
+        all_df = merge_blocks(*self.blocks.values())
+        months = schedule_months(all_df)
+        titles = [month.strftime("%B %Y") for month in months]
+
+        # Drop sheets for months no longer covered
+        for title in [t for t in self.month_keys if t not in titles]:
+            self.wb.remove(self.wb[title])
+            del self.month_keys[title]
+
+        day_index = index_schedule_by_date(all_df)
+        has_supervisor = 'Supervisor' in all_df.columns
+        self.rendered = []
+        for position, (month, title) in enumerate(zip(months, titles)):
+            key = month_content_key(month, day_index, has_supervisor)
+            if self.month_keys.get(title) == key:
+                continue
+            if title in self.month_keys:
+                self.wb.remove(self.wb[title])
+            # Earlier months are all in place, so the sheet goes back at its position
+            create_calendar_sheet(self.wb, month, all_df, day_index, index=position)
+            self.month_keys[title] = key
+            self.rendered.append(title)
+        return self.wb
+
+    def save(self, output):
+        self.wb.save(output)
+
+def format_schedule(*schedules):
+    """Calendar workbook for one or more block schedules (later blocks win on
+    overlapping dates), one sheet per month."""
+    book = ScheduleWorkbook()
+    for number, schedule_df in enumerate(schedules):
+        book.set_block(number, schedule_df)
+    return book.build()
+
+def _write_only_cell(ws, value, style):
+    if value is None and style is None:
+        return None
+    cell = WriteOnlyCell(ws, value=value)
+    if style is not None:
+        cell.style = style
+    return cell
+
+def stream_schedule(output, *schedules):
+    """Write the calendar workbook for one or more block schedules straight to
+    ``output`` (a path or binary file object).
+
+    Same layout as format_schedule(), rendered with openpyxl's write-only
+    mode: each row is serialized as soon as it is appended, so memory stays
+    flat however many months are exported.
+    """
+    all_df = merge_blocks(*schedules)
+    day_index = index_schedule_by_date(all_df)
+    has_supervisor = 'Supervisor' in all_df.columns
 
-def create_merged_calendar_sheet(wb, prev_month, current_month, schedule_df):
+    wb = Workbook(write_only=True)
+    register_calendar_styles(wb)
+    for month in schedule_months(all_df):
+        month_name = month.strftime("%B %Y")
+        ws = wb.create_sheet(title=month_name)
+        _set_column_widths(ws)
+        calendar_weeks = month_calendar_weeks(month.year, month.month)
+        for row in calendar_rows(month_name, calendar_weeks, month.month, day_index, has_supervisor, 'italic'):
+            ws.append([_write_only_cell(ws, value, style) for value, style in row])
+        # Finish the sheet now so its writer buffers are released before the next month
+        ws.close()
+    wb.save(output)
+
+def create_merged_calendar_sheet(wb, prev_month, current_month, schedule_df, day_index=None):
     """Create a calendar sheet that includes the last week of previous month and current month"""
     # Use current month for sheet name
     month_name = current_month.strftime("%B %Y")
     ws = wb.create_sheet(title=month_name)
-    
-    # Write month and year in row 1
-    ws.cell(row=1, column=1, value=month_name)
-    
-    # Column mappings for days of week (each day gets 2 columns)
-    day_columns = {
-        'Sunday': ['A', 'B'],
-        'Monday': ['C', 'D'],
-        'Tuesday': ['E', 'F'],
-        'Wednesday': ['G', 'H'],
-        'Thursday': ['I', 'J'],
-        'Friday': ['K', 'L'],
-        'Saturday': ['M', 'N']
-    }
-    
-    # Set column widths
-    for col in 'ABCDEFGHIJKLMN':
-        ws.column_dimensions[col].width = 12
-    ws.column_dimensions['O'].width = 15
-    ws.column_dimensions['P'].width = 5
+    register_calendar_styles(wb)
+    _set_column_widths(ws)
+
+    # One lookup per displayed day instead of a DataFrame scan
+    if day_index is None:
+        day_index = index_schedule_by_date(schedule_df)
+    has_supervisor = 'Supervisor' in schedule_df.columns
 
-    # Define border styles
-    thin_border = Side(style='thin')
-    
-    # Write day headers in row 2
-    for day, cols in day_columns.items():
-        col_idx = ord(cols[0]) - ord('A') + 1
-        for offset in range(2):
-            cell = ws.cell(row=2, column=col_idx + offset)
-            cell.value = day if offset == 0 else ""
-            cell.font = Font(bold=True)
-            cell.alignment = Alignment(horizontal='center')
-
-    # Colors
-    gray_fill = PatternFill(start_color='D9D9D9', end_color='D9D9D9', fill_type='solid')
-    green_fill = PatternFill(start_color='E2EFDA', end_color='E2EFDA', fill_type='solid')
-    yellow_fill = PatternFill(start_color='FFF2CC', end_color='FFF2CC', fill_type='solid')
-    
     # Get the earliest date in the schedule
     start_date = schedule_df['Date'].min()
     
@@ -261,98 +337,7 @@ def create_merged_calendar_sheet(wb, prev_month, current_month, schedule_df):
             current_date += pd.Timedelta(days=1)
         calendar_weeks.append(current_week)
     
-    # Write calendar
-    for week_num, week in enumerate(calendar_weeks):
-        base_row = 3 + (week_num * 8)  # Each week takes 8 rows
-        
-        # Add week separator border if not first week
-        if week_num > 0:
-            for col in range(1, 16):  # A through O
-                cell = ws.cell(row=base_row - 1, column=col)
-                cell.border = Border(bottom=Side(style='thin'))
-        
-        # Color the rows for each week
-        for col in range(1, 16):  # A through O (including column O)
-            # Rows 4-5 (gray)
-            ws.cell(row=base_row + 3, column=col).fill = gray_fill
-            ws.cell(row=base_row + 4, column=col).fill = gray_fill
-            
-            # Row 7 (green)
-            ws.cell(row=base_row + 6, column=col).fill = green_fill
-            
-            # Row 8 (yellow)
-            ws.cell(row=base_row + 7, column=col).fill = yellow_fill
-        
-        # Add labels in column O for each week
-        ws.cell(row=base_row + 3, column=15, value="On Call")
-        ws.cell(row=base_row + 4, column=15, value="Intern")
-        ws.cell(row=base_row + 6, column=15, value="Supervisor")
-        ws.cell(row=base_row + 7, column=15, value="Backup")
-        
-        for weekday, date in enumerate(week):
-            # Get the starting column for this day
-            cols = list(day_columns.values())[weekday]
-            col_idx = ord(cols[0]) - ord('A') + 1
-            
-            # Write day number (only in first column)
-            day_cell = ws.cell(row=base_row, column=col_idx)
-            day_cell.value = date.day
-            day_cell.alignment = Alignment(horizontal='center')
-            
-            # Style differently if from previous month
-            if date.month != current_month.month:
-                day_cell.font = Font(italic=True, color='808080')
-            
-            # Get schedule for this day
-            date_str = date.strftime("%Y-%m-%d")
-            day_schedule = schedule_df[schedule_df['Date'] == date_str]
-            
-            if not day_schedule.empty:
-                # Write Call person (row 4, first column only)
-                call_cell = ws.cell(row=base_row + 3, column=col_idx)
-                call_cell.value = day_schedule.iloc[0]['Call']
-                call_cell.alignment = Alignment(horizontal='center')
-                
-                # Write Intern person (row 5, first column only)
-                intern_cell = ws.cell(row=base_row + 4, column=col_idx)
-                intern_cell.value = day_schedule.iloc[0]['Intern']
-                intern_cell.alignment = Alignment(horizontal='center')
-                
-                # Write Supervisor (row 7, first column only)
-                if 'Supervisor' in day_schedule.columns:
-                    supervisor_cell = ws.cell(row=base_row + 6, column=col_idx)
-                    supervisor_cell.value = day_schedule.iloc[0]['Supervisor']
-                    supervisor_cell.alignment = Alignment(horizontal='center')
-                
-                # Write Backup person (row 8, first column only)
-                backup_cell = ws.cell(row=base_row + 7, column=col_idx)
-                backup_cell.value = day_schedule.iloc[0]['Backup']
-                backup_cell.alignment = Alignment(horizontal='center')
-            
-            # Add borders around the entire 2x8 day block
-            for row_offset in range(8):
-                for col_offset in range(2):
-                    current_cell = ws.cell(row=base_row + row_offset, column=col_idx + col_offset)
-                    
-                    # Determine which borders this cell should have
-                    has_left = (col_offset == 0)
-                    has_right = (col_offset == 1)
-                    has_top = (row_offset == 0)
-                    has_bottom = (row_offset == 7)
-                    
-                    # Create border object with all required sides
-                    current_cell.border = Border(
-                        left=thin_border if has_left else None,
-                        right=thin_border if has_right else None,
-                        top=thin_border if has_top else None,
-                        bottom=thin_border if has_bottom else None
-                    )
-            
-            # Remove any week separator borders that might interfere with day blocks
-            if week_num > 0:
-                for col_offset in range(2):
-                    separator_cell = ws.cell(row=base_row - 1, column=col_idx + col_offset)
-                    separator_cell.border = Border()
+    _write_calendar_rows(ws, calendar_rows(month_name, calendar_weeks, current_month.month, day_index, has_supervisor, 'muted'))
     
     return ws
 
@@ -0,0 +1,259 @@
+# scenario_sweep.py
+
+# What-if sweeps: re-solve one block under a list of deltas (PGY-4 cap, PTO
+# approved or withdrawn, weights, roster changes) and compare the outcomes.
+# The base tables are parsed once (prepare_scheduling_inputs) and the rules
+# compiled once; both are shipped to each worker process once, and scenarios
+# only send their delta. Each scenario still builds its own CallScheduler,
+# since its per-resident state (counts, logs, PTO) depends on the delta.
+
+import os
+import time
+import random
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from scheduling_engine import (
+    prepare_scheduling_inputs, solve_prepared, parse_date_ranges,
+    DateIntervals, InfeasibleScheduleError,
+)
+from batch_scheduler import engine_arguments
+from call_rules import RULES, CompiledRules, compile_rules
+
+# Delta keys passed to solve_prepared as options
+SOLVER_OPTIONS = (
+    "pgy4_cap", "previous_call_counts", "fairness_weight", "soft_constraint_weight",
+    "day_order", "restarts", "time_limit",
+)
+
+# Prepared base inputs, set once per worker process by _init_worker
+_BASE_INPUTS = None
+
+
+def _ranges(rows):
+    # (resident, start ordinal, end ordinal) for Resident/Start Date/End Date rows
+    for resident, intervals in parse_date_ranges(pd.DataFrame(list(rows))).items():
+        for start, end in zip(intervals.starts, intervals.ends):
+            yield resident, start, end
+
+
+def delta_errors(inputs, delta):
+    """Reasons a delta cannot be applied to the prepared inputs ([] when it can).
+
+    Removed residents must be on the roster and must not hold a fixed
+    (holiday) assignment inside the block; added residents must be new.
+    """
+    roster = {r for residents in inputs["residents_info"].values() for r in residents}
+    errors = []
+    removed = list(delta.get("remove_residents", []))
+    for resident in removed:
+        if resident not in roster:
+            errors.append(f"Cannot remove {resident}: not on the roster.")
+    start = pd.Timestamp(inputs["start_date"]).normalize()
+    end = pd.Timestamp(inputs["end_date"]).normalize()
+    for date_str, pair in sorted(inputs["fixed_assignments"].items()):
+        if not start <= pd.Timestamp(date_str) <= end:
+            continue
+        for role, resident in zip(("Call", "Backup"), pair):
+            if resident in removed:
+                errors.append(f"Cannot remove {resident}: fixed {role.lower()} assignment on {date_str}.")
+    for row in delta.get("add_residents", []):
+        if row["Resident"] in roster and row["Resident"] not in removed:
+            errors.append(f"Cannot add {row['Resident']}: already on the roster.")
+    return errors
+
+
+def apply_delta(inputs, delta):
+    """Prepared inputs for one scenario.
+
+    ``delta`` may hold:
+      add_pto / remove_pto         rows of Resident, Start Date, End Date
+      add_residents                rows of Resident, PGY[, Transition Date, Transition PGY]
+      remove_residents             resident names
+    Only the structures a delta touches are copied; the rest are shared with
+    the base inputs, which are never modified. Raises ValueError with the
+    delta_errors() reasons for a delta that does not fit the inputs.
+    """
+    errors = delta_errors(inputs, delta)
+    if errors:
+        raise ValueError(" ".join(errors))
+    scenario = dict(inputs)
+    if delta.get("add_residents") or delta.get("remove_residents"):
+        removed = set(delta.get("remove_residents", []))
+        residents_info = {
+            pgy: [r for r in residents if r not in removed]
+            for pgy, residents in inputs["residents_info"].items()
+        }
+        transitions = {r: t for r, t in inputs["transitions"].items() if r not in removed}
+        for row in delta.get("add_residents", []):
+            residents_info.setdefault(int(row["PGY"]), []).append(row["Resident"])
+            if pd.notna(row.get("Transition Date")):
+                transitions[row["Resident"]] = (
+                    pd.to_datetime(row["Transition Date"]).to_pydatetime(),
+                    int(row["Transition PGY"]),
+                )
+        scenario["residents_info"] = residents_info
+        scenario["transitions"] = transitions
+    if delta.get("add_pto") or delta.get("remove_pto"):
+        pto_requests = dict(inputs["pto_requests"])
+        copied = set()
+        for key, method in (("add_pto", "add"), ("remove_pto", "remove")):
+            for resident, start, end in _ranges(delta.get(key, [])):
+                if resident not in copied:
+                    base = pto_requests.get(resident)
+                    pto_requests[resident] = base.copy() if base is not None else DateIntervals()
+                    copied.add(resident)
+                getattr(pto_requests[resident], method)(start, end)
+        scenario["pto_requests"] = pto_requests
+    return scenario
+
+
+def describe_delta(delta):
+    """Short human-readable summary of a scenario delta."""
+    parts = []
+    for key in SOLVER_OPTIONS + ("seed",):
+        if key in delta and key != "previous_call_counts":
+            parts.append(f"{key}={delta[key]}")
+    for key in ("add_pto", "remove_pto"):
+        for row in delta.get(key, []):
+            parts.append(f"{key.split('_')[0]} PTO {row['Resident']} {row['Start Date']}..{row['End Date']}")
+    for row in delta.get("add_residents", []):
+        parts.append(f"add {row['Resident']} (PGY-{row['PGY']})")
+    for resident in delta.get("remove_residents", []):
+        parts.append(f"remove {resident}")
+    return "; ".join(parts) or "baseline"
+
+
+@contextlib.contextmanager
+def _output(quiet):
+    # The engine prints per-day debug output; drop it unless asked for
+    if not quiet:
+        yield
+        return
+    with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+        yield
+
+
+def _init_worker(inputs):
+    global _BASE_INPUTS
+    _BASE_INPUTS = inputs
+
+
+def _invalid_row(name, delta, errors):
+    return {
+        "Scenario": name,
+        "Changes": describe_delta(delta),
+        "Status": "invalid",
+        "Feasible": False,
+        "Error": " ".join(errors),
+    }
+
+
+def _run_scenario(name, delta, options, quiet=True, inputs=None):
+    inputs = apply_delta(inputs if inputs is not None else _BASE_INPUTS, delta)
+    options = dict(options)
+    options.update({k: delta[k] for k in SOLVER_OPTIONS if k in delta})
+    seed = delta.get("seed", options.pop("seed", None))
+    if seed is not None:
+        random.seed(seed)
+    row = {
+        "Scenario": name,
+        "Changes": describe_delta(delta),
+        "Status": "ok",
+        "Feasible": True,
+        "Fairness Spread": None,
+        "Soft Violations": None,
+        "Blocking Issues": 0,
+        "Tight Days": 0,
+        "Seconds": 0.0,
+        "Error": None,
+    }
+    schedule = None
+    started = time.perf_counter()
+    try:
+        with _output(quiet):
+            schedule = solve_prepared(inputs, **options)
+        issues = schedule.attrs.get("feasibility_issues", [])
+        row["Fairness Spread"] = schedule.attrs.get("fairness_spread")
+        row["Soft Violations"] = schedule.attrs.get("soft_constraint_stats", {}).get("violations")
+    except InfeasibleScheduleError as e:
+        issues = e.issues
+        row["Status"] = "infeasible"
+        row["Feasible"] = False
+        row["Error"] = str(e)
+    except Exception as e:
+        issues = []
+        row["Status"] = "error"
+        row["Feasible"] = False
+        row["Error"] = f"{type(e).__name__}: {e}"
+    row["Blocking Issues"] = sum(1 for issue in issues if issue["Severity"] == "Infeasible")
+    row["Tight Days"] = len({issue["Date"] for issue in issues if issue["Severity"] == "Tight"})
+    row["Seconds"] = round(time.perf_counter() - started, 2)
+    return row, schedule
+
+
+def run_sweep(base_problem, deltas, max_workers=None, include_baseline=True, quiet=True, **options):
+    """Solve a base problem under each delta in parallel and compare the results.
+
+    ``base_problem`` is a problem spec as taken by batch_scheduler (residents,
+    pto, holidays, previous, soft_constraints, block dates, options). ``deltas``
+    is a list of dicts: apply_delta() keys, solver options (SOLVER_OPTIONS and
+    seed) and an optional "name". Keyword ``options`` apply to every scenario
+    unless a delta overrides them.
+
+    Returns a comparison DataFrame, one row per scenario (baseline first when
+    ``include_baseline``), with the schedules in ``attrs['schedules']`` keyed by
+    scenario name. Deltas that do not fit the base problem (delta_errors) are
+    reported with Status "invalid" and not solved.
+    """
+    kwargs = engine_arguments(base_problem)
+    with _output(quiet):
+        inputs = prepare_scheduling_inputs(
+            kwargs["prev_df"], kwargs["res_df"], kwargs["pto_df"], kwargs["hol_df"],
+            kwargs["start_date"], kwargs["end_date"], kwargs.get("soft_constraints"),
+        )
+    base_options = {k: kwargs[k] for k in SOLVER_OPTIONS + ("seed",) if k in kwargs}
+    base_options.update(options)
+    # Compile a custom rule spec once instead of in every scenario
+    rules = base_options.get("rules")
+    base_options["rules"] = rules if isinstance(rules, CompiledRules) else (
+        compile_rules(rules) if rules is not None else RULES)
+
+    scenarios = [{"name": "baseline"}] if include_baseline else []
+    scenarios += [dict(delta) for delta in deltas]
+    for i, delta in enumerate(scenarios):
+        delta.setdefault("name", f"scenario-{i}")
+
+    rows = [None] * len(scenarios)
+    schedules = {}
+    runnable = []
+    for i, delta in enumerate(scenarios):
+        errors = delta_errors(inputs, delta)
+        if errors:
+            rows[i] = _invalid_row(delta["name"], delta, errors)
+        else:
+            runnable.append(i)
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(inputs,)) as executor:
+        futures = {
+            executor.submit(_run_scenario, scenarios[i]["name"], scenarios[i], base_options, quiet): i
+            for i in runnable
+        }
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                rows[i], schedule = future.result()
+            except Exception as e:  # e.g. the worker process died
+                rows[i], schedule = {
+                    "Scenario": scenarios[i]["name"],
+                    "Changes": describe_delta(scenarios[i]),
+                    "Status": "error",
+                    "Feasible": False,
+                    "Error": f"{type(e).__name__}: {e}",
+                }, None
+            if schedule is not None:
+                schedules[scenarios[i]["name"]] = schedule
+    comparison = pd.DataFrame(rows)
+    comparison.attrs["schedules"] = schedules
+    return comparison
@@ -0,0 +1,214 @@
+# schedule_cli.py
+
+# Headless command line for the scheduling engine (nightly jobs, no UI).
+#
+#   python schedule_cli.py PROBLEM [--out DIR] [--workers N] [--restarts N]
+#                          [--time-budget SECONDS] [--seed N] [--mode MODE]
+#                          [--scenarios MATRIX.json] [--excel] [--calendars]
+#   python schedule_cli.py --db saved_data/call_schedule.db --year 2025-2026 --block "Block 2" [...]
+#
+# PROBLEM is a JSON problem spec or a directory of CSV tables (see load_problem);
+# with --db the block's saved inputs are read from the app's SQLite store.
+
+import os
+import sys
+import json
+import argparse
+import itertools
+
+import pandas as pd
+
+from batch_scheduler import solve_programs, summarize_results
+from calendar_export import export_calendars
+from schedule_store import ScheduleStore
+
+# Table files looked up in a problem directory (first match wins); the second
+# names are the ones the old scheduling_engine __main__ used.
+TABLE_FILES = {
+    "residents": ["residents.csv", "resident_list_structured.csv"],
+    "pto": ["pto.csv", "pto_requests.csv"],
+    "holidays": ["holidays.csv", "holiday_schedule.csv"],
+    "previous": ["previous.csv"],
+    "soft_constraints": ["soft_constraints.csv"],
+}
+
+# Schedule file the old scheduling_engine __main__ wrote when --output_file was not given
+LEGACY_OUTPUT_FILE = "generated_schedule.csv"
+
+
+def _read_table(value, base_dir):
+    # Tables in a JSON spec are either inline row lists or paths to CSV files
+    if isinstance(value, str):
+        return pd.read_csv(os.path.join(base_dir, value))
+    return value
+
+
+def load_problem(path):
+    """Load a problem spec (the dict batch_scheduler.engine_arguments documents).
+
+    ``path`` is either a JSON file, whose tables are inline row lists or CSV
+    paths relative to the file, or a directory holding an optional
+    problem.json (dates and options), the CSV tables named in TABLE_FILES and
+    an optional previous_call_counts.json.
+    """
+    if os.path.isdir(path):
+        base_dir = path
+        spec_file = os.path.join(path, "problem.json")
+        problem = {}
+        if os.path.exists(spec_file):
+            with open(spec_file, "r") as f:
+                problem = json.load(f)
+        for key, names in TABLE_FILES.items():
+            if key in problem:
+                continue
+            for name in names:
+                if os.path.exists(os.path.join(path, name)):
+                    problem[key] = name
+                    break
+        counts_file = os.path.join(path, "previous_call_counts.json")
+        if "previous_call_counts" not in problem and os.path.exists(counts_file):
+            with open(counts_file, "r") as f:
+                problem["previous_call_counts"] = json.load(f)
+    else:
+        base_dir = os.path.dirname(os.path.abspath(path))
+        with open(path, "r") as f:
+            problem = json.load(f)
+    for key in TABLE_FILES:
+        if problem.get(key) is not None:
+            problem[key] = _read_table(problem[key], base_dir)
+    problem.setdefault("name", os.path.splitext(os.path.basename(os.path.abspath(path)))[0])
+    return problem
+
+
+def expand_scenarios(base, matrix):
+    """Problem specs for a scenario matrix.
+
+    ``matrix`` is either a list of override dicts (each may carry a "name") or
+    a dict mapping option names to lists of values, expanded as a cartesian
+    product. Overrides replace keys of the base problem.
+    """
+    if isinstance(matrix, dict):
+        keys = list(matrix)
+        matrix = [dict(zip(keys, values)) for values in itertools.product(*(matrix[k] for k in keys))]
+    scenarios = []
+    for i, overrides in enumerate(matrix):
+        scenario = dict(base)
+        scenario.update(overrides)
+        if "name" not in overrides:
+            label = ",".join(f"{k}={v}" for k, v in overrides.items()) or str(i + 1)
+            scenario["name"] = f"{base['name']}[{label}]"
+        scenarios.append(scenario)
+    return scenarios
+
+
+def write_results(results, out_dir, excel=False, calendars=False):
+    """Write each schedule and its pre-check issues, plus a summary, under out_dir.
+
+    With ``excel`` the calendar workbook is also streamed to schedule.xlsx,
+    and with ``calendars`` the per-resident feeds go to calendars.zip.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    for result in results:
+        program_dir = os.path.join(out_dir, _safe_name(result["program"]))
+        os.makedirs(program_dir, exist_ok=True)
+        if result["schedule"] is not None:
+            result["schedule"].to_csv(os.path.join(program_dir, "schedule.csv"), index=False)
+            if excel:
+                # openpyxl is only needed for --excel
+                from run_formatter import stream_schedule
+                stream_schedule(os.path.join(program_dir, "schedule.xlsx"), result["schedule"])
+            if calendars:
+                export_calendars(result["schedule"], os.path.join(program_dir, "calendars.zip"),
+                                 calendar_name=f"Call Schedule {result['program']}")
+        if result["issues"]:
+            pd.DataFrame(result["issues"]).to_csv(os.path.join(program_dir, "issues.csv"), index=False)
+        with open(os.path.join(program_dir, "result.json"), "w") as f:
+            json.dump({
+                "program": result["program"],
+                "status": result["status"],
+                "seconds": result["seconds"],
+                "search_stats": result["search_stats"],
+                "error": result["error"],
+            }, f, indent=2, default=str)
+    summary = summarize_results(results)
+    summary.to_csv(os.path.join(out_dir, "summary.csv"), index=False)
+    return summary
+
+
+def _safe_name(name):
+    return "".join(c if c.isalnum() or c in "-_.=," else "_" for c in str(name))
+
+
+def build_parser(default_output_file=None):
+    parser = argparse.ArgumentParser(description="Generate call schedules without the UI")
+    parser.add_argument("problem", nargs="?", default=".",
+                        help="Problem spec: a JSON file or a directory of CSV tables (default: current directory)")
+    parser.add_argument("--out", default="schedule_output", help="Output directory")
+    parser.add_argument("--db", default=None, help="Read the problem from the app's SQLite store instead")
+    parser.add_argument("--year", default=None, help="Academic year in the store (with --db), e.g. 2025-2026")
+    parser.add_argument("--block", default=None, help="Block in the store (with --db), e.g. \"Block 2\"")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--restarts", type=int, default=None, help="Randomized restarts per problem (engine default 10000)")
+    parser.add_argument("--time-budget", type=float, default=None, help="Search time limit per problem, in seconds")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible runs")
+    parser.add_argument("--mode", choices=["chronological", "scarcity"], default=None, help="Engine day order")
+    parser.add_argument("--scenarios", default=None,
+                        help="JSON scenario matrix: a list of overrides or a dict of option -> values")
+    parser.add_argument("--excel", action="store_true", help="Also write each schedule as a calendar workbook")
+    parser.add_argument("--calendars", action="store_true",
+                        help="Also write per-resident iCalendar and CSV feeds (calendars.zip)")
+    parser.add_argument("--start_date", "--start-date", dest="start_date", default=None, help="Override block start (YYYY-MM-DD)")
+    parser.add_argument("--end_date", "--end-date", dest="end_date", default=None, help="Override block end (YYYY-MM-DD)")
+    parser.add_argument("--previous_schedule", "--previous-schedule", dest="previous_schedule", default=None,
+                        help="Previous block schedule CSV")
+    parser.add_argument("--output_file", "--output-file", dest="output_file", default=default_output_file,
+                        help="Also write the schedule of a single-problem run to this CSV file"
+                        + (f" (default: {default_output_file})" if default_output_file else ""))
+    return parser
+
+
+def main(argv=None, default_output_file=None):
+    """Run the CLI; scheduling_engine's __main__ passes LEGACY_OUTPUT_FILE as
+    ``default_output_file`` so the old invocation still writes it."""
+    args = build_parser(default_output_file).parse_args(argv)
+    if args.db:
+        if not (args.year and args.block):
+            print("--db needs --year and --block", file=sys.stderr)
+            return 2
+        store = ScheduleStore(args.db)
+        problem = store.problem(args.year, args.block)
+        store.close()
+    else:
+        problem = load_problem(args.problem)
+    if args.start_date:
+        problem["start_date"] = args.start_date
+    if args.end_date:
+        problem["end_date"] = args.end_date
+    if args.previous_schedule:
+        problem["previous"] = pd.read_csv(args.previous_schedule)
+    for key, value in (("restarts", args.restarts), ("time_limit", args.time_budget),
+                       ("seed", args.seed), ("day_order", args.mode)):
+        if value is not None:
+            problem[key] = value
+    for key in ("start_date", "end_date"):
+        if not problem.get(key):
+            print(f"Problem has no {key}; set it in the spec or pass --{key}", file=sys.stderr)
+            return 2
+
+    problems = [problem]
+    if args.scenarios:
+        with open(args.scenarios, "r") as f:
+            problems = expand_scenarios(problem, json.load(f))
+
+    results = solve_programs(problems, max_workers=args.workers)
+    summary = write_results(results, args.out, excel=args.excel, calendars=args.calendars)
+    print(summary.to_string(index=False))
+    print(f"Results saved to: {args.out}")
+    if args.output_file and len(results) == 1 and results[0]["schedule"] is not None:
+        results[0]["schedule"].to_csv(args.output_file, index=False)
+        print(f"Schedule saved to: {args.output_file}")
+    return 0 if all(result["status"] == "ok" for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,371 @@
+# schedule_store.py
+
+# Local SQLite storage for everything the app works with, keyed by academic
+# year and block: rosters with PGY transitions, PTO and soft-constraint
+# intervals, holiday and previous-block assignments, block settings,
+# generated schedules and the call ledger. The app restores a year from here
+# on start-up or when the year changes, and the engine inputs load with one
+# indexed query per table.
+#
+#   store = ScheduleStore()                              # saved_data/call_schedule.db
+#   store.save_block_inputs("2025-2026", "Block 1", residents=[...], pto={...})
+#   store.engine_tables("2025-2026", "Block 1")          # engine DataFrames
+#   store.problem("2025-2026", "Block 2")                # batch_scheduler problem spec
+
+import os
+import json
+import sqlite3
+import threading
+
+import pandas as pd
+
+from call_ledger import CallLedger, LEDGER_COLUMNS
+
+DEFAULT_DB_PATH = os.path.join("saved_data", "call_schedule.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blocks (
+    academic_year TEXT NOT NULL,
+    block TEXT NOT NULL,
+    start_date TEXT,
+    end_date TEXT,
+    disable_holidays INTEGER NOT NULL DEFAULT 0,
+    disable_pto INTEGER NOT NULL DEFAULT 0,
+    disable_soft_constraints INTEGER NOT NULL DEFAULT 0,
+    soft_constraint_stats TEXT,
+    PRIMARY KEY (academic_year, block)
+);
+CREATE TABLE IF NOT EXISTS residents (
+    academic_year TEXT NOT NULL,
+    block TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    pgy INTEGER NOT NULL,
+    transition_date TEXT
+);
+CREATE INDEX IF NOT EXISTS residents_by_block ON residents (academic_year, block, position);
+CREATE TABLE IF NOT EXISTS requests (
+    academic_year TEXT NOT NULL,
+    block TEXT NOT NULL,
+    kind TEXT NOT NULL CHECK (kind IN ('pto', 'soft')),
+    resident TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS requests_by_block ON requests (academic_year, block, kind, resident, start_date);
+CREATE TABLE IF NOT EXISTS holidays (
+    academic_year TEXT NOT NULL,
+    block TEXT NOT NULL,
+    date TEXT NOT NULL,
+    name TEXT,
+    call TEXT,
+    backup TEXT
+);
+CREATE INDEX IF NOT EXISTS holidays_by_block ON holidays (academic_year, block, date);
+CREATE TABLE IF NOT EXISTS previous_assignments (
+    academic_year TEXT NOT NULL,
+    block TEXT NOT NULL,
+    date TEXT NOT NULL,
+    call TEXT,
+    backup TEXT
+);
+CREATE INDEX IF NOT EXISTS previous_by_block ON previous_assignments (academic_year, block, date);
+CREATE TABLE IF NOT EXISTS schedules (
+    academic_year TEXT NOT NULL,
+    block TEXT NOT NULL,
+    date TEXT NOT NULL,
+    call TEXT,
+    backup TEXT,
+    intern TEXT,
+    supervisor TEXT,
+    PRIMARY KEY (academic_year, block, date)
+);
+CREATE TABLE IF NOT EXISTS call_ledger (
+    academic_year TEXT NOT NULL,
+    block TEXT NOT NULL,
+    resident TEXT NOT NULL,
+    role TEXT NOT NULL,
+    pgy INTEGER NOT NULL,
+    weekday INTEGER NOT NULL,
+    fridays INTEGER NOT NULL,
+    saturday INTEGER NOT NULL,
+    sunday INTEGER NOT NULL,
+    total INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS call_ledger_by_block ON call_ledger (academic_year, block, resident);
+"""
+
+# Schedule table columns and the DataFrame columns they hold
+SCHEDULE_COLUMNS = {"date": "Date", "call": "Call", "backup": "Backup", "intern": "Intern", "supervisor": "Supervisor"}
+LEDGER_SQL_COLUMNS = ["block", "resident", "role", "pgy", "weekday", "fridays", "saturday", "sunday", "total"]
+# Block settings kept in the blocks table, as stored by save_block_inputs()
+BLOCK_SETTINGS = ("start_date", "end_date", "disable_holidays", "disable_pto", "disable_soft_constraints")
+
+
+def _date_str(value):
+    # 'YYYY-MM-DD' for dates, datetimes and date strings; None when empty
+    if value is None or (not isinstance(value, str) and pd.isna(value)) or value == "":
+        return None
+    return str(value)[:10] if isinstance(value, str) else pd.Timestamp(value).strftime("%Y-%m-%d")
+
+
+def _text(value):
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    return str(value)
+
+
+class ScheduleStore:
+    """SQLite store shared by every session of the app (one connection, serialized writes)."""
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if path != ":memory:" and directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock:
+            if path != ":memory:":
+                self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def _query(self, sql, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def _frame(self, sql, params=()):
+        with self.lock:
+            return pd.read_sql_query(sql, self.conn, params=params)
+
+    def _replace(self, table, academic_year, block, columns, rows, where="", params=()):
+        # Runs inside the caller's transaction
+        self.conn.execute(f"DELETE FROM {table} WHERE academic_year = ? AND block = ?{where}",
+                          (academic_year, block) + tuple(params))
+        if rows:
+            placeholders = ", ".join("?" * (len(columns) + 2))
+            self.conn.executemany(
+                f"INSERT INTO {table} (academic_year, block, {', '.join(columns)}) VALUES ({placeholders})",
+                [(academic_year, block) + tuple(row) for row in rows])
+
+    def years(self):
+        """Academic years with saved data, oldest first."""
+        return [row[0] for row in self._query("SELECT DISTINCT academic_year FROM blocks ORDER BY academic_year")]
+
+    def blocks(self, academic_year):
+        """Saved blocks of a year in date order."""
+        return [row[0] for row in self._query(
+            "SELECT block FROM blocks WHERE academic_year = ? ORDER BY start_date, block", (academic_year,))]
+
+    # --- Block inputs (in the app's session-state shapes) ---
+
+    def save_block_inputs(self, academic_year, block, residents=None, holidays=None, pto=None,
+                          soft_constraints=None, previous=None, settings=None):
+        """Save a block's inputs in one transaction; each argument given replaces what was stored.
+
+        ``residents`` is a list of {Name, PGY, Transition_Date}, ``holidays`` of
+        {Name, Date, Call, Backup}, ``previous`` of {Date, Call, Backup};
+        ``pto`` and ``soft_constraints`` map resident -> [{Start_Date, End_Date}].
+        ``settings`` holds any of BLOCK_SETTINGS.
+        """
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO blocks (academic_year, block) VALUES (?, ?)", (academic_year, block))
+            if settings:
+                changes = {key: settings[key] for key in BLOCK_SETTINGS if key in settings}
+                if changes:
+                    self.conn.execute(
+                        f"UPDATE blocks SET {', '.join(f'{key} = ?' for key in changes)} "
+                        "WHERE academic_year = ? AND block = ?",
+                        [_date_str(v) if key.endswith("_date") else int(bool(v)) for key, v in changes.items()]
+                        + [academic_year, block])
+            if residents is not None:
+                rows = []
+                for position, res in enumerate(residents):
+                    name = _text(res.get('Name'))
+                    if not name or not name.strip():
+                        continue
+                    try:
+                        pgy = int(float(res.get('PGY')))
+                    except (TypeError, ValueError):
+                        continue
+                    rows.append((position, name, pgy, _date_str(res.get('Transition_Date'))))
+                self._replace("residents", academic_year, block, ("position", "name", "pgy", "transition_date"), rows)
+            for kind, requests in (("pto", pto), ("soft", soft_constraints)):
+                if requests is None:
+                    continue
+                rows = [(kind, resident, _date_str(req['Start_Date']), _date_str(req['End_Date']))
+                        for resident, reqs in requests.items() for req in reqs
+                        if _date_str(req.get('Start_Date')) and _date_str(req.get('End_Date'))]
+                self._replace("requests", academic_year, block, ("kind", "resident", "start_date", "end_date"),
+                              rows, where=" AND kind = ?", params=(kind,))
+            if holidays is not None:
+                rows = [(_date_str(h['Date']), _text(h.get('Name')), _text(h.get('Call')), _text(h.get('Backup')))
+                        for h in holidays if _date_str(h.get('Date'))]
+                self._replace("holidays", academic_year, block, ("date", "name", "call", "backup"), rows)
+            if previous is not None:
+                rows = [(_date_str(a['Date']), _text(a.get('Call')), _text(a.get('Backup')))
+                        for a in previous if _date_str(a.get('Date'))]
+                self._replace("previous_assignments", academic_year, block, ("date", "call", "backup"), rows)
+
+    def load_block_inputs(self, academic_year, block):
+        """A block's inputs as saved by save_block_inputs(); None if the block was never saved."""
+        params = (academic_year, block)
+        settings = self._query(
+            f"SELECT {', '.join(BLOCK_SETTINGS)} FROM blocks WHERE academic_year = ? AND block = ?", params)
+        if not settings:
+            return None
+        start_date, end_date, disable_holidays, disable_pto, disable_soft = settings[0]
+        residents = [
+            {'Name': name, 'PGY': pgy, 'Transition_Date': transition_date}
+            for name, pgy, transition_date in self._query(
+                "SELECT name, pgy, transition_date FROM residents WHERE academic_year = ? AND block = ? "
+                "ORDER BY position", params)]
+        requests = {"pto": {}, "soft": {}}
+        for kind, resident, start, end in self._query(
+                "SELECT kind, resident, start_date, end_date FROM requests WHERE academic_year = ? AND block = ? "
+                "ORDER BY rowid", params):
+            requests[kind].setdefault(resident, []).append({'Start_Date': start, 'End_Date': end})
+        holidays = [
+            {'Name': name, 'Date': date, 'Call': call, 'Backup': backup}
+            for date, name, call, backup in self._query(
+                "SELECT date, name, call, backup FROM holidays WHERE academic_year = ? AND block = ? ORDER BY date",
+                params)]
+        previous = [
+            {'Date': date, 'Call': call or "", 'Backup': backup or ""}
+            for date, call, backup in self._query(
+                "SELECT date, call, backup FROM previous_assignments WHERE academic_year = ? AND block = ? "
+                "ORDER BY date", params)]
+        return {
+            'residents': residents,
+            'holidays': holidays,
+            'pto': requests["pto"],
+            'soft_constraints': requests["soft"],
+            'previous': previous,
+            'settings': {
+                'start_date': start_date,
+                'end_date': end_date,
+                'disable_holidays': bool(disable_holidays),
+                'disable_pto': bool(disable_pto),
+                'disable_soft_constraints': bool(disable_soft),
+            },
+        }
+
+    # --- Engine loaders ---
+
+    def engine_tables(self, academic_year, block):
+        """residents_df, prev_df, holidays_df, pto_df, soft_constraints_df for run_scheduling_engine.
+
+        Disabled holidays, PTO or soft constraints come back empty, as in the app.
+        prev_df is None when no previous-block assignments were saved.
+        """
+        params = (academic_year, block)
+        flags = self._query(
+            "SELECT disable_holidays, disable_pto, disable_soft_constraints FROM blocks "
+            "WHERE academic_year = ? AND block = ?", params)
+        disable_holidays, disable_pto, disable_soft = flags[0] if flags else (0, 0, 0)
+        residents_df = self._frame(
+            'SELECT name AS "Resident", pgy AS "PGY", transition_date AS "Transition Date", '
+            'CASE WHEN transition_date IS NULL THEN NULL ELSE MIN(pgy + 1, 4) END AS "Transition PGY" '
+            "FROM residents WHERE academic_year = ? AND block = ? ORDER BY position", params)
+        prev_df = self._frame(
+            'SELECT date AS "Date", call AS "Call", backup AS "Backup" FROM previous_assignments '
+            "WHERE academic_year = ? AND block = ? ORDER BY date", params)
+        holidays_df = self._frame(
+            'SELECT date AS "Date", call AS "Call", backup AS "Backup" FROM holidays '
+            "WHERE academic_year = ? AND block = ? ORDER BY date", params)
+
+        def requests(kind, disabled):
+            if disabled:
+                return pd.DataFrame()
+            return self._frame(
+                'SELECT resident AS "Resident", start_date AS "Start Date", end_date AS "End Date" FROM requests '
+                "WHERE academic_year = ? AND block = ? AND kind = ? ORDER BY rowid", params + (kind,))
+
+        if disable_holidays:
+            holidays_df = holidays_df.iloc[0:0]
+        return (residents_df, prev_df if not prev_df.empty else None, holidays_df,
+                requests("pto", disable_pto), requests("soft", disable_soft))
+
+    def problem(self, academic_year, block, **options):
+        """A batch_scheduler problem spec for a saved block.
+
+        previous_call_counts come from the ledger rows of the year's earlier
+        blocks; ``options`` (pgy4_cap, restarts, ...) are added as given.
+        """
+        residents_df, prev_df, holidays_df, pto_df, soft_df = self.engine_tables(academic_year, block)
+        dates = self._query("SELECT start_date, end_date FROM blocks WHERE academic_year = ? AND block = ?",
+                            (academic_year, block))
+        start_date, end_date = dates[0] if dates else (None, None)
+        earlier = [row[0] for row in self._query(
+            "SELECT block FROM blocks WHERE academic_year = ? AND start_date < ? ORDER BY start_date",
+            (academic_year, start_date))] if start_date else []
+        problem = {
+            "name": f"{academic_year} {block}",
+            "residents": residents_df,
+            "previous": prev_df,
+            "holidays": holidays_df,
+            "pto": pto_df,
+            "soft_constraints": soft_df if not soft_df.empty else None,
+            "start_date": start_date,
+            "end_date": end_date,
+            "previous_call_counts": self.ledger(academic_year).previous_call_counts(earlier) if earlier else None,
+        }
+        problem.update(options)
+        return problem
+
+    # --- Generated schedules ---
+
+    def save_schedule(self, academic_year, block, schedule_df, soft_constraint_stats=None):
+        """Replace a block's generated schedule (and its soft-constraint results)."""
+        df = schedule_df.reindex(columns=list(SCHEDULE_COLUMNS.values()))
+        rows = [(_date_str(date),) + tuple(_text(v) for v in values)
+                for date, *values in df.itertuples(index=False)]
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO blocks (academic_year, block) VALUES (?, ?)", (academic_year, block))
+            self.conn.execute(
+                "UPDATE blocks SET soft_constraint_stats = ? WHERE academic_year = ? AND block = ?",
+                (json.dumps(soft_constraint_stats, default=str) if soft_constraint_stats else None,
+                 academic_year, block))
+            self._replace("schedules", academic_year, block, tuple(SCHEDULE_COLUMNS), rows)
+
+    def load_schedule(self, academic_year, block):
+        """A block's saved schedule (soft-constraint results in ``attrs``), or None."""
+        columns = ", ".join(f'{column} AS "{name}"' for column, name in SCHEDULE_COLUMNS.items())
+        df = self._frame(
+            f"SELECT {columns} FROM schedules "
+            "WHERE academic_year = ? AND block = ? ORDER BY date", (academic_year, block))
+        if df.empty:
+            return None
+        stats = self._query("SELECT soft_constraint_stats FROM blocks WHERE academic_year = ? AND block = ?",
+                            (academic_year, block))
+        if stats and stats[0][0]:
+            df.attrs['soft_constraint_stats'] = json.loads(stats[0][0])
+        return df
+
+    # --- Call ledger ---
+
+    def load_ledger(self, academic_year):
+        """Ledger rows of a year (call_ledger.LEDGER_COLUMNS)."""
+        df = self._frame(f"SELECT {', '.join(LEDGER_SQL_COLUMNS)} FROM call_ledger WHERE academic_year = ? "
+                         "ORDER BY rowid", (academic_year,))
+        df.columns = LEDGER_COLUMNS
+        return df
+
+    def save_ledger(self, academic_year, entries):
+        """Replace a year's ledger rows."""
+        rows = [(academic_year, block, resident, role) + tuple(int(v) for v in counts)
+                for block, resident, role, *counts in entries[LEDGER_COLUMNS].itertuples(index=False)]
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM call_ledger WHERE academic_year = ?", (academic_year,))
+            self.conn.executemany(
+                f"INSERT INTO call_ledger (academic_year, {', '.join(LEDGER_SQL_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * (len(LEDGER_SQL_COLUMNS) + 1))})", rows)
+
+    def ledger(self, academic_year):
+        """The year's CallLedger, saving back into this store."""
+        return CallLedger.for_year(academic_year, store=self)
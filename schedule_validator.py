@@ -0,0 +1,230 @@
+# schedule_validator.py
+
+# Vectorized check of a finished schedule against the hard rules in
+# call_rules: spacing, double booking, PGY / weekday eligibility (with PGY
+# transitions), PTO, fixed holiday assignments and the PGY-4 call cap.
+# The engine runs it on every schedule it returns; the app uses it for
+# uploaded or hand-edited schedules.
+
+from datetime import date as date_type
+
+import numpy as np
+import pandas as pd
+
+from call_rules import RULES
+
+ROLES = ("Call", "Backup", "Intern")
+CALL, BACKUP, INTERN = range(3)
+# date(1970, 1, 1).toordinal(): converts numpy day numbers to date ordinals
+_EPOCH_ORDINAL = 719163
+
+
+class ScheduleValidationError(Exception):
+    """Raised when a schedule breaks a hard rule; ``issues`` lists every violation."""
+
+    def __init__(self, message, issues=None):
+        super().__init__(message)
+        self.issues = issues or []
+
+
+def _spacing_matrix(rules):
+    # Minimum gap by (earlier role, later role); interns only space against interns
+    spacing = np.zeros((3, 3), dtype=np.int64)
+    for (first, second), gap in rules.spacing.items():
+        spacing[ROLES.index(first.capitalize()), ROLES.index(second.capitalize())] = gap
+    spacing[INTERN, INTERN] = rules.intern_spacing
+    return spacing
+
+
+def _ordinals(values):
+    days = pd.to_datetime(pd.Series(values, dtype=object)).to_numpy().astype("datetime64[D]").astype(np.int64)
+    return days + _EPOCH_ORDINAL
+
+
+def _fmt(ordinal):
+    return date_type.fromordinal(int(ordinal)).strftime("%Y-%m-%d")
+
+
+def validate_assignments(schedule, residents_info, transitions=None, pto_requests=None,
+                         fixed_assignments=None, pgy4_cap=None, rules=RULES):
+    """Return every hard-rule violation in a schedule as a list of issue dicts.
+
+    ``schedule`` is a DataFrame with Date, Call, Backup[, Intern] columns or
+    a list of (date, call, backup, intern) tuples. ``residents_info`` maps
+    PGY -> names, ``transitions`` name -> (date, new PGY) effective after the
+    date, ``pto_requests`` name -> DateIntervals (anything with sorted
+    ``starts``/``ends`` ordinals), ``fixed_assignments`` 'YYYY-MM-DD' ->
+    (call, backup). Fixed days are exempt from eligibility checks. Fixed days
+    outside the schedule, such as the end of the previous block, only take
+    part in spacing. Issues have Date, Resident, Role, Rule and Details keys
+    and are sorted by date. An empty list means the schedule is valid.
+    """
+    if isinstance(schedule, pd.DataFrame):
+        df = schedule.reindex(columns=["Date", "Call", "Backup", "Intern"])
+    else:
+        df = pd.DataFrame(list(schedule), columns=["Date", "Call", "Backup", "Intern"])
+    transitions = transitions or {}
+    pto_requests = pto_requests or {}
+    fixed_assignments = fixed_assignments or {}
+    issues = []
+
+    def report(ordinal, resident, role, rule, details):
+        issues.append({
+            'Date': _fmt(ordinal),
+            'Resident': resident,
+            'Role': role,
+            'Rule': rule,
+            'Details': details,
+        })
+
+    if df.empty:
+        return issues
+    row_days = _ordinals(df["Date"])
+    date_strs = [_fmt(d) for d in row_days]
+    row_fixed = np.array([d in fixed_assignments for d in date_strs])
+    in_schedule = set(date_strs)
+
+    # Fixed holiday assignments must be kept as given
+    for i, date_str in enumerate(date_strs):
+        if row_fixed[i]:
+            call_fixed, backup_fixed = fixed_assignments[date_str]
+            for role, expected in (("Call", call_fixed), ("Backup", backup_fixed)):
+                if df[role].iat[i] != expected:
+                    report(row_days[i], df[role].iat[i], role, 'Fixed assignment',
+                           f"{role} must be {expected} on this fixed day.")
+
+    # One event per (resident, day, role); fixed days outside the schedule add spacing context
+    residents, days, roles, fixed, rows = [], [], [], [], []
+    for role in (CALL, BACKUP, INTERN):
+        names = df[ROLES[role]].to_numpy(dtype=object)
+        present = pd.notna(names) & (names != "")
+        idx = np.flatnonzero(present)
+        residents.append(names[idx])
+        days.append(row_days[idx])
+        roles.append(np.full(len(idx), role))
+        fixed.append(row_fixed[idx])
+        rows.append(idx)
+    context = [(d, role, name) for d, pair in fixed_assignments.items() if d not in in_schedule
+               for role, name in zip((CALL, BACKUP), pair) if pd.notna(name)]
+    if context:
+        residents.append(np.array([c[2] for c in context], dtype=object))
+        days.append(_ordinals([c[0] for c in context]))
+        roles.append(np.array([c[1] for c in context]))
+        fixed.append(np.ones(len(context), dtype=bool))
+        rows.append(np.full(len(context), -1))
+    residents = np.concatenate(residents)
+    days = np.concatenate(days)
+    roles = np.concatenate(roles)
+    fixed = np.concatenate(fixed)
+    rows = np.concatenate(rows)
+
+    # Sort events by resident then day so each resident's events are contiguous
+    codes, uniques = pd.factorize(residents)
+    order = np.lexsort((roles, days, codes))
+    residents, days, roles, fixed, rows, codes = (
+        a[order] for a in (residents, days, roles, fixed, rows, codes))
+
+    # Double booking: the same resident twice on one day
+    same_day = (codes[1:] == codes[:-1]) & (days[1:] == days[:-1])
+    for i in np.flatnonzero(same_day):
+        report(days[i], residents[i], f"{ROLES[roles[i]]}/{ROLES[roles[i + 1]]}", 'Double booking',
+               f"{residents[i]} holds two roles on the same day.")
+
+    # Spacing: compare each event with the next ones of the same resident
+    # until every pair is further apart than the widest rule
+    spacing = _spacing_matrix(rules)
+    widest = int(spacing.max())
+    lag = 1
+    while lag < len(days):
+        same = codes[lag:] == codes[:-lag]
+        gap = days[lag:] - days[:-lag]
+        close = same & (gap < widest)
+        if not close.any():
+            break
+        bad = close & (gap > 0) & (gap < spacing[roles[:-lag], roles[lag:]]) & ~(fixed[:-lag] & fixed[lag:])
+        for i in np.flatnonzero(bad):
+            first, second = ROLES[roles[i]], ROLES[roles[i + lag]]
+            report(days[i + lag], residents[i], f"{first}/{second}", 'Spacing',
+                   f"{first} on {_fmt(days[i])} and {second} on {_fmt(days[i + lag])} are "
+                   f"{gap[i]} day(s) apart; at least {spacing[roles[i], roles[i + lag]]} required.")
+        lag += 1
+
+    # PGY of every event on its day, transitions included
+    base_pgy = {r: pgy for pgy, names in residents_info.items() for r in names}
+    never = np.iinfo(np.int64).max
+    pgy_by_code = np.array([base_pgy.get(r, -1) for r in uniques], dtype=np.int64)
+    trans_day = np.array([_ordinals([transitions[r][0]])[0] if r in transitions else never for r in uniques])
+    trans_pgy = np.array([transitions[r][1] if r in transitions else -1 for r in uniques], dtype=np.int64)
+    pgy = np.where(days > trans_day[codes], trans_pgy[codes], pgy_by_code[codes])
+    dow = (days - 1) % 7
+
+    # Only schedule rows are checked; previous-block and holiday events just add spacing context
+    for code in np.unique(codes[(pgy_by_code[codes] < 0) & (rows >= 0)]):
+        first = np.flatnonzero((codes == code) & (rows >= 0))[0]
+        report(days[first], uniques[code], ROLES[roles[first]], 'Unknown resident',
+               f"{uniques[code]} is not on the roster.")
+
+    # Eligibility on non-fixed schedule days
+    call_ok = np.array(rules.call_ok, dtype=bool)
+    known = (pgy >= 0) & (pgy < len(call_ok))
+    check = known & ~fixed
+    call_pgy_by_row = np.full(len(df), -1, dtype=np.int64)
+    is_call = roles == CALL
+    call_pgy_by_row[rows[is_call & (rows >= 0)]] = pgy[is_call & (rows >= 0)]
+    safe_pgy = np.where(known, pgy, 0)
+    bad_call = check & is_call & ~call_ok[safe_pgy, dow]
+    is_backup = roles == BACKUP
+    bad_backup = check & is_backup & (
+        (pgy < rules.backup_min_pgy) | (pgy != call_pgy_by_row[np.maximum(rows, 0)]))
+    bad_intern = check & (roles == INTERN) & (pgy != rules.intern_pgy)
+    for i in np.flatnonzero(bad_call):
+        report(days[i], residents[i], "Call", 'Call eligibility',
+               f"PGY-{pgy[i]} cannot take call on a {date_type.fromordinal(int(days[i])).strftime('%A')}.")
+    for i in np.flatnonzero(bad_backup):
+        report(days[i], residents[i], "Backup", 'Backup eligibility',
+               f"PGY-{pgy[i]} backup for a PGY-{call_pgy_by_row[rows[i]]} call resident.")
+    for i in np.flatnonzero(bad_intern):
+        report(days[i], residents[i], "Intern", 'Intern eligibility', f"PGY-{pgy[i]} assigned as intern.")
+
+    # PTO
+    for code, resident in enumerate(uniques):
+        intervals = pto_requests.get(resident)
+        if not intervals:
+            continue
+        mask = (codes == code) & ~fixed
+        if not mask.any():
+            continue
+        starts = np.asarray(intervals.starts)
+        ends = np.asarray(intervals.ends)
+        event_days = days[mask]
+        pos = np.searchsorted(starts, event_days, side="right") - 1
+        on_pto = (pos >= 0) & (event_days <= ends[np.maximum(pos, 0)])
+        for i in np.flatnonzero(mask)[on_pto]:
+            report(days[i], resident, ROLES[roles[i]], 'PTO', f"{resident} is on PTO.")
+
+    # PGY-4 call cap over the schedule's own days
+    if pgy4_cap is not None:
+        capped = is_call & (rows >= 0) & (pgy == rules.capped_pgy)
+        for code in np.unique(codes[capped]):
+            call_days = days[capped & (codes == code)]
+            if len(call_days) > pgy4_cap:
+                report(call_days[pgy4_cap], uniques[code], "Call", 'PGY-4 call cap',
+                       f"{len(call_days)} calls as PGY-4; the cap is {pgy4_cap}.")
+
+    issues.sort(key=lambda issue: (issue['Date'], issue['Rule']))
+    return issues
+
+
+def validate_uploaded_schedule(schedule_df, res_df, pto_df, hol_df, prev_df=None, pgy4_cap=None, rules=RULES):
+    """Validate an uploaded or hand-edited schedule against the app's tables.
+
+    The tables are parsed as for the engine (prepare_scheduling_inputs):
+    holiday and previous block rows become fixed assignments. Returns the
+    validate_assignments() issue list.
+    """
+    # Imported here: scheduling_engine imports this module
+    from scheduling_engine import prepare_scheduling_inputs
+    inputs = prepare_scheduling_inputs(prev_df, res_df, pto_df, hol_df)
+    return validate_assignments(
+        schedule_df, inputs["residents_info"], inputs["transitions"], inputs["pto_requests"],
+        inputs["fixed_assignments"], pgy4_cap, rules)
@@ -4,19 +4,271 @@
 
 import pandas as pd
 import random
+import time
 from datetime import datetime as dt_type, date as date_type, timedelta
 import re
-import argparse
+from collections import deque
+from bisect import bisect_left, bisect_right
+from call_rules import RULES, CompiledRules, compile_rules
+from schedule_validator import validate_assignments, ScheduleValidationError
+
+# Days ahead of the chronological frontier that the 'scarcity' day order may
+# pick from. Ranking the whole block fragments the spacing constraints.
+SCARCITY_LOOKAHEAD = 2
+
+# Print the per-day fairness counts of every call candidate. This runs on
+# every day of every restart, so it dominates run time when enabled.
+DEBUG_FAIRNESS = False
+
+# Write each scheduler's previous_call_counts to debug_prev_counts_engine.txt
+# in the working directory. Parallel runs all write the same file.
+DEBUG_PREVIOUS_COUNTS = False
+
+# --- Max-flow helper (used by the intern assignment stage) ---
+
+class _FlowNetwork:
+    """Small Dinic max-flow solver over integer capacities."""
+
+    def __init__(self):
+        self.graph = []  # node -> list of edge indices
+        self.to = []
+        self.cap = []
+
+    def add_node(self):
+        self.graph.append([])
+        return len(self.graph) - 1
+
+    def add_edge(self, u, v, cap):
+        """Add u -> v with the given capacity and return the forward edge index."""
+        self.graph[u].append(len(self.to))
+        self.to.append(v)
+        self.cap.append(cap)
+        self.graph[v].append(len(self.to))
+        self.to.append(u)
+        self.cap.append(0)
+        return len(self.to) - 2
+
+    def flow_on(self, edge):
+        # Flow pushed through a forward edge is held by its reverse edge
+        return self.cap[edge ^ 1]
+
+    def max_flow(self, s, t):
+        total = 0
+        while True:
+            level = [-1] * len(self.graph)
+            level[s] = 0
+            queue = deque([s])
+            while queue:
+                u = queue.popleft()
+                for e in self.graph[u]:
+                    if self.cap[e] > 0 and level[self.to[e]] < 0:
+                        level[self.to[e]] = level[u] + 1
+                        queue.append(self.to[e])
+            if level[t] < 0:
+                return total
+            it = [0] * len(self.graph)
+            while True:
+                pushed = self._augment(s, t, level, it)
+                if not pushed:
+                    break
+                total += pushed
+
+    def _augment(self, s, t, level, it):
+        # Iterative DFS along the level graph; returns the bottleneck pushed
+        path = []
+        u = s
+        while u != t:
+            edges = self.graph[u]
+            while it[u] < len(edges):
+                e = edges[it[u]]
+                if self.cap[e] > 0 and level[self.to[e]] == level[u] + 1:
+                    break
+                it[u] += 1
+            if it[u] == len(edges):
+                if not path:
+                    return 0
+                level[u] = -1  # dead end, prune it
+                e = path.pop()
+                u = self.to[e ^ 1]
+                it[u] += 1
+                continue
+            path.append(edges[it[u]])
+            u = self.to[edges[it[u]]]
+        pushed = min(self.cap[e] for e in path)
+        for e in path:
+            self.cap[e] -= pushed
+            self.cap[e ^ 1] += pushed
+        return pushed
+
+# --- Date range storage for PTO and soft constraints ---
+
+def _to_day(value):
+    """Return the proleptic ordinal of a date-like value, or None if it is missing.
+
+    Strings take any format pd.Timestamp reads ('2025-07-04', '2025-07-04
+    00:00:00', '7/4/2025', ...), like the pd.to_datetime parsing of user CSVs;
+    blank strings count as missing and unparseable ones raise ValueError.
+    """
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, (dt_type, date_type)):
+        return value.toordinal()
+    if not isinstance(value, str):
+        return pd.Timestamp(value).toordinal()
+    value = value.strip()
+    if not value:
+        return None
+    try:
+        return dt_type.strptime(value, "%Y-%m-%d").toordinal()
+    except ValueError:
+        parsed = pd.Timestamp(value)
+        if pd.isna(parsed):
+            return None
+        return parsed.toordinal()
+
+
+class DateIntervals:
+    """Sorted, merged, inclusive day ranges with O(log n) membership tests.
+
+    Days are stored as ordinals so ``date``, ``datetime`` and ``pd.Timestamp``
+    values can all be looked up directly.
+    """
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+
+    def add(self, start, end):
+        """Insert the inclusive ordinal range [start, end], merging neighbours."""
+        if end < start:
+            return
+        i = bisect_left(self.ends, start - 1)
+        j = bisect_right(self.starts, end + 1)
+        if i < j:
+            start = min(start, self.starts[i])
+            end = max(end, self.ends[j - 1])
+        self.starts[i:j] = [start]
+        self.ends[i:j] = [end]
+
+    def remove(self, start, end):
+        """Remove the inclusive ordinal range [start, end], splitting ranges as needed."""
+        if end < start:
+            return
+        i = bisect_right(self.ends, start - 1)
+        j = bisect_left(self.starts, end + 1)
+        if i >= j:
+            return
+        kept_starts, kept_ends = [], []
+        if self.starts[i] < start:
+            kept_starts.append(self.starts[i])
+            kept_ends.append(start - 1)
+        if self.ends[j - 1] > end:
+            kept_starts.append(end + 1)
+            kept_ends.append(self.ends[j - 1])
+        self.starts[i:j] = kept_starts
+        self.ends[i:j] = kept_ends
+
+    def copy(self):
+        other = DateIntervals()
+        other.starts = list(self.starts)
+        other.ends = list(self.ends)
+        return other
+
+    def __contains__(self, day):
+        if not isinstance(day, int):
+            day = _to_day(day)
+        i = bisect_right(self.starts, day) - 1
+        return i >= 0 and day <= self.ends[i]
+
+    def __len__(self):
+        """Number of days covered."""
+        return sum(e - s + 1 for s, e in zip(self.starts, self.ends))
+
+    def __bool__(self):
+        return bool(self.starts)
+
+    def __iter__(self):
+        for s, e in zip(self.starts, self.ends):
+            yield date_type.fromordinal(s), date_type.fromordinal(e)
+
+    def __repr__(self):
+        return f"DateIntervals({[(str(s), str(e)) for s, e in self]})"
+
+
+def parse_date_ranges(source, clip_start=None, clip_end=None, errors="raise"):
+    """Parse PTO / soft-constraint input once into ``{resident: DateIntervals}``.
+
+    ``source`` may be a DataFrame with Resident / Start Date / End Date columns,
+    a dict of resident -> DateIntervals (returned clipped), or the older dict of
+    resident -> list of 'YYYY-MM-DD' day strings. Ranges are clipped to
+    [clip_start, clip_end] when given. Dates are read as in _to_day, for PTO
+    and soft constraints alike. With errors='skip' (soft constraints), rows
+    whose dates are missing or unparseable are dropped instead of raising
+    ValueError.
+    """
+    lo = _to_day(clip_start) if clip_start is not None else None
+    hi = _to_day(clip_end) if clip_end is not None else None
+    ranges = []
+    if isinstance(source, pd.DataFrame):
+        if not source.empty:
+            ranges = zip(source['Resident'], source['Start Date'], source['End Date'])
+    elif isinstance(source, dict):
+        for resident, value in source.items():
+            if isinstance(value, DateIntervals):
+                ranges.extend((resident, s, e) for s, e in value)
+            else:
+                ranges.extend((resident, day, day) for day in value)
+    result = {}
+    for resident, start, end in ranges:
+        try:
+            start, end = _to_day(start), _to_day(end)
+        except ValueError:
+            if errors == "skip":
+                continue
+            raise
+        if start is None or end is None:
+            if errors == "skip":
+                continue
+            raise ValueError(f"Missing start or end date for {resident}")
+        if lo is not None:
+            start = max(start, lo)
+        if hi is not None:
+            end = min(end, hi)
+        if start > end:
+            continue
+        result.setdefault(resident, DateIntervals()).add(start, end)
+    return result
+
+class InfeasibleScheduleError(Exception):
+    """Raised when no schedule can satisfy the hard constraints.
+
+    ``issues`` holds the feasibility diagnostics (see
+    CallScheduler.feasibility_report) explaining which dates are at fault.
+    ``stage`` is "precheck" when the feasibility pre-check rejected the
+    problem before any search, and "search" when every restart failed.
+    """
+
+    def __init__(self, message, issues=None, stage="search"):
+        super().__init__(message)
+        self.issues = issues or []
+        self.stage = stage
 
 # --- CallScheduler CLASS ---
 
 class CallScheduler:
-    def __init__(self, residents_info, fixed_assignments, holidays, pto_requests=None, transitions=None, pgy4_cap=None, previous_call_counts=None, soft_constraints=None):
-        with open("debug_prev_counts_engine.txt", "w") as f:
-            f.write(str(previous_call_counts))
+    def __init__(self, residents_info, fixed_assignments, holidays, pto_requests=None, transitions=None, pgy4_cap=None, previous_call_counts=None, soft_constraints=None, rules=None):
+        if DEBUG_PREVIOUS_COUNTS:
+            with open("debug_prev_counts_engine.txt", "w") as f:
+                f.write(str(previous_call_counts))
         self.residents_info = residents_info
+        # Resident -> base PGY, so PGY lookups are a dict read
+        self.base_pgy = {r: pgy for pgy, residents in residents_info.items() for r in residents}
         self.fixed_assignments = fixed_assignments
         self.holidays = holidays
+        # Compiled eligibility/spacing/fairness tables (call_rules.RULES by default)
+        if rules is None:
+            rules = RULES
+        self.rules = rules if isinstance(rules, CompiledRules) else compile_rules(rules)
         
         # Initialize logs
         self.call_log = {}
@@ -26,45 +278,14 @@ class CallScheduler:
         # Helper to populate logs with fixed assignments
         self._populate_fixed_assignments_logs()
         
-        if isinstance(pto_requests, pd.DataFrame):
-            if not pto_requests.empty:
-                pto_dict = {}
-                for _, row in pto_requests.iterrows():
-                    resident = row['Resident']
-                    if isinstance(row['Start Date'], (dt_type, date_type)):
-                        start = row['Start Date']
-                    else:
-                        start = dt_type.strptime(str(row['Start Date']), "%Y-%m-%d")
-                    if isinstance(row['End Date'], (dt_type, date_type)):
-                        end = row['End Date']
-                    else:
-                        end = dt_type.strptime(str(row['End Date']), "%Y-%m-%d")
-                    current = start
-                    while current <= end:
-                        pto_dict.setdefault(resident, []).append(current.strftime('%Y-%m-%d'))
-                        current += timedelta(days=1)
-                self.pto_requests = pto_dict
-            else:
-                self.pto_requests = {}
-        elif pto_requests:
-            self.pto_requests = pto_requests
-        else:
-            self.pto_requests = {}
-        
-        # Process soft constraints (assume already filtered by block in run_scheduling_engine)
-        self.soft_constraints = {}
+        # Hard (PTO) and soft constraints as per-resident interval sets.
+        # Soft constraints are assumed already clipped to the block by run_scheduling_engine.
+        self.pto_requests = parse_date_ranges(pto_requests) if pto_requests is not None else {}
+        self.soft_constraints = parse_date_ranges(soft_constraints, errors="skip") if soft_constraints is not None else {}
         self.soft_constraint_violations = []
-        if isinstance(soft_constraints, pd.DataFrame) and not soft_constraints.empty:
-            for _, row in soft_constraints.iterrows():
-                resident = row['Resident']
-                start = row['Start Date']
-                end = row['End Date']
-                if pd.isna(start) or pd.isna(end):
-                    continue  # skip invalid dates
-                current = start
-                while current <= end:
-                    self.soft_constraints.setdefault(resident, []).append(current.strftime('%Y-%m-%d'))
-                    current += timedelta(days=1)
+        self.feasibility_issues = []
+        self.validation_issues = []
+        self.search_stats = {}
         
         self.transitions = transitions if transitions else {}
         self.pgy4_cap = pgy4_cap
@@ -74,7 +295,7 @@ class CallScheduler:
         self.intern_log = {}
         self.assignments = []
         self.assignment_history = []  # Track all assignments for backtracking
-        self.tried_combinations = set()  # Track tried combinations to avoid cycles
+        self.tried_combinations = set()  # Combinations tried in the current restart, to avoid cycles
 
         # Initialize call counts with previous values if provided
         self.call_counts = {}
@@ -139,10 +360,7 @@ class CallScheduler:
                 d2 = dt_type.combine(d2, dt_type.min.time())
             if d1 > d2:  # Only return new PGY if date is strictly after transition date
                 return new_pgy
-        for pgy, residents in self.residents_info.items():
-            if resident in residents:
-                return pgy
-        return None
+        return self.base_pgy.get(resident)
 
     def is_pgy_match(self, resident, current_date, role="call"):
         date_str = current_date.strftime("%Y-%m-%d")
@@ -158,52 +376,30 @@ class CallScheduler:
         if pgy is None:
             return False
 
-        # For backup role, allow any PGY-2 or higher
         if role == "backup":
-            return pgy >= 2
-
-        # For call role, use specific day requirements
-        dow = current_date.weekday()
-        if pgy == 1:  # PGY-1 interns
-            # Interns are not eligible for primary call
-            return False
-        elif pgy == 2:
-            if dow in [1, 2, 4, 6]:  # Tuesday, Wednesday, Friday, Sunday
-                return True
-        elif pgy == 3:
-            if dow in [0, 2, 3, 5]:  # Monday, Wednesday, Thursday, Saturday
-                return True
-        elif pgy == 4:
-            if dow == 3:  # Thursday
-                return True
-        return False
+            return self.rules.can_backup(pgy)
+        return self.rules.can_call(pgy, current_date.weekday())
 
     def spacing_okay(self, resident, current_date, role):
-        # For call: 4 days from all previous call and backup assignments
-        if role == "call":
-            for assigned_date in self.call_log.get(resident, []):
-                if abs((current_date - assigned_date).days) < 4:
-                    return False
-            for assigned_date in self.backup_log.get(resident, []):
-                if abs((current_date - assigned_date).days) < 4:
-                    return False
-        # For backup: 4 days from all previous call assignments, 3 days from all previous backup assignments
-        elif role == "backup":
-            for assigned_date in self.call_log.get(resident, []):
-                if abs((current_date - assigned_date).days) < 4:
-                    return False
-            for assigned_date in self.backup_log.get(resident, []):
-                if abs((current_date - assigned_date).days) < 3:
-                    return False
+        # Minimum gap to every earlier call/backup, per (logged role, new role)
+        if role not in ("call", "backup"):
+            return True
+        call_gap = self.rules.spacing[("call", role)]
+        for assigned_date in self.call_log.get(resident, []):
+            if abs((current_date - assigned_date).days) < call_gap:
+                return False
+        backup_gap = self.rules.spacing[("backup", role)]
+        for assigned_date in self.backup_log.get(resident, []):
+            if abs((current_date - assigned_date).days) < backup_gap:
+                return False
         return True
 
     def pto_okay(self, resident, current_date):
-        return current_date.strftime("%Y-%m-%d") not in self.pto_requests.get(resident, [])
+        return current_date not in self.pto_requests.get(resident, ())
 
     def soft_constraint_score(self, resident, current_date):
         """Calculate how well a soft constraint is satisfied for a resident on a given date"""
-        date_str = current_date.strftime("%Y-%m-%d")
-        if resident in self.soft_constraints and date_str in self.soft_constraints[resident]:
+        if current_date in self.soft_constraints.get(resident, ()):
             return -1  # Penalty for violating soft constraint
         return 0  # No penalty if no soft constraint exists
 
@@ -217,32 +413,16 @@ class CallScheduler:
             if resident in residents:
                 pgy = test_pgy
                 break
-        # Default to total if PGY not found
-        if pgy is None:
+        key = self._fairness_key(pgy, dow)
+        if key == "total":
             return (counts["total"],)
-        # PGY-2: Weekdays, Fridays, Sundays
-        if pgy == 2:
-            if dow in [0,1,2,3]:
-                return (counts["weekday"], counts["total"])
-            elif dow == 4:
-                return (counts["friday"], counts["total"])
-            elif dow == 6:
-                return (counts["sunday"], counts["total"])
-            else:
-                return (counts["total"],)
-        # PGY-3: Weekdays, Saturdays
-        elif pgy == 3:
-            if dow in [0,1,2,3]:
-                return (counts["weekday"], counts["total"])
-            elif dow == 5:
-                return (counts["saturday"], counts["total"])
-            else:
-                return (counts["total"],)
-        # PGY-4: Only total (or add more if needed)
-        elif pgy == 4:
-            return (counts["total"],)
-        # Default fallback
-        return (counts["total"],)
+        return (counts[key], counts["total"])
+
+    def _fairness_key(self, pgy, dow):
+        # Day-type count a PGY level is balanced on for this weekday ("total" otherwise)
+        if pgy is None or not 0 <= pgy < len(self.rules.fairness_key):
+            return "total"
+        return self.rules.fairness_key[pgy][dow]
 
     def eligible_residents(self, current_date, role):
         candidates = []
@@ -257,26 +437,11 @@ class CallScheduler:
             # Enforce PGY-4 cap for call role (per block)
             if role == "call" and self.pgy4_cap is not None:
                 pgy = self.get_resident_pgy(r, current_date)
-                if pgy == 4 and self.call_counts[r]["block_total"] >= self.pgy4_cap:
+                if pgy == self.rules.capped_pgy and self.call_counts[r]["block_total"] >= self.pgy4_cap:
                     continue
             candidates.append(r)
         return candidates
 
-    def is_intern_eligible(self, intern, current_date, call_resident):
-        date_str = current_date.strftime("%Y-%m-%d")
-        if date_str in self.fixed_assignments:
-            return False
-        call_pgy = self.get_resident_pgy(call_resident, current_date)
-        if call_pgy not in [3, 4]:
-            return False
-        if not self.pto_okay(intern, current_date):
-            return False
-        # Q2 rule: at least one day between intern assignments
-        for prev_date in self.intern_log.get(intern, []):
-            if abs((current_date - prev_date).days) < 2:
-                return False
-        return True
-
     def undo_assignment(self, date_str):
         assignment = None
         for idx, (d, c, b, intern) in enumerate(self.assignments):
@@ -296,22 +461,12 @@ class CallScheduler:
             dow = date_obj.weekday()
             self.call_counts[call]["total"] -= 1
             self.call_counts[call]["block_total"] -= 1  # Decrement per-block count for PGY-4 cap
-            if dow in [0,1,2,3]:
-                self.call_counts[call]["weekday"] -= 1
-            elif dow == 4:
-                self.call_counts[call]["friday"] -= 1
-            elif dow == 5:
-                self.call_counts[call]["saturday"] -= 1
-            elif dow == 6:
-                self.call_counts[call]["sunday"] -= 1
+            self.call_counts[call][self.rules.day_type[dow]] -= 1
             if intern:
-                if dow == 5:
-                    self.call_counts[intern]["intern_saturday"] -= 1
-                else:
-                    self.call_counts[intern]["intern_weekday"] -= 1
+                self.call_counts[intern]["intern_" + self.rules.intern_day_type[dow]] -= 1
 
-    def get_combination_key(self, date_str, call, backup, intern):
-        return f"{date_str}:{call}:{backup}:{intern}"
+    def get_combination_key(self, date_str, call, backup):
+        return f"{date_str}:{call}:{backup}"
 
     def assign_day(self, current_date, backtrack=False):
         date_str = current_date.strftime("%Y-%m-%d")
@@ -328,55 +483,27 @@ class CallScheduler:
         if not call_candidates:
             return False
         
-        # Apply PGY preference penalties for Wednesdays and Thursdays
-        if current_date.weekday() == 2:  # Wednesday
-            # Prefer PGY-2s over PGY-3s
-            for r in call_candidates:
-                pgy = self.get_resident_pgy(r, current_date)
-                if pgy == 3:
-                    # Add a small penalty to PGY-3s
-                    self.call_counts[r]["total"] += 0.5
-        if current_date.weekday() == 3:  # Thursday
-            # Prefer PGY-4s over PGY-3s (if under cap)
-            for r in call_candidates:
-                pgy = self.get_resident_pgy(r, current_date)
-                if pgy == 3:
-                    self.call_counts[r]["total"] += 0.75
-
-        # Sort candidates by relevant day-type count only
+        # PGY preference penalties (e.g. PGY-3s on Wednesdays/Thursdays) from the
+        # rule tables; applied to the ranking only, never to the stored counts
+        penalties = {}
         fairness_counts = {}
         for r in call_candidates:
             counts = self.call_counts[r]
             pgy = self.get_resident_pgy(r, current_date)
-            if pgy == 2:
-                if dow in [0,1,2,3]:
-                    fairness_counts[r] = counts["weekday"] + counts["prev_weekday"]
-                elif dow == 4:
-                    fairness_counts[r] = counts["friday"] + counts["prev_friday"]
-                elif dow == 6:
-                    fairness_counts[r] = counts["sunday"] + counts["prev_sunday"]
-                else:
-                    fairness_counts[r] = counts["total"] + counts["prev_total"]
-            elif pgy == 3:
-                if dow in [0,1,2,3]:
-                    fairness_counts[r] = counts["weekday"] + counts["prev_weekday"]
-                elif dow == 5:
-                    fairness_counts[r] = counts["saturday"] + counts["prev_saturday"]
-                else:
-                    fairness_counts[r] = counts["total"] + counts["prev_total"]
-            elif pgy == 4:
-                fairness_counts[r] = counts["total"] + counts["prev_total"]
-            else:
-                fairness_counts[r] = counts["total"] + counts["prev_total"]
+            penalties[r] = self.rules.call_penalty[pgy][dow]
+            # Sort candidates by relevant day-type count only
+            key = self._fairness_key(pgy, dow)
+            fairness_counts[r] = counts[key] + counts["prev_" + key]
         # --- DEBUG OUTPUT ---
-        print(f"\nDEBUG {current_date.strftime('%Y-%m-%d')}: Fairness counts for candidates:")
-        for r in fairness_counts:
-            c = self.call_counts[r]
-            pgy = self.get_resident_pgy(r, current_date)
-            print(f"  {r} (PGY-{pgy}):")
-            print(f"    Current counts: weekday={c['weekday']}, friday={c['friday']}, saturday={c['saturday']}, sunday={c['sunday']}, total={c['total']}")
-            print(f"    Previous counts: weekday={c['prev_weekday']}, friday={c['prev_friday']}, saturday={c['prev_saturday']}, sunday={c['prev_sunday']}, total={c['prev_total']}")
-            print(f"    Combined fairness score: {fairness_counts[r]}")
+        if DEBUG_FAIRNESS:
+            print(f"\nDEBUG {current_date.strftime('%Y-%m-%d')}: Fairness counts for candidates:")
+            for r in fairness_counts:
+                c = self.call_counts[r]
+                pgy = self.get_resident_pgy(r, current_date)
+                print(f"  {r} (PGY-{pgy}):")
+                print(f"    Current counts: weekday={c['weekday']}, friday={c['friday']}, saturday={c['saturday']}, sunday={c['sunday']}, total={c['total']}")
+                print(f"    Previous counts: weekday={c['prev_weekday']}, friday={c['prev_friday']}, saturday={c['prev_saturday']}, sunday={c['prev_sunday']}, total={c['prev_total']}")
+                print(f"    Combined fairness score: {fairness_counts[r]}")
 
         # --- Penalty for outliers above the mean ---
         fairness_values = list(fairness_counts.values())
@@ -394,18 +521,12 @@ class CallScheduler:
         random.shuffle(min_candidates)
         call_candidates = min_candidates
 
-        # After sorting, remove the penalty so it doesn't affect future days
-        if current_date.weekday() in [2, 3]:
-            for r in call_candidates:
-                pgy = self.get_resident_pgy(r, current_date)
-                if pgy == 3:
-                    self.call_counts[r]["total"] -= 0.5
-
-        # Sort candidates by relevant day-type count, then moderately by total calls, then random
+        # Sort candidates by relevant day-type count, then moderately by total calls
+        # (plus any preference penalty), then random
         call_candidates.sort(
             key=lambda r: (
                 fairness_counts[r],
-                self.call_counts[r]["total"] * 0.33,
+                (self.call_counts[r]["total"] + penalties[r]) * 0.33,
                 random.random()
             )
         )
@@ -433,28 +554,9 @@ class CallScheduler:
             ))
             
             for backup_resident in backup_candidates:
+                # Interns are attached afterwards by assign_interns()
                 intern_assigned = None
-                if call_pgy in [3, 4]:
-                    intern_candidates = self.residents_info.get(1, [])
-                    if intern_candidates:
-                        eligible_interns = [r for r in intern_candidates if self.is_intern_eligible(r, current_date, call_resident)]
-                        if eligible_interns:
-                            if dow == 5:
-                                intern_assigned = min(eligible_interns, 
-                                    key=lambda r: (
-                                        self.call_counts[r]["intern_saturday"],
-                                        self.call_counts[r]["intern_weekday"]
-                                    )
-                                )
-                            else:
-                                intern_assigned = min(eligible_interns, 
-                                    key=lambda r: (
-                                        self.call_counts[r]["intern_weekday"],
-                                        self.call_counts[r]["intern_saturday"]
-                                    )
-                                )
-                
-                combination_key = self.get_combination_key(date_str, call_resident, backup_resident, intern_assigned)
+                combination_key = self.get_combination_key(date_str, call_resident, backup_resident)
                 if combination_key in self.tried_combinations:
                     continue
                 
@@ -465,14 +567,14 @@ class CallScheduler:
                 self.backup_log.setdefault(backup_resident, []).append(current_date)
                 
                 # Track soft constraint violations
-                if call_resident in self.soft_constraints and date_str in self.soft_constraints[call_resident]:
+                if current_date in self.soft_constraints.get(call_resident, ()):
                     self.soft_constraint_violations.append({
                         'Date': date_str,
                         'Resident': call_resident,
                         'Role': 'Call',
                         'Type': 'Soft Constraint'
                     })
-                if backup_resident in self.soft_constraints and date_str in self.soft_constraints[backup_resident]:
+                if current_date in self.soft_constraints.get(backup_resident, ()):
                     self.soft_constraint_violations.append({
                         'Date': date_str,
                         'Resident': backup_resident,
@@ -480,29 +582,447 @@ class CallScheduler:
                         'Type': 'Soft Constraint'
                     })
                 
-                if intern_assigned:
-                    if dow == 5:
-                        self.call_counts[intern_assigned]["intern_saturday"] += 1
-                    else:
-                        self.call_counts[intern_assigned]["intern_weekday"] += 1
-                    # Update intern_log for q2 rule enforcement
-                    self.intern_log.setdefault(intern_assigned, []).append(current_date)
                 return True
         return False
 
     def update_counters(self, call, backup, dow):
         self.call_counts[call]["total"] += 1
         self.call_counts[call]["block_total"] += 1  # Increment per-block count for PGY-4 cap
-        if dow == 4:
-            self.call_counts[call]["friday"] += 1
-        elif dow == 5:
-            self.call_counts[call]["saturday"] += 1
-        elif dow == 6:
-            self.call_counts[call]["sunday"] += 1
+        self.call_counts[call][self.rules.day_type[dow]] += 1
+
+    # --- Intern assignment stage ---
+
+    def intern_eligibility(self, assignments):
+        """Map each day that needs an intern to the interns available that day.
+
+        A day needs an intern when the rules attach one to its call resident's
+        PGY (PGY-3/4) and it is not a fixed (holiday / previous block) assignment.
+        """
+        intern_pgy = self.rules.intern_pgy
+        interns = self.residents_info.get(intern_pgy, [])
+        eligibility = {}
+        for date_str, call, _backup, _intern in assignments:
+            if date_str in self.fixed_assignments:
+                continue
+            current_date = dt_type.strptime(date_str, "%Y-%m-%d")
+            if not self.rules.needs_intern(self.get_resident_pgy(call, current_date)):
+                continue
+            eligibility[current_date] = [
+                r for r in interns
+                if self.get_resident_pgy(r, current_date) == intern_pgy and self.pto_okay(r, current_date)
+            ]
+        return eligibility
+
+    def assign_interns(self):
+        """Attach interns to the chosen schedule in a single stage.
+
+        Each intern day type (Saturday, weekday) is balanced separately. Each is
+        solved as a bounded max-flow: first the number of covered days is
+        maximized, then the largest per-intern count is minimized and the
+        smallest one maximized, so both spreads are the minimum the availability
+        allows. Within those bounds the days are then handed out in date order,
+        each to the eligible intern who has gone longest without one, so an
+        intern's days are spread over the block instead of bunched. The q2
+        rule (intern days at least rules.intern_spacing apart) is encoded by
+        letting an intern take at most one day of each conflicting pair of
+        intern days.
+        """
+        eligibility = self.intern_eligibility(self.assignments)
+        interns = self.residents_info.get(self.rules.intern_pgy, [])
+        day_type = self.rules.intern_day_type
+        self.intern_log = {}
+        for resident in self.call_counts:
+            self.call_counts[resident]["intern_weekday"] = 0
+            self.call_counts[resident]["intern_saturday"] = 0
+        if not interns or not eligibility:
+            return
+
+        # Intern days closer than the q2 spacing form conflict runs
+        runs = []
+        for current_date in sorted(eligibility):
+            if runs and (current_date - runs[-1][-1]).days < self.rules.intern_spacing:
+                runs[-1].append(current_date)
+            else:
+                runs.append([current_date])
+        # The default rules only ever produce Wednesday/Thursday pairs; anything
+        # longer, or a run mixing day types, falls back to the greedy pass.
+        if any(len(run) > 2 or len({day_type[d.weekday()] for d in run}) > 1 for run in runs):
+            chosen = self._assign_interns_greedy(eligibility)
         else:
-            self.call_counts[call]["weekday"] += 1
+            chosen = {}
+            for kind in sorted(set(day_type)):
+                typed_runs = [run for run in runs if day_type[run[0].weekday()] == kind]
+                chosen.update(self._assign_interns_balanced(typed_runs, eligibility, interns))
 
-    def schedule_range(self, start_date, end_date, fairness_weight=0.75, soft_constraint_weight=0.25):
+        updated = []
+        for date_str, call, backup, _intern in self.assignments:
+            current_date = dt_type.strptime(date_str, "%Y-%m-%d")
+            intern = chosen.get(current_date)
+            if intern:
+                self.call_counts[intern]["intern_" + day_type[current_date.weekday()]] += 1
+                self.intern_log.setdefault(intern, []).append(current_date)
+            updated.append((date_str, call, backup, intern))
+        self.assignments = updated
+
+    def _build_intern_network(self, runs, eligibility, interns):
+        net = _FlowNetwork()
+        source, sink = net.add_node(), net.add_node()
+        intern_nodes = {r: net.add_node() for r in interns}
+        day_nodes = {}
+        assign_edges = []  # (edge, intern, date)
+        for run in runs:
+            for current_date in run:
+                day_nodes[current_date] = net.add_node()
+                net.add_edge(day_nodes[current_date], sink, 1)
+            for r in interns:
+                days = [d for d in run if r in eligibility[d]]
+                if not days:
+                    continue
+                # One gadget node per intern and run caps them at one day of the pair
+                gadget = net.add_node()
+                net.add_edge(intern_nodes[r], gadget, 1)
+                for current_date in days:
+                    assign_edges.append((net.add_edge(gadget, day_nodes[current_date], 1), r, current_date))
+        return net, source, sink, intern_nodes, assign_edges
+
+    def _intern_flow(self, runs, eligibility, interns, lower, upper, covered=None):
+        """Solve with every intern's count in [lower, upper].
+
+        ``lower`` and ``upper`` are counts shared by all interns or dicts of
+        per-intern counts. With ``covered`` given, the flow must cover exactly
+        that many days and the lower bounds are enforced through the usual
+        super source/sink reduction. Returns (covered days, assignment edges)
+        or None if infeasible.
+        """
+        if not isinstance(lower, dict):
+            lower = dict.fromkeys(interns, lower)
+        if not isinstance(upper, dict):
+            upper = dict.fromkeys(interns, upper)
+        net, source, sink, intern_nodes, assign_edges = self._build_intern_network(runs, eligibility, interns)
+        if covered is None:
+            for r in interns:
+                net.add_edge(source, intern_nodes[r], upper[r])
+            return net.max_flow(source, sink), net, assign_edges
+        super_source, super_sink = net.add_node(), net.add_node()
+        for r in interns:
+            net.add_edge(super_source, intern_nodes[r], lower[r])
+            net.add_edge(source, intern_nodes[r], upper[r] - lower[r])
+        net.add_edge(source, super_sink, sum(lower.values()))
+        net.add_edge(super_source, source, covered)
+        net.add_edge(sink, super_sink, covered)
+        required = sum(lower.values()) + covered
+        if net.max_flow(super_source, super_sink) != required:
+            return None
+        return covered, net, assign_edges
+
+    def _assign_interns_balanced(self, runs, eligibility, interns):
+        if not runs:
+            return {}
+        num_days = sum(len(run) for run in runs)
+        covered, _, _ = self._intern_flow(runs, eligibility, interns, 0, num_days)
+        # Smallest achievable maximum load (feasibility is monotone in the cap)
+        lo, hi = -(-covered // len(interns)), covered
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._intern_flow(runs, eligibility, interns, 0, mid)[0] == covered:
+                hi = mid
+            else:
+                lo = mid + 1
+        max_load = lo
+        # Largest achievable minimum load under that cap
+        lo, hi = 0, covered // len(interns)
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if self._intern_flow(runs, eligibility, interns, mid, max_load, covered) is not None:
+                lo = mid
+            else:
+                hi = mid - 1
+        return self._spread_interns(runs, eligibility, interns, lo, max_load, covered)
+
+    def _spread_interns(self, runs, eligibility, interns, lower, upper, covered):
+        """Assign the days in date order within the flow's load bounds.
+
+        Each day goes to the eligible intern who has gone longest without an
+        intern day (then the fewest so far), provided the remaining days can
+        still be covered with every intern in [lower, upper]; that is checked
+        with the same bounded flow over the days not yet assigned.
+        """
+        lower = dict.fromkeys(interns, lower)
+        upper = dict.fromkeys(interns, upper)
+        eligibility = {d: list(eligibility[d]) for run in runs for d in run}
+        remaining = [list(run) for run in runs]
+        order = {r: i for i, r in enumerate(interns)}
+        last_day, counts, chosen = {}, {}, {}
+        while remaining:
+            run = remaining[0]
+            current_date = run.pop(0)
+            rest = [r for r in remaining if r]
+            candidates = sorted(eligibility[current_date], key=lambda r: (
+                last_day.get(r, dt_type.min), counts.get(r, 0), order[r]))
+            # A day no intern can take within the bounds stays uncovered
+            for r in candidates:
+                trial_eligibility = dict(eligibility)
+                # q2: the rest of the run is closed to this intern
+                for other in run:
+                    trial_eligibility[other] = [x for x in eligibility[other] if x != r]
+                trial_lower = dict(lower, **{r: max(0, lower[r] - 1)})
+                trial_upper = dict(upper, **{r: upper[r] - 1})
+                if trial_upper[r] < 0:
+                    continue
+                if self._intern_flow(rest, trial_eligibility, interns, trial_lower, trial_upper, covered - 1) is not None:
+                    chosen[current_date] = r
+                    last_day[r] = current_date
+                    counts[r] = counts.get(r, 0) + 1
+                    eligibility, lower, upper = trial_eligibility, trial_lower, trial_upper
+                    covered -= 1
+                    break
+            remaining = rest
+        return chosen
+
+    def _assign_interns_greedy(self, eligibility):
+        """Chronological fallback: least-loaded eligible intern, respecting q2."""
+        chosen = {}
+        counts = {}
+        log = {}
+        for current_date in sorted(eligibility):
+            candidates = [
+                r for r in eligibility[current_date]
+                if all(abs((current_date - d).days) >= self.rules.intern_spacing for d in log.get(r, []))
+            ]
+            if not candidates:
+                continue
+            kind = self.rules.intern_day_type[current_date.weekday()]
+            intern = min(candidates, key=lambda r: (
+                counts.get((r, kind), 0),
+                sum(n for (other, _), n in counts.items() if other == r),
+            ))
+            key = (intern, kind)
+            counts[key] = counts.get(key, 0) + 1
+            log.setdefault(intern, []).append(current_date)
+            chosen[current_date] = intern
+        return chosen
+
+    # --- Feasibility pre-check ---
+
+    def _day_candidates(self, current_date):
+        """Call and backup candidates by PGY for one day given the current logs.
+
+        Returns (calls, backups, on_pto) dicts keyed by PGY.
+        """
+        calls, backups, on_pto = {}, {}, {}
+        for r in self.get_all_residents():
+            pgy = self.get_resident_pgy(r, current_date)
+            if not self.rules.can_backup(pgy):
+                continue
+            if not self.pto_okay(r, current_date):
+                on_pto[pgy] = on_pto.get(pgy, 0) + 1
+                continue
+            if self.spacing_okay(r, current_date, "backup"):
+                backups.setdefault(pgy, []).append(r)
+            if not (self.is_pgy_match(r, current_date, "call") and self.spacing_okay(r, current_date, "call")):
+                continue
+            if pgy == self.rules.capped_pgy and self.pgy4_cap is not None and self.call_counts[r]["block_total"] >= self.pgy4_cap:
+                continue
+            calls.setdefault(pgy, []).append(r)
+        return calls, backups, on_pto
+
+    def _candidate_pools(self, days):
+        """Per-day call and backup candidates by PGY, honouring PTO and spacing
+        from fixed assignments only (the logs must hold just those).
+
+        Returns (call_pools, backup_pools, pto_counts), each keyed by date;
+        fixed days are skipped.
+        """
+        call_pools, backup_pools, pto_counts = {}, {}, {}
+        for current_date in days:
+            if current_date.strftime("%Y-%m-%d") in self.fixed_assignments:
+                continue
+            calls, backups, on_pto = self._day_candidates(current_date)
+            call_pools[current_date] = calls
+            backup_pools[current_date] = backups
+            pto_counts[current_date] = on_pto
+        return call_pools, backup_pools, pto_counts
+
+    @staticmethod
+    def _pair_count(calls, backups):
+        """Number of (call, same-PGY backup) combinations available on a day."""
+        return sum(
+            len(backups.get(pgy, [])) - (1 if r in backups.get(pgy, []) else 0)
+            for pgy, candidates in calls.items() for r in candidates
+        )
+
+    def feasibility_report(self, start_date, end_date):
+        """Cheap pre-solve analysis of the hard constraints over a date range.
+
+        Returns a list of issue dicts (Date, Severity, Constraint, Details)
+        sorted by date. Severity 'Infeasible' means no schedule can exist;
+        'Tight' flags days with almost no room left. Checks performed:
+        - per-day eligible call candidates and same-PGY backup pairs,
+        - spacing capacity over sliding windows for each PGY pool, as wide as
+          the shortest and longest spacing rules (3 and 4 days by default),
+        - days that only PGY-4s can staff (Thursdays) against the PGY-4 call cap.
+        Only fixed assignments are considered when checking spacing.
+        """
+        self.call_log = {}
+        self.backup_log = {}
+        self._populate_fixed_assignments_logs()
+        issues = []
+
+        def report(day, severity, constraint, details):
+            issues.append({
+                'Date': day.strftime("%Y-%m-%d"),
+                'Severity': severity,
+                'Constraint': constraint,
+                'Details': details,
+            })
+
+        days = []
+        current_date = start_date
+        while current_date <= end_date:
+            days.append(current_date)
+            current_date += timedelta(days=1)
+
+        call_pools, backup_pools, pto_counts = self._candidate_pools(days)
+        for current_date in call_pools:
+            calls, backups = call_pools[current_date], backup_pools[current_date]
+            on_pto = pto_counts[current_date]
+            pairs = self._pair_count(calls, backups)
+            if not calls:
+                pto_note = ", ".join(f"{n} PGY-{p} on PTO" for p, n in sorted(on_pto.items())) or "no PTO"
+                report(current_date, 'Infeasible', 'Call eligibility',
+                       f"No resident can take call on {current_date.strftime('%A')} ({pto_note}).")
+            elif pairs == 0:
+                report(current_date, 'Infeasible', 'Backup eligibility',
+                       "Call candidates exist, but none has an available same-PGY backup.")
+            elif pairs <= 2:
+                report(current_date, 'Tight', 'Call/backup eligibility',
+                       f"Only {pairs} call/backup combination(s) available.")
+
+        # Spacing capacity over sliding windows, per PGY pool. A day counts
+        # against a pool only when that pool is the only one able to staff it.
+        def forced_pgy(current_date):
+            calls = call_pools.get(current_date)
+            if calls is None:
+                return None
+            staffed = [p for p in calls if self._pair_count({p: calls[p]}, backup_pools[current_date]) > 0]
+            return staffed[0] if len(staffed) == 1 else None
+
+        forced = {d: forced_pgy(d) for d in days}
+        seen = set()  # overlapping windows often hit the same forced days
+        spacing = self.rules.spacing
+        # Within the shortest spacing window nobody can work twice; in a longer
+        # one only the role pairs with a shorter gap (backup/backup) may repeat,
+        # which the bound below allows for at the window's two ends.
+        end_repeat = {width: any(gap == width - 1 for gap in spacing.values())
+                      and all(gap >= width - 1 for gap in spacing.values())
+                      for width in (self.rules.min_spacing, self.rules.max_spacing)}
+        for width in sorted(end_repeat):
+            for i in range(len(days) - width + 1):
+                window = days[i:i + width]
+                for pgy in sorted(set(forced.values()) - {None}):
+                    forced_days = [d for d in window if forced[d] == pgy]
+                    if len(forced_days) < 2 or (pgy, tuple(forced_days)) in seen:
+                        continue
+                    needed = 2 * len(forced_days)
+                    if end_repeat[width] and window[0] in forced_days and window[-1] in forced_days:
+                        needed -= 1  # one resident may back up both ends
+                    supply = set()
+                    for d in forced_days:
+                        supply.update(backup_pools[d].get(pgy, []))
+                        supply.update(call_pools[d].get(pgy, []))
+                    if needed > len(supply):
+                        severity = 'Infeasible'
+                    elif needed == len(supply):
+                        severity = 'Tight'
+                    else:
+                        continue
+                    seen.add((pgy, tuple(forced_days)))
+                    report(forced_days[0], severity, f'Spacing capacity (PGY-{pgy})',
+                           f"{', '.join(d.strftime('%a %Y-%m-%d') for d in forced_days)} need "
+                           f"{needed} distinct PGY-{pgy} residents; only {len(supply)} available.")
+
+        # PGY-4 call cap against the days (Thursdays) that no other PGY can cover
+        if self.pgy4_cap is not None:
+            capped = self.rules.capped_pgy
+            pgy4_only = [d for d in days if forced[d] == capped]
+            if pgy4_only:
+                pgy4_residents = {r for d in pgy4_only for r in call_pools[d].get(capped, [])}
+                capacity = self.pgy4_cap * len(pgy4_residents)
+                if len(pgy4_only) > capacity:
+                    severity = 'Infeasible'
+                elif len(pgy4_only) == capacity:
+                    severity = 'Tight'
+                else:
+                    severity = None
+                if severity:
+                    for d in pgy4_only:
+                        report(d, severity, 'PGY-4 call cap',
+                               f"{len(pgy4_only)} days can only be staffed by PGY-4s, but the cap of "
+                               f"{self.pgy4_cap} x {len(pgy4_residents)} residents allows {capacity}.")
+
+        issues.sort(key=lambda issue: (issue['Date'], issue['Severity'] != 'Infeasible'))
+        return issues
+
+    def day_scarcity(self, days):
+        """Call/backup combinations left on each non-fixed day given the
+        current logs; lower means more constrained."""
+        call_pools, backup_pools, _ = self._candidate_pools(days)
+        return {d: self._pair_count(call_pools[d], backup_pools[d]) for d in call_pools}
+
+    def day_order(self, start_date, end_date, mode="chronological"):
+        """Initial order in which schedule_range assigns the days of a block.
+
+        'chronological' and 'scarcity' both start from the block in date order;
+        with 'scarcity' schedule_range scores the days once (day_scarcity) and
+        _assign_by_scarcity picks the most constrained day near the frontier,
+        rescoring as days fill up.
+        """
+        days = []
+        current_date = start_date
+        while current_date <= end_date:
+            days.append(current_date)
+            current_date += timedelta(days=1)
+        if mode not in ("chronological", "scarcity"):
+            raise ValueError(f"Unknown day order: {mode}")
+        return days
+
+    def _assign_by_scarcity(self, days, scarcity):
+        """Assign the most constrained of the next few unassigned days first.
+
+        ``scarcity`` holds the scores with only fixed assignments logged. Days
+        are picked among the SCARCITY_LOOKAHEAD earliest unassigned ones. After
+        each assignment only the days whose candidates can have changed are
+        rescored: those within the spacing window, and the capped PGY's call
+        days (PGY-4 Thursdays) when one was filled, because of the call cap. Spacing
+        checks compare against every logged date in both directions, so
+        out-of-order assignment keeps them correct.
+        """
+        remaining = dict(scarcity)
+        for current_date in days:
+            if current_date not in remaining and not self.assign_day(current_date):
+                return False
+        while remaining:
+            frontier = sorted(remaining)[:SCARCITY_LOOKAHEAD]
+            current_date = min(frontier, key=lambda d: (remaining[d], d))
+            del remaining[current_date]
+            if not self.assign_day(current_date):
+                return False
+            capped_days = self.rules.call_ok[self.rules.capped_pgy] if self.pgy4_cap is not None else [False] * 7
+            changed = [
+                d for d in remaining
+                if abs((d - current_date).days) < self.rules.max_spacing
+                or (capped_days[current_date.weekday()] and capped_days[d.weekday()])
+            ]
+            remaining.update(self.day_scarcity(changed))
+        return True
+
+    def schedule_range(self, start_date, end_date, fairness_weight=0.75, soft_constraint_weight=0.25, day_order="chronological", restarts=10000, time_limit=None):
+        """Search ``restarts`` randomized schedules and keep the best valid one.
+
+        ``time_limit`` (seconds) stops the search early; the best schedule
+        found so far is used, and InfeasibleScheduleError is raised if none was.
+        """
+        search_start = time.perf_counter()
         # Reset all per-run state at the start of each schedule generation
         self.assignments = []
         self.call_log = {}
@@ -522,13 +1042,38 @@ class CallScheduler:
             self.call_counts[resident]["intern_saturday"] = 0
             # Previous counts are preserved
         self.soft_constraint_violations = []
+        # Fail fast with diagnostics instead of burning every restart
+        self.feasibility_issues = self.feasibility_report(start_date, end_date)
+        blocking = [issue for issue in self.feasibility_issues if issue['Severity'] == 'Infeasible']
+        if blocking:
+            raise InfeasibleScheduleError(
+                f"No valid schedule exists: {len(blocking)} blocking issue(s) found before search.", blocking,
+                stage="precheck")
+        days = self.day_order(start_date, end_date, day_order)
+        # Scored once with only the fixed assignments logged; each restart
+        # starts from a copy in _assign_by_scarcity
+        scarcity = None
+        if day_order == "scarcity":
+            self.call_log = {}
+            self.backup_log = {}
+            self._populate_fixed_assignments_logs()
+            scarcity = self.day_scarcity(days)
         results = []
-        for _ in range(10000):
+        attempts = 0
+        timed_out = False
+        first_valid_seconds = None
+        fairness_trace = []  # (seconds, fairness) each time the best fairness improves
+        for _ in range(restarts):
+            if time_limit is not None and time.perf_counter() - search_start >= time_limit:
+                timed_out = True
+                break
             # Reset per-run state
             self.assignments = []
             self.call_log = {}
             self.backup_log = {}
             self.intern_log = {}
+            # Each restart may retry any combination an earlier one used
+            self.tried_combinations = set()
             # Re-populate logs with fixed assignments after reset
             self._populate_fixed_assignments_logs()
             for resident in self.call_counts:
@@ -543,43 +1088,43 @@ class CallScheduler:
                 self.call_counts[resident]["intern_saturday"] = 0
                 # Previous counts are preserved
             self.soft_constraint_violations = []
-            current_date = start_date
+            attempts += 1
             success = True
-            while current_date <= end_date:
-                date_str = current_date.strftime("%Y-%m-%d")
-                if not self.assign_day(current_date):
-                    success = False
-                    break
-                current_date += timedelta(days=1)
+            if scarcity is not None:
+                success = self._assign_by_scarcity(days, scarcity)
+            else:
+                for current_date in days:
+                    if not self.assign_day(current_date):
+                        success = False
+                        break
             if not success:
                 continue  # Only keep successful runs
+            self.assignments.sort(key=lambda a: a[0])
             violations = len(self.soft_constraint_violations)
-            # Calculate fairness score: sum of spreads for each call type and PGY
-            fairness_score = 0
-            call_type_keys = ["weekday", "friday", "saturday", "sunday"]
-            pgy_groups = {1: [], 2: [], 3: [], 4: []}
-            for resident in self.call_counts:
-                pgy = None
-                for test_pgy, residents in self.residents_info.items():
-                    if resident in residents:
-                        pgy = test_pgy
-                        break
-                if pgy:
-                    pgy_groups[pgy].append(resident)
-            for key in call_type_keys:
-                for pgy, group in pgy_groups.items():
-                    if not group:
-                        continue
-                    vals = [self.call_counts[r][key] for r in group]
-                    fairness_score += max(vals) - min(vals)
+            fairness_score = self.fairness_spread()
+            elapsed = time.perf_counter() - search_start
+            if first_valid_seconds is None:
+                first_valid_seconds = elapsed
+            if not fairness_trace or fairness_score < fairness_trace[-1][1]:
+                fairness_trace.append((elapsed, fairness_score))
             results.append({
                 'assignments': list(self.assignments),
                 'soft_constraint_violations': list(self.soft_constraint_violations),
                 'violations': violations,
                 'fairness': fairness_score
             })
+        self.search_stats = {
+            'day_order': day_order,
+            'restarts': attempts,
+            'successful': len(results),
+            'success_rate': len(results) / attempts if attempts else 0.0,
+            'seconds': time.perf_counter() - search_start,
+            'timed_out': timed_out,
+            'first_valid_seconds': first_valid_seconds,
+            'fairness_trace': fairness_trace,
+        }
         if not results:
-            raise Exception("No valid schedule found for the given constraints.")
+            raise InfeasibleScheduleError("No valid schedule found for the given constraints.", self.feasibility_issues)
         # Normalize scores
         min_fair = min(r['fairness'] for r in results)
         max_fair = max(r['fairness'] for r in results)
@@ -591,8 +1136,34 @@ class CallScheduler:
             r['combined_score'] = r['fairness_norm'] * fairness_weight + r['violations_norm'] * soft_constraint_weight
         # Pick the best
         best = min(results, key=lambda r: r['combined_score'])
+        self.search_stats['fairness_spread'] = best['fairness']
         self.assignments = best['assignments']
         self.soft_constraint_violations = best['soft_constraint_violations']
+        # Interns are attached once, to the chosen schedule only
+        self.assign_interns()
+        # Post-condition: the returned schedule must pass the independent validator
+        validate_start = time.perf_counter()
+        self.validation_issues = validate_assignments(
+            self.assignments, self.residents_info, self.transitions, self.pto_requests,
+            self.fixed_assignments, self.pgy4_cap, self.rules)
+        self.search_stats['validation_seconds'] = time.perf_counter() - validate_start
+        if self.validation_issues:
+            raise ScheduleValidationError(
+                f"Generated schedule breaks {len(self.validation_issues)} hard rule(s).", self.validation_issues)
+
+    def fairness_spread(self):
+        """Sum over PGY groups and call day types of the (max - min) count spread
+        in the current counters; lower is fairer."""
+        fairness_score = 0
+        call_type_keys = sorted(set(self.rules.day_type))
+        for pgy, group in self.residents_info.items():
+            group = [r for r in group if r in self.call_counts]
+            if not group:
+                continue
+            for key in call_type_keys:
+                vals = [self.call_counts[r][key] for r in group]
+                fairness_score += max(vals) - min(vals)
+        return fairness_score
 
     def export_schedule(self):
         df = pd.DataFrame(self.assignments, columns=["Date", "Call", "Backup", "Intern"])
@@ -600,7 +1171,7 @@ class CallScheduler:
 
     def get_soft_constraint_stats(self):
         """Get statistics about soft constraint violations"""
-        total_constraints = sum(len(dates) for dates in self.soft_constraints.values())
+        total_constraints = sum(len(days) for days in self.soft_constraints.values())
         violations = len(self.soft_constraint_violations)
         fulfilled = total_constraints - violations
         
@@ -616,7 +1187,13 @@ class CallScheduler:
 
 # --- Wrapper Function to Connect to App ---
 
-def run_scheduling_engine(prev_df, res_df, pto_df, hol_df, start_date=None, end_date=None, pgy4_cap=None, previous_call_counts=None, soft_constraints=None, fairness_weight=0.75, soft_constraint_weight=0.25):
+def prepare_scheduling_inputs(prev_df, res_df, pto_df, hol_df, start_date=None, end_date=None, soft_constraints=None):
+    """Parse the app's tables once into the structures CallScheduler takes.
+
+    Returns a dict with residents_info, transitions, fixed_assignments,
+    holidays, pto_requests, soft_constraints, start_date and end_date, which
+    solve_prepared() schedules. Scenario sweeps reuse it across runs.
+    """
     residents_info = {1: [], 2: [], 3: [], 4: []}  # Added PGY-1
     transitions = {}
 
@@ -646,23 +1223,8 @@ def run_scheduling_engine(prev_df, res_df, pto_df, hol_df, start_date=None, end_
     for pgy, residents in residents_info.items():
         print(f"PGY-{pgy}: {residents}")
 
-    # Process PTO requests
-    pto_requests = {}
-    if not pto_df.empty:
-        for _, row in pto_df.iterrows():
-            resident = row["Resident"]
-            if isinstance(row["Start Date"], (dt_type, date_type)):
-                start = row["Start Date"]
-            else:
-                start = dt_type.strptime(str(row["Start Date"]), "%Y-%m-%d")
-            if isinstance(row["End Date"], (dt_type, date_type)):
-                end = row["End Date"]
-            else:
-                end = dt_type.strptime(str(row["End Date"]), "%Y-%m-%d")
-            current = start
-            while current <= end:
-                pto_requests.setdefault(resident, []).append(current.strftime("%Y-%m-%d"))
-                current += timedelta(days=1)
+    # Process PTO requests into per-resident interval sets
+    pto_requests = parse_date_ranges(pto_df) if pto_df is not None else {}
 
     # Process holiday assignments
     fixed_assignments = {}
@@ -691,80 +1253,56 @@ def run_scheduling_engine(prev_df, res_df, pto_df, hol_df, start_date=None, end_
             backup = row["Backup"]
             fixed_assignments[date_str] = (call, backup)
 
-    # Filter soft constraints to only those within the current block's date range
+    # Keep only soft constraints within the current block's date range, clipped to it
     filtered_soft_constraints = None
-    if isinstance(soft_constraints, pd.DataFrame) and not soft_constraints.empty:
-        soft_constraints = soft_constraints.copy()
-        soft_constraints['Start Date'] = pd.to_datetime(soft_constraints['Start Date'], errors='coerce')
-        soft_constraints['End Date'] = pd.to_datetime(soft_constraints['End Date'], errors='coerce')
-        filtered_rows = []
-        for _, row in soft_constraints.iterrows():
-            start = row['Start Date']
-            end = row['End Date']
-            if pd.isna(start) or pd.isna(end):
-                continue
-            # Only include if the range overlaps with the block
-            if end < start_date or start > end_date:
-                continue
-            # Clip to block range
-            row['Start Date'] = max(start, start_date)
-            row['End Date'] = min(end, end_date)
-            filtered_rows.append(row)
-        filtered_soft_constraints = pd.DataFrame(filtered_rows)
-    else:
-        filtered_soft_constraints = soft_constraints
+    if soft_constraints is not None:
+        filtered_soft_constraints = parse_date_ranges(soft_constraints, start_date, end_date, errors="skip")
+
+    return {
+        "residents_info": residents_info,
+        "transitions": transitions,
+        "fixed_assignments": fixed_assignments,
+        "holidays": hol_df,
+        "pto_requests": pto_requests,
+        "soft_constraints": filtered_soft_constraints,
+        "start_date": start_date,
+        "end_date": end_date,
+    }
+
+
+def solve_prepared(inputs, pgy4_cap=None, previous_call_counts=None, fairness_weight=0.75, soft_constraint_weight=0.25, day_order="chronological", rules=None, restarts=10000, time_limit=None):
+    """Schedule the block described by prepare_scheduling_inputs() and add supervisors."""
+    start_date, end_date = inputs["start_date"], inputs["end_date"]
+    fixed_assignments = inputs["fixed_assignments"]
+    pto_requests = inputs["pto_requests"]
 
     # Create scheduler instance with previous call counts if provided
     scheduler = CallScheduler(
-        residents_info, 
-        fixed_assignments, 
-        hol_df, 
-        pto_requests, 
-        transitions, 
+        inputs["residents_info"],
+        fixed_assignments,
+        inputs["holidays"],
+        pto_requests,
+        inputs["transitions"],
         pgy4_cap=pgy4_cap,
         previous_call_counts=previous_call_counts,
-        soft_constraints=filtered_soft_constraints
+        soft_constraints=inputs["soft_constraints"],
+        rules=rules
     )
+    rules = scheduler.rules
     
     # Generate schedule
-    scheduler.schedule_range(start_date, end_date, fairness_weight, soft_constraint_weight)
+    scheduler.schedule_range(start_date, end_date, fairness_weight, soft_constraint_weight, day_order=day_order,
+                             restarts=restarts, time_limit=time_limit)
     
     # Export schedule and add supervisor assignment
     df = scheduler.export_schedule()
     df["Supervisor"] = None
 
     # Build a lookup for call assignments by date
-    call_by_date = {row["Date"]: row["Call"] for _, row in df.iterrows()}
-    pgy_by_name = {}
-    for _, row in res_df.iterrows():
-        name = row["Resident"]
-        pgy = int(row["PGY"])
-        pgy_by_name[name] = pgy
-        if pd.notna(row["Transition Date"]):
-            if isinstance(row["Transition Date"], (dt_type, date_type)):
-                trans_date = row["Transition Date"]
-            else:
-                trans_date = dt_type.strptime(str(row["Transition Date"]), "%Y-%m-%d")
-            pgy_by_name[(name, trans_date.strftime("%Y-%m-%d"))] = int(row["Transition PGY"])
-
-    # Helper to get PGY for a resident on a given date
-    def get_pgy(resident, date):
-        # Check for transition
-        for _, row in res_df.iterrows():
-            if row["Resident"] == resident and pd.notna(row["Transition Date"]):
-                if isinstance(row["Transition Date"], (dt_type, date_type)):
-                    trans_date = row["Transition Date"]
-                else:
-                    trans_date = dt_type.strptime(str(row["Transition Date"]), "%Y-%m-%d")
-                d1 = date
-                d2 = trans_date
-                if isinstance(d1, date_type) and not isinstance(d1, dt_type):
-                    d1 = dt_type.combine(d1, dt_type.min.time())
-                if isinstance(d2, date_type) and not isinstance(d2, dt_type):
-                    d2 = dt_type.combine(d2, dt_type.min.time())
-                if d1 > d2:
-                    return int(row["Transition PGY"])
-        return pgy_by_name.get(resident, None)
+    call_by_date = dict(zip(df["Date"], df["Call"]))
+
+    # PGY for a resident on a given date, transitions included
+    get_pgy = scheduler.get_resident_pgy
 
     # Supervisor assignment tracking
     supervisor_counts = {}
@@ -782,7 +1320,7 @@ def run_scheduling_engine(prev_df, res_df, pto_df, hol_df, start_date=None, end_
         for r in scheduler.get_all_residents():
             # Initialize counts for all residents who will be PGY-3 or PGY-4 at any point
             for date in pd.date_range(start_date, end_date):
-                if get_pgy(r, date) in [3, 4]:
+                if rules.supervisor_ok[get_pgy(r, date) or 0]:
                     supervisor_counts[r] = 0
                     break
 
@@ -795,10 +1333,10 @@ def run_scheduling_engine(prev_df, res_df, pto_df, hol_df, start_date=None, end_
         if row["Date"] in fixed_assignments:
             continue
         # Skip supervisor assignment if call resident is on a Sunday
-        if current_date.weekday() == 6:
+        if not rules.supervisor_day[current_date.weekday()]:
             continue
         # Only assign supervisor if call resident is PGY-2 on this date
-        if get_pgy(call_resident, current_date) != 2:
+        if not rules.supervised_call[get_pgy(call_resident, current_date) or 0]:
             continue
         # Build eligible supervisor list
         eligible_supervisors = []
@@ -808,11 +1346,10 @@ def run_scheduling_engine(prev_df, res_df, pto_df, hol_df, start_date=None, end_
             if call_by_date.get(prev_date) == r:
                 continue
             # Must be PGY-3 or PGY-4 on this date
-            pgy = get_pgy(r, current_date)
-            if pgy not in [3, 4]:
+            if not rules.supervisor_ok[get_pgy(r, current_date) or 0]:
                 continue
             # Check PTO
-            if current_date.strftime("%Y-%m-%d") in pto_requests.get(r, []):
+            if current_date in pto_requests.get(r, ()):
                 continue
             eligible_supervisors.append(r)
         # Friday rule: if Friday, try to assign Saturday call resident as supervisor
@@ -821,10 +1358,10 @@ def run_scheduling_engine(prev_df, res_df, pto_df, hol_df, start_date=None, end_
             sat_call = call_by_date.get(sat_date)
             if sat_call is not None and sat_call not in eligible_supervisors:
                 # If the Saturday call resident will be PGY-3/4 on Saturday, allow as supervisor for Friday
-                if get_pgy(sat_call, current_date + timedelta(days=1)) in [3, 4]:
+                if rules.supervisor_ok[get_pgy(sat_call, current_date + timedelta(days=1)) or 0]:
                     # Also check not on call the previous day and not on PTO for Friday
                     prev_date = (current_date - timedelta(days=1)).strftime("%Y-%m-%d")
-                    if call_by_date.get(prev_date) != sat_call and current_date.strftime("%Y-%m-%d") not in pto_requests.get(sat_call, []):
+                    if call_by_date.get(prev_date) != sat_call and current_date not in pto_requests.get(sat_call, ()):
                         eligible_supervisors.append(sat_call)
             if sat_call in eligible_supervisors:
                 df.at[idx, "Supervisor"] = sat_call
@@ -839,40 +1376,33 @@ def run_scheduling_engine(prev_df, res_df, pto_df, hol_df, start_date=None, end_
             # If no one is eligible, leave blank (or could relax rule/log warning)
             df.at[idx, "Supervisor"] = None
 
-    # Add soft constraint statistics to the DataFrame's attributes
+    # Add soft constraint statistics and pre-check warnings to the DataFrame's attributes
     df.attrs['soft_constraint_stats'] = scheduler.get_soft_constraint_stats()
+    df.attrs['feasibility_issues'] = scheduler.feasibility_issues
+    df.attrs['search_stats'] = scheduler.search_stats
+    df.attrs['fairness_spread'] = scheduler.search_stats.get('fairness_spread')
 
     return df
 
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description='Generate call schedule')
-    parser.add_argument('--start_date', type=str, required=True, help='Start date (YYYY-MM-DD)')
-    parser.add_argument('--end_date', type=str, required=True, help='End date (YYYY-MM-DD)')
-    parser.add_argument('--previous_schedule', type=str, help='Path to previous block schedule CSV')
-    parser.add_argument('--output_file', type=str, help='Path to save the generated schedule')
-    args = parser.parse_args()
-
-    # Read input files
-    res_df = pd.read_csv('resident_list_structured.csv')
-    pto_df = pd.read_csv('pto_requests.csv')
-    hol_df = pd.read_csv('holiday_schedule.csv')
-    
-    # Read previous schedule if provided
-    prev_df = None
-    if args.previous_schedule:
-        prev_df = pd.read_csv(args.previous_schedule)
 
-    # Convert dates
-    start_date = dt_type.strptime(args.start_date, "%Y-%m-%d")
-    end_date = dt_type.strptime(args.end_date, "%Y-%m-%d")
+def run_scheduling_engine(prev_df, res_df, pto_df, hol_df, start_date=None, end_date=None, pgy4_cap=None, previous_call_counts=None, soft_constraints=None, fairness_weight=0.75, soft_constraint_weight=0.25, day_order="chronological", rules=None, restarts=10000, time_limit=None, seed=None):
+    if seed is not None:
+        random.seed(seed)
+    inputs = prepare_scheduling_inputs(prev_df, res_df, pto_df, hol_df, start_date, end_date, soft_constraints)
+    return solve_prepared(
+        inputs,
+        pgy4_cap=pgy4_cap,
+        previous_call_counts=previous_call_counts,
+        fairness_weight=fairness_weight,
+        soft_constraint_weight=soft_constraint_weight,
+        day_order=day_order,
+        rules=rules,
+        restarts=restarts,
+        time_limit=time_limit,
+    )
 
-    # Generate schedule
-    schedule_df = run_scheduling_engine(prev_df, res_df, pto_df, hol_df, start_date, end_date)
-    
-    # Save the schedule
-    output_file = args.output_file if args.output_file else 'generated_schedule.csv'
-    schedule_df.to_csv(output_file, index=False)
-    print(f"Schedule generated from {args.start_date} to {args.end_date}")
-    if args.previous_schedule:
-        print(f"Using previous schedule from: {args.previous_schedule}")
-    print(f"Schedule saved to: {output_file}")
+if __name__ == "__main__":
+    # The command line lives in schedule_cli.py (problem specs, scenarios, parallel runs)
+    import sys
+    from schedule_cli import main, LEGACY_OUTPUT_FILE
+    sys.exit(main(default_output_file=LEGACY_OUTPUT_FILE))
@@ -1,10 +1,14 @@
 import pandas as pd
 from datetime import datetime, timedelta
-from engine_optimization_testing import CallScheduler, run_scheduling_engine
+from scheduling_engine import CallScheduler, run_scheduling_engine, InfeasibleScheduleError
+from call_rules import RULES
+from schedule_validator import validate_assignments
+import os
 import random
 import time
 import itertools
-from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
 
 def create_test_data():
     # Create test residents with actual numbers
@@ -38,10 +42,10 @@ def generate_pto_requests(residents_info, start_date, end_date):
     # Generate PTO requests (4 weeks per resident)
     for pgy, residents in residents_info.items():
         # Split residents into groups to avoid too many being off at once
-        group_size = len(residents) // 3  # Only allow ~1/3 of residents of each level to be off at once
+        group_size = max(1, len(residents) // 3)  # Only allow ~1/3 of residents of each level to be off at once
         for i, resident in enumerate(residents):
             # Determine which third of the block this resident should primarily request
-            block_third = (i // group_size) * (block_days // 3)
+            block_third = min(i // group_size, 2) * (block_days // 3)
             
             # Generate 2-3 PTO periods (totaling ~4 weeks)
             pto_dates = []
@@ -84,7 +88,7 @@ def generate_pto_requests(residents_info, start_date, end_date):
     # Generate non-call requests (2 weeks per resident)
     for pgy, residents in residents_info.items():
         # Split residents into groups to avoid too many being off at once
-        group_size = len(residents) // 3  # Only allow ~1/3 of residents of each level to be off at once
+        group_size = max(1, len(residents) // 3)  # Only allow ~1/3 of residents of each level to be off at once
         for i, resident in enumerate(residents):
             # Determine which third of the block this resident should primarily request
             block_third = ((i // group_size + 1) % 3) * (block_days // 3)  # Offset from PTO third
@@ -276,177 +280,167 @@ def analyze_schedule(schedule):
     print(f"\nAverage weekday calls per resident: {weekday_calls.mean():.1f}")
     print(f"Max weekday calls for any resident: {weekday_calls.max()}")
 
-def validate_schedule(schedule_df, residents_info, holidays, start_date, end_date):
+def validate_schedule(schedule_df, residents_info, holidays, start_date, end_date, rules=RULES):
     """
-    Validate the generated schedule for:
-    - Spacing violations (call/call, call/backup, backup/call: 4 days; backup/backup: 3 days)
-    - Double-booking (no resident in more than one role per day)
-    - PGY match (call/backup must match PGY requirements)
+    Validate the generated schedule against the shared call rules (call_rules.RULES)
+    with schedule_validator: spacing, double booking, PGY / weekday eligibility
+    and backup PGY match.
     Returns (True, None) if valid, (False, reason) if not.
     """
-    schedule_df = pd.DataFrame(schedule_df, columns=["Date", "Call", "Backup", "Intern"])
-    schedule_df["Date"] = pd.to_datetime(schedule_df["Date"])
-    schedule_df = schedule_df.sort_values("Date")
-    # 1. Spacing violations
-    assignments = defaultdict(list)  # resident -> list of (date, role)
-    for _, row in schedule_df.iterrows():
-        current_date = row["Date"]
-        for role in ["Call", "Backup"]:
-            resident = row[role]
-            if pd.isna(resident):
-                continue
-            assignments[resident].append((current_date, role))
-    for resident, events in assignments.items():
-        events = sorted(events)
-        for i in range(len(events)):
-            date1, role1 = events[i]
-            for j in range(i+1, len(events)):
-                date2, role2 = events[j]
-                gap = (date2 - date1).days
-                if gap == 0:
-                    continue  # same day, will be caught by double-booking
-                if role1 == "Backup" and role2 == "Backup":
-                    if gap < 3:
-                        return False, f"Spacing violation: {resident} assigned as Backup on {date1.date()} and {date2.date()} (<3 days apart)"
-                else:
-                    if gap < 4:
-                        return False, f"Spacing violation: {resident} assigned as {role1} on {date1.date()} and {role2} on {date2.date()} (<4 days apart)"
-    # 2. Double-booking
-    for _, row in schedule_df.iterrows():
-        roles = [row["Call"], row["Backup"], row["Intern"]]
-        roles = [r for r in roles if pd.notna(r)]
-        if len(set(roles)) < len(roles):
-            return False, f"Double-booking: {roles} on {row['Date'].date()}"
-    # 3. PGY match (call/backup)
-    for _, row in schedule_df.iterrows():
-        current_date = row["Date"]
-        for role in ["Call", "Backup"]:
-            resident = row[role]
-            if pd.isna(resident):
-                continue
-            # Find PGY
-            pgy = None
-            for lvl, names in residents_info.items():
-                if resident in names:
-                    pgy = lvl
-                    break
-            if pgy is None:
-                return False, f"Resident {resident} not found in residents_info"
-            # Call PGY rules
-            dow = current_date.weekday()
-            if role == "Call":
-                if pgy == 1:
-                    return False, f"PGY-1 assigned to call on {current_date.date()}"
-                elif pgy == 2 and dow not in [1,2,4,6]:
-                    return False, f"PGY-2 assigned to call on invalid day {current_date.date()}"
-                elif pgy == 3 and dow not in [0,2,3,5]:
-                    return False, f"PGY-3 assigned to call on invalid day {current_date.date()}"
-                elif pgy == 4 and dow != 3:
-                    return False, f"PGY-4 assigned to call on invalid day {current_date.date()}"
-            if role == "Backup":
-                if pgy < 2:
-                    return False, f"PGY-1 assigned to backup on {current_date.date()}"
+    issues = validate_assignments(schedule_df, residents_info, rules=rules)
+    if issues:
+        issue = issues[0]
+        return False, f"{issue['Rule']} on {issue['Date']}: {issue['Resident']} ({issue['Role']}) - {issue['Details']}"
     return True, None
 
-def test_minimum_residents():
-    """Grid search: Find minimum number of residents needed at each PGY level (all combinations)"""
-    print("\n=== Grid Search: Minimum Resident Requirements ===")
+# Staffing grid searched by test_minimum_residents (inclusive ranges per PGY)
+STAFFING_RANGES = {1: range(1, 7), 2: range(1, 7), 3: range(1, 7), 4: range(1, 5)}
+STAFFING_HOLIDAYS = [
+    datetime(2024, 1, 1),   # New Year's Day
+    datetime(2024, 1, 15),  # MLK Day
+    datetime(2024, 2, 19),  # Presidents Day
+]
+
+
+def staffing_roster(config):
+    """residents_info for a (PGY-1, PGY-2, PGY-3, PGY-4) head count."""
+    p1, p2, p3, p4 = config
+    return {
+        1: [f"Intern{i}" for i in range(1, p1 + 1)],
+        2: [f"Res2-{i}" for i in range(1, p2 + 1)],
+        3: [f"Res3-{i}" for i in range(1, p3 + 1)],
+        4: [f"Res4-{i}" for i in range(1, p4 + 1)],
+    }
+
+
+def probe_staffing(config, start_date, end_date, restarts=2000, time_limit=60, seed=0):
+    """Can this head count be scheduled? Returns a result dict.
+
+    The engine's feasibility pre-check runs first, so most understaffed
+    configurations are rejected in milliseconds without a search.
+    """
+    random.seed(seed)
+    residents = staffing_roster(config)
+    started = time.time()
+    result = {"config": config, "feasible": False, "stage": "search", "reason": None}
+    try:
+        scheduler = CallScheduler(
+            residents_info=residents,
+            fixed_assignments={},
+            holidays=STAFFING_HOLIDAYS,
+            pto_requests=pd.DataFrame(columns=['Resident', 'Start Date', 'End Date'])
+        )
+        scheduler.schedule_range(start_date, end_date, restarts=restarts, time_limit=time_limit)
+        valid, reason = validate_schedule(scheduler.assignments, residents, STAFFING_HOLIDAYS, start_date, end_date)
+        result["feasible"] = valid
+        result["reason"] = reason
+    except InfeasibleScheduleError as e:
+        result["stage"] = e.stage
+        result["reason"] = str(e)
+    except Exception as e:
+        result["reason"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = time.time() - started
+    return result
+
+
+def _choose_probes(configs, status, batch_size):
+    """Pick unresolved configurations whose outcome settles the most others.
+
+    A feasible result resolves its up-set, an infeasible one its down-set, so
+    each pick maximizes min(unresolved up-set, unresolved down-set). Picks in
+    one batch are mutually incomparable, so no result makes another redundant.
+    """
+    unresolved = status == 0
+    # below[i, j]: configs[i] <= configs[j] componentwise
+    below = (configs[:, None, :] <= configs[None, :, :]).all(axis=2)
+    up = (below & unresolved[None, :]).sum(axis=1)
+    down = (below.T & unresolved[None, :]).sum(axis=1)
+    score = np.where(unresolved, np.minimum(up, down), -1)
+    chosen = []
+    blocked = ~unresolved
+    while len(chosen) < batch_size:
+        candidates = np.where(~blocked, score, -1)
+        best = int(candidates.argmax())
+        if candidates[best] < 0:
+            break
+        chosen.append(best)
+        blocked |= below[best] | below[:, best]
+    return chosen
+
+
+def staffing_frontier(ranges=None, start_date=datetime(2024, 1, 1), end_date=datetime(2024, 4, 30),
+                      max_workers=None, restarts=2000, time_limit=60, seed=0, progress=print):
+    """Exact Pareto frontier of minimum (PGY-1, PGY-2, PGY-3, PGY-4) head counts.
+
+    Feasibility is monotone in head count: extra residents can always be left
+    unused. A feasible probe therefore settles every larger configuration and
+    an infeasible one every smaller configuration. Probes run in batches on a
+    process pool until every grid point is settled. The frontier is exact with
+    respect to the probes. A feasible configuration the randomized search
+    misses counts as infeasible, as it did in the serial grid.
+
+    Returns (frontier, probes): minimal feasible configs, sorted, and the
+    probe result dicts in the order they finished.
+    """
+    ranges = ranges or STAFFING_RANGES
+    configs = np.array(list(itertools.product(*(ranges[pgy] for pgy in sorted(ranges)))))
+    status = np.zeros(len(configs), dtype=int)  # 1 feasible, -1 infeasible, 0 unknown
+    probes = []
+    batch_size = max_workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        while (status == 0).any():
+            batch = _choose_probes(configs, status, batch_size)
+            futures = {
+                executor.submit(probe_staffing, tuple(int(v) for v in configs[i]), start_date, end_date,
+                                restarts, time_limit, seed): i
+                for i in batch
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                result = future.result()
+                probes.append(result)
+                if result["feasible"]:
+                    status[(configs >= configs[i]).all(axis=1)] = 1
+                else:
+                    status[(configs <= configs[i]).all(axis=1)] = -1
+                if progress:
+                    outcome = "feasible" if result["feasible"] else f"infeasible ({result['stage']})"
+                    progress(f"{result['config']}: {outcome} in {result['seconds']:.1f}s; "
+                             f"{int((status != 0).sum())}/{len(configs)} settled")
+    feasible = configs[status == 1]
+    frontier = [
+        tuple(int(v) for v in c) for c in feasible
+        if not ((feasible <= c).all(axis=1) & (feasible != c).any(axis=1)).any()
+    ]
+    return sorted(frontier), probes
+
+
+def test_minimum_residents(max_workers=None):
+    """Find the minimum number of residents needed at each PGY level (Pareto frontier)"""
+    print("\n=== Staffing Analysis: Minimum Resident Requirements ===")
     print("Testing with no PTO/non-call requests over 4 months")
     print("Testing period: January 1, 2024 - April 30, 2024")
-    print("Time limit: 10 minutes (will stop if exceeded)")
-    
-    start_time = time.time()
-    time_limit = 600  # 10 minutes in seconds
-    
-    # Test period: January to April 2024
-    start_date = datetime(2024, 1, 1)
-    end_date = datetime(2024, 4, 30)
-    
-    # Holidays
-    holidays = [
-        datetime(2024, 1, 1),   # New Year's Day
-        datetime(2024, 1, 15),  # MLK Day
-        datetime(2024, 2, 19),  # Presidents Day
-    ]
-    
-    # Resident name templates
-    intern_names = [f"Intern{i}" for i in range(1, 7)]
-    res2_names = [f"Res2-{i}" for i in range(1, 7)]
-    res3_names = [f"Res3-{i}" for i in range(1, 7)]
-    res4_names = [f"Res4-{i}" for i in range(1, 5)]
-    
-    # Ranges for grid search
-    pgy1_range = range(1, 7)
-    pgy2_range = range(1, 7)
-    pgy3_range = range(1, 7)
-    pgy4_range = range(1, 5)
-    
     print("\nGrid search ranges:")
-    print(f"PGY-1: {pgy1_range.start}-{pgy1_range.stop-1}")
-    print(f"PGY-2: {pgy2_range.start}-{pgy2_range.stop-1}")
-    print(f"PGY-3: {pgy3_range.start}-{pgy3_range.stop-1}")
-    print(f"PGY-4: {pgy4_range.start}-{pgy4_range.stop-1}")
-    
-    successful_configs = []
-    failed_configs = []
-    total_configs = 0
-    
-    for p1, p2, p3, p4 in itertools.product(pgy1_range, pgy2_range, pgy3_range, pgy4_range):
-        elapsed_time = time.time() - start_time
-        if elapsed_time > time_limit:
-            print(f"\nTime limit of {time_limit/60} minutes reached!")
-            break
-        total_configs += 1
-        print(f"\n{'='*50}")
-        print(f"Testing: PGY-1={p1}, PGY-2={p2}, PGY-3={p3}, PGY-4={p4}  (Config {total_configs})")
-        residents = {
-            1: intern_names[:p1],
-            2: res2_names[:p2],
-            3: res3_names[:p3],
-            4: res4_names[:p4],
-        }
-        try:
-            pto_requests = pd.DataFrame(columns=['Resident', 'Start Date', 'End Date'])
-            scheduler = CallScheduler(
-                residents_info=residents,
-                fixed_assignments={},
-                holidays=holidays,
-                pto_requests=pto_requests
-            )
-            scheduler.schedule_range(start_date, end_date)
-            # Validate schedule
-            valid, reason = validate_schedule(scheduler.assignments, residents, holidays, start_date, end_date)
-            if valid:
-                print("SUCCESS!")
-                successful_configs.append((p1, p2, p3, p4))
-            else:
-                print(f"FAILED: {reason}")
-                failed_configs.append((p1, p2, p3, p4, reason))
-        except Exception as e:
-            print(f"FAILED: {str(e)}")
-            failed_configs.append((p1, p2, p3, p4, str(e)))
-    
+    for pgy, values in STAFFING_RANGES.items():
+        print(f"PGY-{pgy}: {values.start}-{values.stop-1}")
+    total_configs = 1
+    for values in STAFFING_RANGES.values():
+        total_configs *= len(values)
+
+    start_time = time.time()
+    frontier, probes = staffing_frontier(max_workers=max_workers)
     print("\n" + "="*50)
-    print(f"Grid search complete. Total configs tested: {total_configs}")
-    print(f"Successful configs: {len(successful_configs)}")
-    print(f"Failed configs: {len(failed_configs)}")
-    
-    if successful_configs:
-        print("\nLowest working resident counts (by PGY):")
-        # Find minimums for each PGY level among successful configs
-        min_p1 = min(x[0] for x in successful_configs)
-        min_p2 = min(x[1] for x in successful_configs)
-        min_p3 = min(x[2] for x in successful_configs)
-        min_p4 = min(x[3] for x in successful_configs)
-        print(f"PGY-1: {min_p1}")
-        print(f"PGY-2: {min_p2}")
-        print(f"PGY-3: {min_p3}")
-        print(f"PGY-4: {min_p4}")
-        print("\nAll successful combinations:")
-        for combo in successful_configs:
+    print(f"Staffing analysis complete in {time.time() - start_time:.1f}s")
+    print(f"Configurations probed: {len(probes)} of {total_configs} "
+          f"({sum(1 for p in probes if p['stage'] == 'precheck')} rejected by the pre-check)")
+
+    if frontier:
+        print("\nMinimal working resident counts (Pareto frontier):")
+        for combo in frontier:
             print(f"PGY-1={combo[0]}, PGY-2={combo[1]}, PGY-3={combo[2]}, PGY-4={combo[3]}")
     else:
         print("No successful configurations found.")
+    return frontier
 
 def test_single_configuration():
     print("\n=== Single Test: PGY-1=6, PGY-2=6, PGY-3=6, PGY-4=4 ===")
@@ -0,0 +1,100 @@
+# Local stand-in for the Gmail API client, shared by tests/test_gmail_fetcher.py
+# and benchmark_suite.py --gmail-fetch.
+
+import base64
+import time
+from email.message import EmailMessage
+
+
+class FakeHttpError(Exception):
+    pass
+
+
+class _FakeCall:
+    def __init__(self, service, response, msg_id=None):
+        self.service = service
+        self.response = response
+        self.msg_id = msg_id
+
+    def execute(self):
+        self.service.round_trips += 1
+        time.sleep(self.service.latency)
+        return self.result()
+
+    def result(self):
+        if self.msg_id is not None and self.service.failures.get(self.msg_id, 0) > 0:
+            self.service.failures[self.msg_id] -= 1
+            raise FakeHttpError(f"get {self.msg_id} failed")
+        return self.response
+
+
+class _FakeBatch:
+    def __init__(self, service, callback):
+        self.service = service
+        self.callback = callback
+        self.calls = []
+
+    def add(self, call, request_id=None):
+        self.calls.append((request_id, call))
+
+    def execute(self):
+        # One round trip for the whole batch
+        self.service.round_trips += 1
+        self.service.batch_sizes.append(len(self.calls))
+        time.sleep(self.service.latency)
+        for request_id, call in self.calls:
+            try:
+                self.callback(request_id, call.result(), None)
+            except FakeHttpError as e:
+                self.callback(request_id, None, e)
+
+
+class FakeGmailService:
+    """Stand-in for the Gmail API client: users().messages().list/get with a
+    fixed round-trip latency, and batch requests when ``batch`` is set.
+
+    Message ids are the indexes of ``raw_messages`` as strings. ``failures``
+    maps a message id to the number of gets that fail before one succeeds.
+    ``list_calls`` records the arguments of every list request.
+    """
+
+    def __init__(self, raw_messages, latency=0.02, batch=False, failures=None):
+        self.raw_messages = raw_messages
+        self.latency = latency
+        self.failures = dict(failures or {})
+        self.list_calls = []
+        self.batch_sizes = []
+        self.round_trips = 0
+        if batch:
+            self.new_batch_http_request = lambda callback=None: _FakeBatch(self, callback)
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def list(self, userId, labelIds=None, maxResults=100, pageToken=None):
+        self.list_calls.append({"maxResults": maxResults, "pageToken": pageToken})
+        offset = int(pageToken or 0)
+        ids = [{"id": str(i)} for i in range(offset, min(offset + maxResults, len(self.raw_messages)))]
+        response = {"messages": ids}
+        if offset + maxResults < len(self.raw_messages):
+            response["nextPageToken"] = str(offset + maxResults)
+        return _FakeCall(self, response)
+
+    def get(self, userId, id, format=None):
+        return _FakeCall(self, {"id": id, "raw": self.raw_messages[int(id)]}, msg_id=id)
+
+
+def fake_request_emails(count):
+    """``count`` raw PTO / Non-PTO request e-mails, one per synthetic resident."""
+    raw_messages = []
+    for i in range(count):
+        message = EmailMessage()
+        message["From"] = f"PGY1-{i + 1} <resident{i + 1}@example.org>"
+        message["Subject"] = "Schedule request"
+        day = i % 25 + 1
+        message.set_content(f"PTO:\n7/{day}/2025 - 7/{day + 2}/2025\nNon-call:\n8/{day}/2025\n\nThanks")
+        raw_messages.append(base64.urlsafe_b64encode(message.as_bytes()).decode("ascii"))
+    return raw_messages
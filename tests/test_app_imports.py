@@ -0,0 +1,14 @@
+from benchmark_suite import APP_IMPORT_BUDGET, LAZY_MODULES, check_app_imports
+
+
+def test_app_imports_within_budget():
+    result = check_app_imports(runs=3)
+    assert result["seconds"] <= APP_IMPORT_BUDGET, result
+
+
+def test_lazy_modules_stay_unloaded():
+    # openpyxl is installed wherever the app runs; the Google client libraries
+    # only count when they are installed too
+    result = check_app_imports(runs=1)
+    assert result["eager_lazy_modules"] == []
+    assert not set(result["modules"]) & set(LAZY_MODULES)
@@ -0,0 +1,69 @@
+import contextlib
+import io
+
+from fake_gmail import FakeGmailService, fake_request_emails
+from gmail_fetcher import MAX_MESSAGES, fetch_raw_messages, fetch_requests_from_gmail, list_message_ids
+
+
+def test_list_follows_pages_up_to_the_limit():
+    service = FakeGmailService(fake_request_emails(25), latency=0)
+    assert list_message_ids(service, max_messages=22, page_size=10) == [str(i) for i in range(22)]
+    assert service.list_calls == [
+        {"maxResults": 10, "pageToken": None},
+        {"maxResults": 10, "pageToken": "10"},
+        {"maxResults": 2, "pageToken": "20"},
+    ]
+
+
+def test_list_stops_at_the_last_page():
+    service = FakeGmailService(fake_request_emails(7), latency=0)
+    assert list_message_ids(service, page_size=5) == [str(i) for i in range(7)]
+    assert len(service.list_calls) == 2
+
+
+def test_list_is_capped_at_max_messages():
+    service = FakeGmailService(fake_request_emails(MAX_MESSAGES + 30), latency=0)
+    assert len(list_message_ids(service)) == MAX_MESSAGES
+
+
+def test_batches_keep_the_listed_order():
+    raw_messages = fake_request_emails(12)
+    service = FakeGmailService(raw_messages, latency=0, batch=True)
+    ids = ["7", "2", "11", "0", "5"]
+    messages, skipped = fetch_raw_messages(service, ids, batch_size=2)
+    assert [m["id"] for m in messages] == ids
+    assert [m["raw"] for m in messages] == [raw_messages[int(i)] for i in ids]
+    assert skipped == []
+    assert service.batch_sizes == [2, 2, 1]
+
+
+def test_batch_failures_are_retried_once():
+    service = FakeGmailService(fake_request_emails(6), latency=0, batch=True, failures={"1": 1, "4": 2})
+    messages, skipped = fetch_raw_messages(service, [str(i) for i in range(6)], batch_size=3)
+    # 1 succeeds on its retry; 4 fails twice and is skipped
+    assert [m["id"] for m in messages] == ["0", "1", "2", "3", "5"]
+    assert skipped == [("4", "get 4 failed")]
+    assert service.round_trips == 2 + 2
+
+
+def test_threaded_fetch_keeps_order_and_reports_failures():
+    service = FakeGmailService(fake_request_emails(10), latency=0.001, failures={"3": 1})
+    ids = [str(i) for i in reversed(range(10))]
+    messages, skipped = fetch_raw_messages(service, ids, workers=4)
+    assert [m["id"] for m in messages] == [i for i in ids if i != "3"]
+    assert skipped == [("3", "get 3 failed")]
+
+
+def test_requests_are_the_same_with_and_without_batches():
+    raw_messages = fake_request_emails(8)
+    results = []
+    for batch in (False, True):
+        service = FakeGmailService(raw_messages, latency=0, batch=batch, failures={"2": 5})
+        # The fetcher prints a debug trace for every e-mail
+        with contextlib.redirect_stdout(io.StringIO()):
+            results.append(fetch_requests_from_gmail(service, max_messages=8, workers=3))
+    assert results[0] == results[1]
+    pto_requests, non_pto_requests, skipped = results[0]
+    assert [r["Resident"] for r in pto_requests] == [f"PGY1-{i + 1}" for i in range(8) if i != 2]
+    assert len(non_pto_requests) == 7
+    assert skipped == [("2", "get 2 failed")]
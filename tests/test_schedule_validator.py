@@ -0,0 +1,44 @@
+from datetime import datetime
+
+import pandas as pd
+
+from schedule_validator import validate_assignments
+from scheduling_engine import run_scheduling_engine
+
+
+def roster():
+    return pd.DataFrame(
+        [{"Resident": f"R{pgy}_{i}", "PGY": pgy, "Transition Date": None, "Transition PGY": None}
+         for pgy in range(1, 5) for i in range(6)])
+
+
+def residents_info():
+    return {pgy: [f"R{pgy}_{i}" for i in range(6)] for pgy in range(1, 5)}
+
+
+def test_off_roster_resident_in_previous_block_is_spacing_context_only():
+    prev_df = pd.DataFrame([{"Date": "2025-06-29", "Call": "Graduated", "Backup": "R4_0"}])
+    hol_df = pd.DataFrame(columns=["Date", "Call", "Backup"])
+    schedule = run_scheduling_engine(prev_df, roster(), None, hol_df,
+                                     start_date=datetime(2025, 7, 1), end_date=datetime(2025, 7, 28),
+                                     restarts=50, seed=1)
+    assert len(schedule) == 28
+    assert "Graduated" not in set(schedule["Call"]) | set(schedule["Backup"])
+    # R4_0 held backup on June 29 and must still be spaced from it
+    first_days = schedule[schedule["Date"] <= "2025-07-01"]
+    assert "R4_0" not in set(first_days["Call"]) | set(first_days["Backup"])
+
+
+def test_off_roster_resident_on_schedule_day_is_reported():
+    schedule = [("2025-07-01", "Graduated", "R2_1", None)]
+    fixed = {"2025-06-29": ("Graduated", "R4_0")}
+    issues = validate_assignments(schedule, residents_info(), fixed_assignments=fixed)
+    assert [(i["Date"], i["Resident"], i["Rule"]) for i in issues if i["Rule"] == "Unknown resident"] == [
+        ("2025-07-01", "Graduated", "Unknown resident")]
+
+
+def test_off_roster_resident_only_in_context_is_not_reported():
+    schedule = [("2025-07-01", "R2_0", "R2_1", None)]
+    fixed = {"2025-06-29": ("Graduated", "R4_0")}
+    issues = validate_assignments(schedule, residents_info(), fixed_assignments=fixed)
+    assert not [i for i in issues if i["Rule"] == "Unknown resident"]
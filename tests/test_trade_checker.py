@@ -0,0 +1,52 @@
+import pandas as pd
+
+from trade_checker import TradeChecker
+
+
+def checker(rows):
+    schedule = pd.DataFrame(rows, columns=["Date", "Call", "Backup", "Intern"])
+    residents_info = {pgy: [f"R{pgy}_{i}" for i in range(4)] for pgy in range(1, 5)}
+    return TradeChecker(schedule, residents_info)
+
+
+# Two Wednesdays, when PGY-2 and PGY-3 residents may both take call
+WEDNESDAYS = [
+    ("2025-07-02", "R3_0", "R3_1", "R1_0"),
+    ("2025-07-09", "R2_0", "R2_1", None),
+]
+
+
+def pair_swap():
+    return [("2025-07-02", "Call", "R2_0"), ("2025-07-02", "Backup", "R2_1"),
+            ("2025-07-09", "Call", "R3_0"), ("2025-07-09", "Backup", "R3_1")]
+
+
+def test_call_pgy_change_rechecks_the_intern():
+    issues = checker(WEDNESDAYS).check_trade(pair_swap())
+    assert [(i["Date"], i["Resident"], i["Role"], i["Rule"]) for i in issues] == [
+        ("2025-07-02", "R1_0", "Intern", "Intern eligibility"),
+        ("2025-07-09", None, "Intern", "Unfilled shift"),
+    ]
+
+
+def test_intern_can_follow_the_call_in_the_same_trade():
+    trades = checker(WEDNESDAYS)
+    moves = pair_swap() + [("2025-07-02", "Intern", None), ("2025-07-09", "Intern", "R1_0")]
+    assert trades.check_trade(moves) == []
+    trades.apply_trade(moves)
+    assert [trades.holder("2025-07-02", role) for role in ("Call", "Backup", "Intern")] == ["R2_0", "R2_1", None]
+    assert [trades.holder("2025-07-09", role) for role in ("Call", "Backup", "Intern")] == ["R3_0", "R3_1", "R1_0"]
+
+
+def test_staffed_intern_shift_cannot_be_emptied():
+    issues = checker(WEDNESDAYS).check_trade([("2025-07-02", "Intern", None)])
+    assert [(i["Date"], i["Rule"]) for i in issues] == [("2025-07-02", "Unfilled shift")]
+
+
+def test_uncovered_intern_day_stays_valid_between_same_pgy_calls():
+    # The engine may leave an intern day uncovered when no intern is free
+    trades = checker([
+        ("2025-07-02", "R3_0", "R3_1", None),
+        ("2025-07-09", "R3_2", "R3_3", "R1_0"),
+    ])
+    assert trades.check_trade(trades.swap("2025-07-02", "Call", "2025-07-09")) == []
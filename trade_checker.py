@@ -0,0 +1,301 @@
+# trade_checker.py
+
+# Checks shift trades against a published schedule without re-running the
+# engine. The schedule is indexed by date and by resident, so a trade only
+# looks at the days it touches and the few days around them. The rules are
+# the ones schedule_validator applies to a whole schedule: spacing (q2 interns
+# included), double booking, PGY / weekday eligibility with transitions,
+# backup PGY match, the intern that goes with PGY-3/4 calls, PTO, fixed days
+# and the PGY-4 cap.
+#
+#   checker = TradeChecker.from_inputs(schedule_df, prepare_scheduling_inputs(...), pgy4_cap=4)
+#   checker.check_trade(checker.swap("2025-07-08", "Call", "2025-07-15"))   # [] when valid
+#   checker.suggest_partners("2025-07-08", "Call")
+#
+# Supervisors are derived from the call schedule and are not checked here.
+
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter, defaultdict
+from datetime import date as date_type
+
+import pandas as pd
+
+from call_rules import RULES, CompiledRules, compile_rules
+from schedule_validator import ROLES, ScheduleValidationError
+
+
+def _ordinal(value):
+    if isinstance(value, int):
+        return value
+    return pd.Timestamp(value).toordinal()
+
+
+def _name(value):
+    # Empty cells (None, NaN, blank strings) hold no resident
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return None
+    if not isinstance(value, str) and pd.isna(value):
+        return None
+    return value
+
+
+def _fmt(ordinal):
+    return date_type.fromordinal(ordinal).strftime("%Y-%m-%d")
+
+
+class TradeChecker:
+    def __init__(self, schedule_df, residents_info, transitions=None, pto_requests=None,
+                 fixed_assignments=None, pgy4_cap=None, rules=None):
+        if rules is None:
+            rules = RULES
+        self.rules = rules if isinstance(rules, CompiledRules) else compile_rules(rules)
+        self.residents = [r for names in residents_info.values() for r in names]
+        self.base_pgy = {r: pgy for pgy, names in residents_info.items() for r in names}
+        self.transitions = {
+            r: (_ordinal(when), new_pgy) for r, (when, new_pgy) in (transitions or {}).items()}
+        self.pto_requests = pto_requests or {}
+        self.pgy4_cap = pgy4_cap
+        # Minimum gap by (earlier role, later role); roles not listed need none
+        self.spacing = {(a.capitalize(), b.capitalize()): gap for (a, b), gap in self.rules.spacing.items()}
+        self.spacing[("Intern", "Intern")] = self.rules.intern_spacing
+        self.widest = max(self.spacing.values())
+
+        # Date ordinal -> {role: resident} for the schedule's own days
+        self.slots = {}
+        # Resident -> {ordinal: role} and the sorted ordinals, fixed context included
+        self.events = defaultdict(dict)
+        self.days = defaultdict(list)
+        self.fixed_days = {_ordinal(d) for d in (fixed_assignments or {})}
+        self.pgy4_calls = Counter()
+
+        df = schedule_df.reindex(columns=["Date", "Call", "Backup", "Intern"])
+        for date_val, call, backup, intern in df.itertuples(index=False):
+            day = _ordinal(date_val)
+            slot = {role: name for role, name in zip(ROLES, (call, backup, intern))
+                    if pd.notna(name) and name != ""}
+            self.slots[day] = slot
+            for role, name in slot.items():
+                self._add_event(name, day, role)
+        # Fixed days outside the schedule (previous block) still count for spacing
+        for date_str, pair in (fixed_assignments or {}).items():
+            day = _ordinal(date_str)
+            if day in self.slots:
+                continue
+            for role, name in zip(("Call", "Backup"), pair):
+                if pd.notna(name):
+                    self.events[name][day] = role
+                    insort(self.days[name], day)
+
+    @classmethod
+    def from_inputs(cls, schedule_df, inputs, pgy4_cap=None, rules=None):
+        """Build a checker from prepare_scheduling_inputs() output."""
+        return cls(schedule_df, inputs["residents_info"], inputs["transitions"], inputs["pto_requests"],
+                   inputs["fixed_assignments"], pgy4_cap, rules)
+
+    def _add_event(self, resident, day, role):
+        self.events[resident][day] = role
+        insort(self.days[resident], day)
+        if role == "Call" and self.pgy(resident, day) == self.rules.capped_pgy:
+            self.pgy4_calls[resident] += 1
+
+    def _remove_event(self, resident, day):
+        role = self.events[resident].pop(day)
+        days = self.days[resident]
+        del days[bisect_left(days, day)]
+        if role == "Call" and self.pgy(resident, day) == self.rules.capped_pgy:
+            self.pgy4_calls[resident] -= 1
+
+    def pgy(self, resident, day):
+        """PGY of a resident on a date ordinal (transitions apply the day after)."""
+        transition = self.transitions.get(resident)
+        if transition and day > transition[0]:
+            return transition[1]
+        return self.base_pgy.get(resident)
+
+    def holder(self, date, role):
+        return self.slots.get(_ordinal(date), {}).get(role)
+
+    def swap(self, date_a, role_a, date_b, role_b=None):
+        """Moves for the holders of two shifts trading them."""
+        role_b = role_b or role_a
+        a, b = self.holder(date_a, role_a), self.holder(date_b, role_b)
+        return [(date_a, role_a, b), (date_b, role_b, a)]
+
+    def rotation(self, shifts):
+        """Moves for a multi-way trade: each holder takes the next (date, role) in the list."""
+        holders = [self.holder(date, role) for date, role in shifts]
+        return [(date, role, holders[i - 1]) for i, (date, role) in enumerate(shifts)]
+
+    def check_trade(self, moves):
+        """Issues (schedule_validator format) a trade would introduce; [] when it is valid.
+
+        ``moves`` is a list of (date, role, new resident) covering every shift
+        that changes hands, e.g. from swap() or rotation(). A move may not
+        leave a call or backup shift empty (as a swap with an unfilled shift
+        would). When the call resident's PGY changes, the intern shift must
+        follow it: a call that takes no intern (PGY-2) cannot keep one, and a
+        call that needs one (PGY-3/4) cannot be left without one unless the
+        day already had none. Pass an (date, "Intern", resident or None) move
+        to add or drop the intern in the same trade.
+        """
+        issues = []
+
+        def report(day, resident, role, rule, details):
+            issues.append({'Date': _fmt(day), 'Resident': resident, 'Role': role, 'Rule': rule, 'Details': details})
+
+        new_slots = {}
+        for date, role, resident in moves:
+            day = _ordinal(date)
+            if day not in self.slots:
+                report(day, resident, role, 'Unknown shift', "Date is not in the schedule.")
+                continue
+            if day in self.fixed_days:
+                report(day, resident, role, 'Fixed assignment', "Fixed holiday shifts cannot be traded.")
+                continue
+            resident = _name(resident)
+            if resident is None and role != "Intern":
+                report(day, None, role, 'Unfilled shift', f"The {role.lower()} shift would be left empty.")
+                continue
+            new_slots.setdefault(day, dict(self.slots[day]))[role] = resident
+        if issues:
+            return issues
+
+        removed = defaultdict(set)
+        added = defaultdict(dict)
+        for day, slot in new_slots.items():
+            old_slot = self.slots[day]
+            for role in ROLES:
+                old, new = old_slot.get(role), slot.get(role)
+                if old == new:
+                    continue
+                if old is not None:
+                    removed[old].add(day)
+                if new is not None:
+                    added[new][day] = role
+
+        # Day-level rules on every touched day
+        for day, slot in new_slots.items():
+            names = list(slot.values())
+            for name in set(names):
+                if names.count(name) > 1:
+                    report(day, name, "/".join(r for r in ROLES if slot.get(r) == name), 'Double booking',
+                           f"{name} would hold two roles on the same day.")
+            dow = date_type.fromordinal(day).weekday()
+            call_pgy = self.pgy(slot.get("Call"), day) if slot.get("Call") else None
+            old_slot = self.slots[day]
+            intern = slot.get("Intern")
+            # Intern days follow the call resident's PGY
+            needs_intern = self.rules.needs_intern(call_pgy)
+            if old_slot.get("Call") != slot.get("Call") or old_slot.get("Intern") != intern:
+                old_call = old_slot.get("Call")
+                needed = self.rules.needs_intern(self.pgy(old_call, day) if old_call else None)
+                if intern is not None and not needs_intern:
+                    report(day, intern, "Intern", 'Intern eligibility',
+                           f"A PGY-{call_pgy} call resident does not take an intern.")
+                elif intern is None and needs_intern and (old_slot.get("Intern") is not None or not needed):
+                    report(day, None, "Intern", 'Unfilled shift',
+                           f"A PGY-{call_pgy} call resident needs an intern; the intern shift would be left empty.")
+            for role, name in slot.items():
+                # Backups are rechecked whenever the call resident changes
+                if role != "Backup" and day not in added.get(name, {}):
+                    continue
+                pgy = self.pgy(name, day)
+                if pgy is None:
+                    report(day, name, role, 'Unknown resident', f"{name} is not on the roster.")
+                elif role == "Call" and not self.rules.can_call(pgy, dow):
+                    report(day, name, role, 'Call eligibility',
+                           f"PGY-{pgy} cannot take call on a {date_type.fromordinal(day).strftime('%A')}.")
+                elif role == "Backup" and (not self.rules.can_backup(pgy) or pgy != call_pgy):
+                    report(day, name, role, 'Backup eligibility', f"PGY-{pgy} backup for a PGY-{call_pgy} call resident.")
+                elif role == "Intern" and pgy != self.rules.intern_pgy:
+                    report(day, name, role, 'Intern eligibility', f"PGY-{pgy} assigned as intern.")
+
+        # Resident-level rules for everyone picking up a shift
+        for name, new_events in added.items():
+            gone = removed.get(name, set())
+            for day, role in new_events.items():
+                intervals = self.pto_requests.get(name)
+                if intervals and day in intervals:
+                    report(day, name, role, 'PTO', f"{name} is on PTO.")
+                # Existing events within the widest spacing window, minus the ones traded away
+                days = self.days[name]
+                lo = bisect_right(days, day - self.widest)
+                hi = bisect_left(days, day + self.widest)
+                neighbours = [(d, self.events[name][d]) for d in days[lo:hi] if d not in gone and d != day]
+                neighbours += [(d, r) for d, r in new_events.items() if d > day and d - day < self.widest]
+                for other, other_role in neighbours:
+                    first, second = ((other_role, role) if other < day else (role, other_role))
+                    gap = abs(day - other)
+                    required = self.spacing.get((first, second), 0)
+                    if gap < required:
+                        report(max(day, other), name, f"{first}/{second}", 'Spacing',
+                               f"{first} on {_fmt(min(day, other))} and {second} on {_fmt(max(day, other))} "
+                               f"are {gap} day(s) apart; at least {required} required.")
+            if self.pgy4_cap is not None:
+                capped = self.rules.capped_pgy
+                delta = sum(1 for d, r in new_events.items() if r == "Call" and self.pgy(name, d) == capped)
+                delta -= sum(1 for d in gone if self.events[name][d] == "Call" and self.pgy(name, d) == capped)
+                if delta > 0 and self.pgy4_calls[name] + delta > self.pgy4_cap:
+                    report(max(new_events), name, "Call", 'PGY-4 call cap',
+                           f"{self.pgy4_calls[name] + delta} calls as PGY-4; the cap is {self.pgy4_cap}.")
+
+        issues.sort(key=lambda issue: (issue['Date'], issue['Rule']))
+        return issues
+
+    def apply_trade(self, moves):
+        """Apply a valid trade to the index; raises ScheduleValidationError otherwise."""
+        issues = self.check_trade(moves)
+        if issues:
+            raise ScheduleValidationError(f"Trade breaks {len(issues)} hard rule(s).", issues)
+        for date, role, resident in moves:
+            day = _ordinal(date)
+            old = self.slots[day].get(role)
+            if old is not None and self.events[old].get(day) == role:
+                self._remove_event(old, day)
+        for date, role, resident in moves:
+            day = _ordinal(date)
+            resident = _name(resident)
+            if resident is None:
+                # Only intern shifts are ever emptied
+                self.slots[day].pop(role, None)
+                continue
+            self.slots[day][role] = resident
+            self._add_event(resident, day, role)
+
+    def suggest_partners(self, date, role, roles=None, include_cover=True):
+        """Every valid way to hand off one shift.
+
+        Returns dicts with Resident (the partner), Date and Role (the shift
+        they give back, both None for a straight cover). Swaps are only
+        offered for shifts of the same role unless ``roles`` lists others.
+        """
+        day = _ordinal(date)
+        holder = self.slots.get(day, {}).get(role)
+        roles = roles or [role]
+        dow = date_type.fromordinal(day).weekday()
+        options = []
+        for partner in self.residents:
+            if partner == holder:
+                continue
+            # Cheap PGY pre-filter before any trade is checked
+            pgy = self.pgy(partner, day)
+            if role == "Call" and not self.rules.can_call(pgy, dow):
+                continue
+            if role == "Backup" and not self.rules.can_backup(pgy):
+                continue
+            if role == "Intern" and pgy != self.rules.intern_pgy:
+                continue
+            if include_cover and not self.check_trade([(day, role, partner)]):
+                options.append({'Resident': partner, 'Date': None, 'Role': None})
+            for other_day, other_role in list(self.events[partner].items()):
+                if other_role not in roles or other_day not in self.slots or other_day in self.fixed_days:
+                    continue
+                if not self.check_trade([(day, role, partner), (other_day, other_role, holder)]):
+                    options.append({'Resident': partner, 'Date': _fmt(other_day), 'Role': other_role})
+        return options
+
+    def schedule(self):
+        """The (possibly traded) schedule as a Date/Call/Backup/Intern DataFrame."""
+        rows = [(_fmt(day), slot.get("Call"), slot.get("Backup"), slot.get("Intern"))
+                for day, slot in sorted(self.slots.items())]
+        return pd.DataFrame(rows, columns=["Date", "Call", "Backup", "Intern"])